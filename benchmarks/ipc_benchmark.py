@@ -0,0 +1,106 @@
+"""
+Measures the read latency of a partition stored as Parquet and as Arrow IPC.
+
+The same partition is written as Parquet (the warehouse format), uncompressed Arrow IPC and LZ4
+Arrow IPC into a temporary directory. Each file is read repeatedly and the median latency and size
+are reported. The Arrow IPC files are read through a memory map, as the hot consumers read them.
+Without a partition file a synthetic Player Stats partition is generated.
+"""
+
+import argparse
+import logging
+import os
+import os.path
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import polars
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from services.ipc import read_ipc  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def create_partition(rows: int) -> polars.DataFrame:
+    """
+    Creates a synthetic Player Stats partition.
+    :param rows: Number of rows
+    :return: Data Frame
+    """
+
+    players = max(rows // 20, 1)
+    return polars.DataFrame({
+        'player_name': [f"Player {x % players}" for x in range(rows)],
+        'player_url': [f"https://www.espn.com/nfl/player/_/id/{x % players}" for x in range(rows)],
+        'statistic_code': [f"code_{x % 20}" for x in range(rows)],
+        'statistic_name': [f"Statistic {x % 20}" for x in range(rows)],
+        'statistic_value': [float(x % 97) for x in range(rows)],
+        'statistic_type': [('passing', 'rushing', 'receiving')[x % 3] for x in range(rows)],
+        'team': [f"Team {x % 32}" for x in range(rows)],
+        'opponent': [f"Team {(x + 1) % 32}" for x in range(rows)],
+        'week': [1] * rows,
+        'year': [2023] * rows,
+        'game_type': ['2'] * rows
+    })
+
+
+def measure(read: Callable[[], polars.DataFrame], repeat: int) -> float:
+    """
+    Reads a file repeatedly and returns the median latency.
+    :param read: Function reading the file
+    :param repeat: Number of reads the median is taken over
+    :return: Milliseconds
+    """
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main(frame: polars.DataFrame, repeat: int) -> None:
+    """
+    Main Function measuring the reads of every format.
+    :param frame: Partition
+    :param repeat: Number of reads the median is taken over
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    row_format = '%-20s %12s %12s'
+    logger.info('Partition of %s rows and %s columns', len(frame), len(frame.columns))
+    logger.info(row_format, 'Format', 'Bytes', 'Read ms')
+    with tempfile.TemporaryDirectory() as directory:
+        parquet = os.path.join(directory, 'week.parquet')
+        frame.write_parquet(parquet)
+        uncompressed = os.path.join(directory, 'week.arrow')
+        frame.write_ipc(uncompressed, compression='uncompressed')
+        lz4 = os.path.join(directory, 'week-lz4.arrow')
+        frame.write_ipc(lz4, compression='lz4')
+
+        readers: list[tuple[str, str, Callable[[], polars.DataFrame]]] = [
+            ('parquet', parquet, lambda: polars.read_parquet(parquet)),
+            ('ipc uncompressed', uncompressed, lambda: read_ipc(uncompressed)),
+            ('ipc lz4', lz4, lambda: read_ipc(lz4))
+        ]
+        for name, path, read in readers:
+            logger.info(row_format, name, os.path.getsize(path),
+                        f"{measure(read, repeat):.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-f', '--file', type=str, help='Local Parquet partition to measure')
+    parser.add_argument('-n', '--rows', type=int, default=200000,
+                        help='Rows of the synthetic partition')
+    parser.add_argument('-r', '--repeat', type=int, default=20,
+                        help='Number of reads the median is taken over')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    main(polars.read_parquet(args.file) if args.file else create_partition(args.rows), args.repeat)
@@ -0,0 +1,98 @@
+"""
+Measures the startup cost of each entry point.
+
+Every entry point is imported in a fresh interpreter with -X importtime, and its --help is timed
+end to end. The median import time is reported with the time spent importing each heavy
+dependency, '-' when it was not imported at all.
+"""
+
+import argparse
+import logging
+import os
+import os.path
+import statistics
+import subprocess
+import sys
+import time
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+ENTRY_POINTS = ['download_stats', 'schedule_info_pull', 'live_stats', 'backfill', 'worker']
+DEPENDENCIES = ['selenium', 'polars', 'boto3', 'botocore']
+
+
+def measure_import(module: str) -> dict[str, float]:
+    """
+    Imports a module in a fresh interpreter and returns the cumulative import time of the module
+    and the total import time of each dependency's modules.
+    :param module: Module Name
+    :return: Dictionary of Package Name and Milliseconds
+    """
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=SOURCE_DIR, capture_output=True, text=True, check=True)
+    timings: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        parts = line.removeprefix('import time:').split('|')
+        if len(parts) != 3 or not parts[0].strip().isnumeric():
+            continue
+        name = parts[2].strip()
+        if name == module:
+            timings[module] = int(parts[1]) / 1000
+        for package in DEPENDENCIES:
+            if name == package or name.startswith(f"{package}."):
+                timings[package] = timings.get(package, 0.0) + int(parts[0]) / 1000
+    return timings
+
+
+def measure_help(module: str) -> float:
+    """
+    Runs an entry point with --help and returns the wall time.
+    :param module: Module Name
+    :return: Milliseconds
+    """
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, f"{module}.py", '--help'], cwd=SOURCE_DIR,
+                   capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main(modules: list[str], repeat: int) -> None:
+    """
+    Main Function measuring every entry point.
+    :param modules: Entry Point Module Names
+    :param repeat: Number of runs the median is taken over
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    row_format = '%-20s %10s %10s %10s %10s %10s %10s'
+    logger.info(row_format, 'Entry Point', 'Import ms', 'Help ms', 'selenium', 'polars', 'boto3',
+                'botocore')
+    for module in modules:
+        imports = [measure_import(module) for _ in range(repeat)]
+        helps = [measure_help(module) for _ in range(repeat)]
+
+        def median(package: str, runs: list[dict[str, float]]) -> str:
+            """
+            Formats the median import time of a package, '-' when it was not imported.
+            """
+            values = [x[package] for x in runs if package in x]
+            return f"{statistics.median(values):.1f}" if values else '-'
+
+        logger.info(row_format, module, median(module, imports),
+                    f"{statistics.median(helps):.1f}", median('selenium', imports),
+                    median('polars', imports), median('boto3', imports),
+                    median('botocore', imports))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-m', '--modules', type=str, nargs='+', default=ENTRY_POINTS,
+                        help='Entry Points to measure')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='Number of runs the median is taken over')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    main(args.modules, args.repeat)
@@ -0,0 +1,290 @@
+"""
+Backfills the Schedules and Stats of a range of Seasons.
+
+Every Season, Game Type, Week and Entity combination is a Task in a local SQLite Work Queue. The
+Backfill can be stopped or killed at any time and running it again with the same queue resumes
+with the Tasks that are not done.
+"""
+
+import argparse
+import logging
+import signal
+import threading
+import time
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import date, timedelta
+
+from boto3 import Session
+from botocore.client import BaseClient
+
+import download_stats
+import schedule_info_pull
+from services.fetch import Fetcher
+from services.manifest import compact_manifest
+from services.pool import ServiceBudget, ServicePool
+from services.stats import ScheduleService
+from services.workqueue import SCHEDULE_ENTITY, Task, WorkQueue
+
+ENTITIES = [SCHEDULE_ENTITY, *download_stats.SERVICES]
+
+
+def create_tasks(start_year: int, end_year: int, entities: list[str],
+                 game_type: int = 0) -> list[tuple[str, int, int, int]]:
+    """
+    Expands the Seasons into a Task for every Game Type, Week and Entity.
+    :param start_year: First Season
+    :param end_year: Last Season
+    :param entities: Entities to backfill (schedules, teams, players, games)
+    :param game_type: Optional Game Type, 0 for all types
+    :return: Entity, Year, Game Type and Week of each Task
+    """
+
+    tasks = []
+    for year in range(start_year, end_year + 1):
+        for game, week in schedule_info_pull.get_tasks(year, game_type, 0):
+            tasks.extend([(x, year, game.type_id, week) for x in entities])
+    return tasks
+
+
+def execute_task(task: Task, bucket: str, client: BaseClient, pools: dict[str, ServicePool],
+                 **kwargs) -> None:
+    """
+    Executes a single Task. Any failure is raised so the attempt is recorded.
+    :param task: Task
+    :param bucket: S3 Bucket
+    :param client: S3 Client
+    :param pools: Service Pools by Entity
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :return: None
+    """
+
+    game_types = {x.type_id: x for x in schedule_info_pull.get_game_types()}
+    schedule_key = schedule_info_pull.get_schedule_key(task.year, game_types[task.game_type],
+                                                       task.week)
+    if task.entity == SCHEDULE_ENTITY:
+        records = schedule_info_pull.fetch_schedule(task.year, task.week, task.game_type,
+                                                    pools[task.entity])
+        if not records:
+            raise RuntimeError(f"No Schedule returned for {schedule_key}")
+        schedule_info_pull.write_output(bucket, schedule_key, records, client,
+                                        bool(kwargs.get('force')))
+        return
+
+    download_stats.process_schedule(bucket, schedule_key, task.entity, client,
+                                    pools[task.entity], dimensions=kwargs.get('dimensions'),
+                                    force=kwargs.get('force'))
+
+
+def estimate_eta(remaining: int, completed: int, elapsed: float) -> float | None:
+    """
+    Estimates the seconds left from the throughput observed in this run.
+    :param remaining: Tasks not done
+    :param completed: Tasks done in this run
+    :param elapsed: Seconds since this run started
+    :return: Seconds, None until a Task has completed
+    """
+
+    if completed == 0 or elapsed <= 0:
+        return None
+    return remaining / (completed / elapsed)
+
+
+def log_progress(queue: WorkQueue, started: float) -> None:
+    """
+    Logs the Backfill progress with the ETA.
+    :param queue: Work Queue
+    :param started: Unix Timestamp this run started
+    :return: None
+    """
+
+    counts = queue.counts()
+    elapsed = time.time() - started
+    completed = queue.completed_since(started)
+    eta = estimate_eta(counts['pending'] + counts['running'], completed, elapsed)
+    logging.getLogger(__name__).info(
+        'Done %s of %s tasks, %s failed, %.1f tasks/min, ETA %s', counts['done'],
+        sum(counts.values()), counts['failed'], completed / max(elapsed, 1e-9) * 60,
+        'unknown' if eta is None else str(timedelta(seconds=round(eta))))
+
+
+def work(queue: WorkQueue, bucket: str, client: BaseClient, pools: dict[str, ServicePool],
+         stop: threading.Event, **kwargs) -> None:
+    """
+    Executes Tasks until none is left or the Stop Event is set.
+    :param queue: Work Queue
+    :param bucket: S3 Bucket
+    :param client: S3 Client
+    :param pools: Service Pools by Entity
+    :param stop: Event signalling a graceful shutdown
+    :keyword started: Unix Timestamp this run started
+    :keyword max_attempts: Maximum attempts of a Task (default 3)
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    started = kwargs.pop('started', time.time())
+    max_attempts = int(kwargs.pop('max_attempts', None) or 3)
+
+    while not stop.is_set():
+        task = queue.claim()
+        if task is None:
+            if queue.counts()['running'] == 0:
+                return
+            stop.wait(1)
+            continue
+
+        start = time.perf_counter()
+        try:
+            execute_task(task, bucket, client, pools, **kwargs)
+        except Exception as ex:  # pylint: disable=broad-exception-caught
+            retry = queue.fail(task, str(ex), max_attempts)
+            logger.error('Task failed (attempt %s%s): %s %s/%s/%s : %s', task.attempts,
+                         ', will retry' if retry else '', task.entity, task.year,
+                         task.game_type, task.week, ex)
+            continue
+
+        queue.complete(task, time.perf_counter() - start)
+        log_progress(queue, started)
+
+
+def run(queue: WorkQueue, bucket: str, client: BaseClient, stop: threading.Event,
+        **kwargs) -> dict[str, int]:
+    """
+    Executes the queued Tasks with a pool of worker threads.
+    :param queue: Work Queue
+    :param bucket: S3 Bucket
+    :param client: S3 Client shared by the workers
+    :param stop: Event signalling a graceful shutdown
+    :keyword workers: Number of Tasks executed in parallel and of browsers alive (default 4)
+    :keyword max_attempts: Maximum attempts of a Task (default 3)
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :return: Number of Tasks in each state
+    """
+
+    workers = int(kwargs.pop('workers', None) or 4)
+    budget = ServiceBudget(workers)
+    fetcher = Fetcher.from_env()
+    started = time.time()
+    with ExitStack() as stack:
+        pools: dict[str, ServicePool] = {
+            SCHEDULE_ENTITY: stack.enter_context(
+                ServicePool(partial(ScheduleService, fetcher), workers, budget)),
+            **{x: stack.enter_context(ServicePool(partial(y, fetcher), workers, budget))
+               for x, y in download_stats.SERVICES.items()}
+        }
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(work, queue, bucket, client, pools, stop, started=started,
+                                       **kwargs) for _ in range(workers)]
+            for future in futures:
+                future.result()
+    return queue.counts()
+
+
+def log_status(queue: WorkQueue) -> None:
+    """
+    Logs the number of Tasks in each state and the average Task duration of each Entity.
+    :param queue: Work Queue
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    for state, count in queue.counts().items():
+        logger.info('%-8s %8s', state, count)
+    for entity, seconds in sorted(queue.average_seconds().items()):
+        logger.info('%-10s %8.1f seconds per task', entity, seconds)
+
+
+def main(bucket: str, start_year: int, **kwargs) -> None:
+    """
+    Main Function queueing the Backfill Tasks and executing them until done or until it receives
+    SIGTERM or SIGINT.
+    :param bucket: S3 Bucket
+    :param start_year: First Season
+    :keyword end_year: Last Season (default the current year)
+    :keyword entities: Entities to backfill (default every Entity)
+    :keyword game_type: Optional Game Type, 0 for all types
+    :keyword queue: Path of the SQLite Work Queue (default backfill.db)
+    :keyword workers: Number of Tasks executed in parallel (default 4)
+    :keyword max_attempts: Maximum attempts of a Task (default 3)
+    :keyword retry_failed: Optional flag to retry the failed Tasks
+    :keyword status: Optional flag to only log the Work Queue status
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    queue = WorkQueue(kwargs.get('queue') or 'backfill.db')
+    recovered = queue.recover()
+    retried = queue.retry_failed() if kwargs.get('retry_failed') else 0
+    added = queue.add(create_tasks(start_year, int(kwargs.get('end_year') or date.today().year),
+                                   kwargs.get('entities') or ENTITIES,
+                                   int(kwargs.get('game_type') or 0)))
+    logger.info('Queued %s new tasks, recovered %s interrupted and retrying %s failed', added,
+                recovered, retried)
+
+    if kwargs.get('status'):
+        log_status(queue)
+        queue.close()
+        return
+
+    stop = threading.Event()
+
+    def shutdown(signum, _frame):
+        """
+        Stops the Backfill once the running Tasks complete.
+        """
+        logger.info('Received signal %s, stopping after the running tasks', signum)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    client = download_stats.create_client(Session())
+    run(queue, bucket, client, stop, workers=kwargs.get('workers'),
+        max_attempts=kwargs.get('max_attempts'), dimensions=kwargs.get('dimensions'),
+        force=kwargs.get('force'))
+    compact_manifest(client, bucket)
+    log_status(queue)
+    queue.close()
+    logger.info('Done')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-b', '--bucket', type=str, help='Warehouse S3 Bucket', required=True)
+    parser.add_argument('-s', '--start-year', type=int, required=True, help='First Season')
+    parser.add_argument('-e', '--end-year', type=int, help='Last Season (default current year)')
+    parser.add_argument('-n', '--entities', type=str, nargs='+', choices=ENTITIES,
+                        help='Entities to backfill (default every Entity)')
+    parser.add_argument('-t', '--type', type=int, help='Game Type (1, 2, 3)')
+    parser.add_argument('-q', '--queue', type=str, default='backfill.db',
+                        help='Path of the SQLite Work Queue')
+    parser.add_argument('-j', '--workers', type=int, default=4,
+                        help='Number of Tasks executed in parallel')
+    parser.add_argument('-a', '--max-attempts', type=int, default=3,
+                        help='Maximum attempts of a Task')
+    parser.add_argument('-r', '--retry-failed', action='store_true',
+                        help='Retry the Tasks that failed in earlier runs')
+    parser.add_argument('--status', action='store_true', help='Only log the Work Queue status')
+    parser.add_argument('-d', '--dimensions', action='store_true',
+                        help='Upsert the Dimension tables and write the slim Fact table')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Write the outputs even when the content has not changed')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('botocore').setLevel(logging.FATAL)
+    logging.getLogger('boto3').setLevel(logging.FATAL)
+
+    main(args.bucket, args.start_year, end_year=args.end_year, entities=args.entities,
+         game_type=args.type, queue=args.queue, workers=args.workers,
+         max_attempts=args.max_attempts, retry_failed=args.retry_failed, status=args.status,
+         dimensions=args.dimensions, force=args.force)
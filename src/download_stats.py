@@ -2,18 +2,74 @@
 Retrieves the Stats for a given Schedule File
 """
 
-import argparse
 import logging
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from io import BytesIO
+from typing import NamedTuple
 
+if __name__ == '__main__':
+    # Parsed before the heavy imports below, so --help and usage errors return immediately
+    from services.arguments import create_stats_parser
+    ARGUMENTS = create_stats_parser().parse_args()
+
+# pylint: disable=ungrouped-imports
 import polars
 from boto3 import Session
 from botocore.client import BaseClient
 from botocore.exceptions import ClientError
 
-from services.stats import TeamService, PlayerService, GameService
+from services.changes import DIGEST_METADATA, content_hash, is_unchanged
+from services.checkpoint import CheckpointStore, create_checkpoint_store
+from services.dimensions import FACT_ENTITIES, update_dimensions
+from services.enrich import ENRICHED_ENTITIES, WEEK_KEY_PATTERN, enrich_batches, enrich_stats, \
+    get_enriched_key
+from services.manifest import compact_manifest, create_entry, remove_entries, update_manifest
+from services.deadline import Deadline
+from services.fetch import Fetcher, FetchError
+from services.ipc import refresh_ipc, write_ipc
+from services.metrics import METRICS
+from services.profiler import profile_run
+from services.planner import PENDING_PREFIX, Plan, defer_games, get_pending_key, \
+    get_schedule_key, plan_games, write_pending
+from services.pool import ServicePool
+from services.sharding import delete_files, delete_parts, get_game_key, get_part_key, \
+    list_game_files, load_parts, select_shard, write_part
+from services.spill import SpillAccumulator
+from services.stats import BaseService, TeamService, PlayerService, GameService
+from services.storage import download_frame, load_frame
+
+SERVICES: dict[str, type[BaseService]] = {
+    'teams': TeamService,
+    'players': PlayerService,
+    'games': GameService
+}
+
+
+class WeekSummary(NamedTuple):
+    """
+    Summary of a processed Schedule File
+    """
+    schedule_key: str
+    games: int
+    rows: int
+    size: int
+    seconds: float
+    written: int = 0
+    skipped: int = 0
+    deferred: int = 0
+
+
+class WriteResult(NamedTuple):
+    """
+    Result of writing an output file
+    """
+    key: str
+    size: int
+    skipped: bool
 
 
 def create_client(session: Session) -> BaseClient:
@@ -28,17 +84,16 @@ def create_client(session: Session) -> BaseClient:
     return session.client('s3')
 
 
-def load_schedule_file(bucket: str, key: str, session: Session) -> polars.DataFrame | None:
+def load_schedule_file(bucket: str, key: str, client: BaseClient) -> polars.DataFrame | None:
     """
     Loads the Schedule File from S3 Bucket
     :param bucket: S3 Bucket
     :param key: S3 Key
-    :param session: Boto Session
+    :param client: S3 Client
     :return: Optional Data Frame
     """
 
     try:
-        client = create_client(session)
         response = client.get_object(Bucket=bucket, Key=key)
 
         content = response['Body'].read()
@@ -50,134 +105,850 @@ def load_schedule_file(bucket: str, key: str, session: Session) -> polars.DataFr
     return None
 
 
-def get_team_stats(game_id: str, year: int, week: int, game_type: str) -> polars.DataFrame | None:
+def list_schedule_files(bucket: str, prefix: str, client: BaseClient) -> list[str]:
+    """
+    Lists the Schedule Files stored under a Prefix.
+    :param bucket: S3 Bucket
+    :param prefix: S3 Key Prefix (schedules/2023/)
+    :param client: S3 Client
+    :return: List of S3 Keys
+    """
+
+    paginator = client.get_paginator('list_objects_v2')
+    keys = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys.extend([x['Key'] for x in page.get('Contents', []) if x['Key'].endswith('.parquet')])
+    return sorted(keys)
+
+
+def get_team_stats(game_id: str, year: int, week: int, game_type: str,
+                   service: TeamService | None = None) -> polars.DataFrame | None:
     """
     Returns the Team based Stats from the provided Game ID.
     :param game_id: Game ID
     :param year: Year Value
     :param week: Week Number
     :param game_type: Game Type ID
+    :param service: Optional warm TeamService to reuse
     :return: Data Frame
     """
-    service = TeamService()
+    service = service or TeamService()
     result = service.get_team_stats(game_id, week, year, game_type)
     if result:
-        return polars.DataFrame(result)
+        with METRICS.stage('frame') as timer:
+            timer.add(rows=len(result))
+            return polars.DataFrame(result)
     return None
 
 
-def get_player_stats(game_id: str, year: int, week: int, game_type: str) -> polars.DataFrame | None:
+def get_player_stats(game_id: str, year: int, week: int, game_type: str,
+                     service: PlayerService | None = None) -> polars.DataFrame | None:
     """
     Returns the Player based Stats from the provided Game ID.
     :param game_id: Game ID
     :param year: Year Value
     :param week: Week Number
     :param game_type: Game Type ID
+    :param service: Optional warm PlayerService to reuse
     :return: Data Frame
     """
-    service = PlayerService()
+    service = service or PlayerService()
     result = service.get_player_stats(game_id, week, year, game_type)
     if result:
-        return polars.DataFrame(result)
+        with METRICS.stage('frame') as timer:
+            timer.add(rows=len(result))
+            return polars.DataFrame(result)
     return None
 
 
-def get_game_info(game_id: str, year: int, week: int, game_type: str) -> polars.DataFrame | None:
+def get_game_info(game_id: str, year: int, week: int, game_type: str,
+                  service: GameService | None = None) -> polars.DataFrame | None:
     """
     Returns the game Info as a Data Frame
     :param game_id: Game ID
     :param year: Year Value
     :param week: Week Number
     :param game_type: Game Type ID
+    :param service: Optional warm GameService to reuse
     :return: Data Frame
     """
-    service = GameService()
+    service = service or GameService()
     result = service.get_game_info(game_id, week, year, game_type)
 
     if not result:
         return None
 
-    return polars.DataFrame([result])
+    with METRICS.stage('frame') as timer:
+        timer.add(rows=1)
+        return polars.DataFrame([result])
 
 
-def write_output(frame: polars.DataFrame, bucket: str, key: str, session: Session) -> None:
+def get_stats(row: dict, stat_type: str, service: BaseService | None = None) \
+        -> polars.DataFrame | None:
     """
-    Writes the DataFrame output to Parquet in S3 bucket
-    :param frame: DataFrame
+    Retrieves the Stats for a Schedule Row.
+    :param row: Dictionary of the Schedule Row
+    :param stat_type: Stats Type
+    :param service: Optional warm Service matching the Stats Type
+    :return: Data Frame
+    """
+
+    game = (str(row['game_id']), int(row['year']), int(row['week']), str(row['game_type']))
+    with METRICS.game(game[0]):
+        if stat_type == 'teams':
+            return get_team_stats(*game, service=service)  # type: ignore[arg-type]
+        if stat_type == 'players':
+            return get_player_stats(*game, service=service)  # type: ignore[arg-type]
+        if stat_type == 'games':
+            return get_game_info(*game, service=service)  # type: ignore[arg-type]
+    return None
+
+
+def write_output(frame: polars.DataFrame | SpillAccumulator, bucket: str, key: str,
+                 client: BaseClient, force: bool = False, *, ipc: str | None = None) -> WriteResult:
+    """
+    Writes the DataFrame output to Parquet in S3 bucket and records it in the Manifest. The upload
+    is skipped when the stored output already holds the same content.
+    :param frame: DataFrame, or spilled Stats streamed from their spill files
     :param bucket: S3 Bucket
     :param key: S3 Key
-    :param session: Boto Session
-    :return: None
+    :param client: S3 Client
+    :param force: Write the output even when the content has not changed
+    :param ipc: Optional Arrow IPC Compression (uncompressed, lz4) of a copy written next to it,
+        also written for an unchanged output whose copy is missing or stale
+    :return: Write Result
     """
 
-    stream = BytesIO()
-    frame.write_parquet(stream)
+    with METRICS.stage('digest') as timer:
+        timer.add(rows=len(frame))
+        digest = frame.content_hash() if isinstance(frame, SpillAccumulator) \
+            else content_hash(frame)
+        unchanged = not force and is_unchanged(client, bucket, key, digest)
+    if unchanged:
+        logging.getLogger(__name__).info('Output unchanged, skipping %s', key)
+        if ipc:
+            refresh_ipc(client, bucket, key, frame, ipc, digest=digest)
+        return WriteResult(key, 0, True)
+
+    if isinstance(frame, SpillAccumulator):
+        size = frame.upload(client, bucket, key, {DIGEST_METADATA: digest})
+        if ipc:
+            write_ipc(client, bucket, key, frame, ipc, digest=digest)
+        update_manifest(client, bucket, [create_entry(key, frame.lazy(), size)])
+        return WriteResult(key, size, False)
+
+    with METRICS.stage('encode') as timer:
+        stream = BytesIO()
+        frame.write_parquet(stream)
+        body = stream.getvalue()
+        timer.add(len(body), len(frame))
 
     try:
-        client = create_client(session)
-        client.put_object(Bucket=bucket, Key=key, Body=stream.getvalue())
+        with METRICS.stage('upload') as timer:
+            timer.add(len(body))
+            client.put_object(Bucket=bucket, Key=key, Body=body,
+                              Metadata={DIGEST_METADATA: digest})
+        if ipc:
+            write_ipc(client, bucket, key, frame, ipc, digest=digest)
+        with METRICS.stage('manifest'):
+            update_manifest(client, bucket, [create_entry(key, frame, len(body))])
     except ClientError as ex:
         logging.error('Failed to write output to S3 bucket: %s : %s', key, ex.args)
         raise ex
+    return WriteResult(key, len(body), False)
 
 
-def main(bucket: str, schedule_key: str, stat_type: str) -> None:
+def scope_schedule(schedule_frame: polars.DataFrame, output_key: str,
+                   **kwargs) -> tuple[polars.DataFrame, str]:
     """
-    Main Function to pull Team Level Stats
+    Narrows the Schedule to the game of a per-game run or to the games of a Shard, along with the
+    output Key they are written to.
+    :param schedule_frame: Schedule Data Frame
+    :param output_key: S3 Key of the week output
+    :keyword game_id: Optional Game ID to process alone, written to its own game file
+    :keyword shard: Optional Shard Index and Count, the Shard's games are written to its part
+    :return: Schedule Data Frame and S3 Key of the output
+    """
+
+    if kwargs.get('game_id'):
+        schedule_frame = schedule_frame.filter(
+            polars.col('game_id').cast(polars.String) == str(kwargs['game_id']))
+        output_key = get_game_key(output_key, str(kwargs['game_id']))
+    if kwargs.get('shard'):
+        schedule_frame = select_shard(schedule_frame, *kwargs['shard'])
+        output_key = get_part_key(output_key, *kwargs['shard'])
+    return schedule_frame, output_key
+
+
+def process_schedule(bucket: str, schedule_key: str, stat_type: str, client: BaseClient,
+                     pool: ServicePool, **kwargs) -> WeekSummary | None:
+    """
+    Retrieves the Stats for every game in a Schedule File and writes the output.
     :param bucket: S3 Bucket
     :param schedule_key: S3 Schedule File Key
-    :param stat_type: Stats Type, Player or Team
-    :return: None
+    :param stat_type: Stats Type
+    :param client: S3 Client
+    :param pool: Pool of warm Services for the Stats Type
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword checkpoint: Optional local directory or S3 URL for the per-game Checkpoints
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :keyword ipc: Optional Arrow IPC Compression of the copies written next to the outputs
+    :keyword game_id: Optional Game ID to process alone, written to its own game file
+    :keyword plan: Optional flag to defer unplayed games to the pending list
+    :keyword today: Optional Game Date of today (YYYYMMDD) used by the planner
+    :keyword shard: Optional Shard Index and Count, the Shard's games are written to its part
+    :keyword deadline: Optional Deadline, games that do not fit are deferred to the pending list
+    :keyword memory_budget: Optional Bytes of Stats held in memory before spilling to disk
+    :keyword spill_dir: Optional directory of the spill files (default the temp dir)
+    :keyword schedule: Optional Schedule Rows already retrieved, the Schedule File is not read
+    :return: Week Summary, None when the Schedule File is empty
+    :raises RuntimeError: When the game of a per-game run was deferred, so nothing was written
+    """
+
+    logging.getLogger(__name__).info('Processing Schedule File for %s Stats: %s', stat_type,
+                                     schedule_key)
+    start = time.perf_counter()
+
+    schedule_frame = kwargs['schedule'] if kwargs.get('schedule') is not None \
+        else load_schedule_file(bucket, schedule_key, client)
+    if schedule_frame is None or len(schedule_frame) == 0:
+        logging.getLogger(__name__).warning('Schedule file is empty: %s', schedule_key)
+        return None
+
+    schedule_frame, output_key = scope_schedule(
+        schedule_frame, schedule_key.replace('schedules', stat_type), **kwargs)
+    plan = plan_schedule(schedule_frame, **kwargs)
+    store = None
+    if kwargs.get('checkpoint'):
+        store = create_checkpoint_store(kwargs['checkpoint'], output_key, client)
+    frames, unprocessed = fetch_stats(
+        plan.ready.to_dicts(), stat_type, pool, store, kwargs.get('deadline'),
+        frames=SpillAccumulator(int(kwargs['memory_budget']), kwargs.get('spill_dir'))
+        if kwargs.get('memory_budget') else None)
+    try:
+        plan = defer_games(plan, unprocessed)
+        if kwargs.get('game_id') and len(plan.pending) > 0:
+            raise RuntimeError(f"Game {kwargs['game_id']} of {schedule_key} was deferred, "
+                               f"nothing was written")
+
+        stats = combine_frames(frames)
+        results = []
+        if frames or kwargs.get('shard'):
+            if unprocessed and not kwargs.get('shard'):
+                stats = merge_output(stats, plan.ready, bucket, output_key, client)
+            results = write_stats(stats, bucket, output_key, stat_type, client, **kwargs)
+            if store is not None:
+                store.clear()
+    finally:
+        if isinstance(frames, SpillAccumulator):
+            frames.close()
+    if not kwargs.get('game_id') and len(plan.pending) > 0:
+        write_pending(client, bucket, get_pending_key(output_key), plan.pending)
+
+    if not frames:
+        logging.getLogger(__name__).warning('No %s Stats Loaded from Schedule File', stat_type)
+        return WeekSummary(schedule_key, len(schedule_frame), 0, 0, time.perf_counter() - start,
+                           deferred=len(plan.pending))
+    return summarize(schedule_key, len(schedule_frame), len(stats), results,
+                     time.perf_counter() - start)._replace(deferred=len(plan.pending))
+
+
+def combine_frames(frames: list[polars.DataFrame] | SpillAccumulator) \
+        -> polars.DataFrame | SpillAccumulator:
+    """
+    Concatenates the Stats of the games. Spilled Stats are kept on disk.
+    :param frames: Stats of the games
+    :return: Stats
+    """
+
+    if isinstance(frames, SpillAccumulator):
+        return frames
+    return polars.concat(frames, how='diagonal') if frames else polars.DataFrame()
+
+
+def plan_schedule(schedule_frame: polars.DataFrame, **kwargs) -> Plan:
+    """
+    Splits the Schedule games into the games to fetch and the unplayed games to defer.
+    :param schedule_frame: Schedule Data Frame
+    :keyword plan: Optional flag to defer unplayed games
+    :keyword today: Optional Game Date of today (YYYYMMDD)
+    :return: Plan
+    """
+
+    if not kwargs.get('plan'):
+        return Plan(schedule_frame, schedule_frame.clear())
+
+    plan = plan_games(schedule_frame, kwargs.get('today'))
+    if len(plan.pending) > 0:
+        logging.getLogger(__name__).info('Deferred %s unplayed games', len(plan.pending))
+    return plan
+
+
+def process_pending(bucket: str, pending_key: str, stat_type: str, client: BaseClient,
+                    pool: ServicePool, **kwargs) -> WeekSummary | None:
+    """
+    Retrieves the Stats of the pending games of a Schedule File that have since been played and
+    merges them into the week output. Games still unplayed stay in the pending list.
+    :param bucket: S3 Bucket
+    :param pending_key: S3 Key of the pending list
+    :param stat_type: Stats Type
+    :param client: S3 Client
+    :param pool: Pool of warm Services for the Stats Type
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :keyword today: Optional Game Date of today (YYYYMMDD) used by the planner
+    :keyword deadline: Optional Deadline, games that do not fit stay in the pending list
+    :return: Week Summary, None when the pending list is empty
+    """
+
+    start = time.perf_counter()
+    schedule_key = get_schedule_key(pending_key, stat_type)
+    pending = load_schedule_file(bucket, pending_key, client)
+    if pending is None or len(pending) == 0:
+        return None
+
+    plan = plan_games(pending, kwargs.get('today'))
+    frames, unprocessed = fetch_stats(plan.ready.to_dicts(), stat_type, pool,
+                                      deadline=kwargs.get('deadline'))
+    plan = defer_games(plan, unprocessed)
+    results = []
+    stats: polars.DataFrame | SpillAccumulator = polars.DataFrame()
+    if frames:
+        output_key = schedule_key.replace('schedules', stat_type)
+        stats = merge_output(combine_frames(frames), plan.ready, bucket, output_key, client)
+        results = write_stats(stats, bucket, output_key, stat_type, client, **kwargs)
+    write_pending(client, bucket, pending_key, plan.pending)
+
+    logging.getLogger(__name__).info('Fetched %s pending games of %s, %s still pending',
+                                     len(plan.ready), schedule_key, len(plan.pending))
+    return summarize(schedule_key, len(pending), len(stats), results,
+                     time.perf_counter() - start)._replace(deferred=len(plan.pending))
+
+
+def summarize(schedule_key: str, games: int, rows: int, results: list[WriteResult],
+              seconds: float) -> WeekSummary:
+    """
+    Creates the Week Summary and logs the written and skipped output counts.
+    :param schedule_key: S3 Schedule File Key
+    :param games: Number of games in the Schedule File
+    :param rows: Number of Stats rows
+    :param results: Write Results of the outputs
+    :param seconds: Elapsed seconds
+    :return: Week Summary
+    """
+
+    written = [x for x in results if not x.skipped]
+    logging.getLogger(__name__).info('Written %s outputs, skipped %s unchanged', len(written),
+                                     len(results) - len(written))
+    return WeekSummary(schedule_key, games, rows, sum(x.size for x in written), seconds,
+                       len(written), len(results) - len(written))
+
+
+def get_remaining(rows: list[dict], store: CheckpointStore | None = None) -> list[dict]:
+    """
+    Returns the Schedule Rows of the games without a Checkpoint.
+    :param rows: Schedule Rows
+    :param store: Optional Checkpoint Store
+    :return: Schedule Rows
+    """
+
+    completed = store.completed() if store is not None else set()
+    remaining = [x for x in rows if str(x['game_id']) not in completed]
+    if completed:
+        logging.getLogger(__name__).info('Resuming from %s Checkpoints, %s games remaining',
+                                         len(rows) - len(remaining), len(remaining))
+    return remaining
+
+
+def fetch_game(row: dict, stat_type: str, service: BaseService,
+               deadline: Deadline | None = None) -> polars.DataFrame | None:
+    """
+    Retrieves the Stats of a game and records its duration with the Deadline.
+    :param row: Schedule Row
+    :param stat_type: Stats Type
+    :param service: Service matching the Stats Type
+    :param deadline: Optional Deadline
+    :return: Data Frame
+    :raises FetchError: When the game's page failed to load within the retries
     """
 
-    def compile_frames(row: dict, stat: str):
-        """
-        Processes Each Schedule Row and adds the Resulting frame to the collection.
-        :param row: Dictionary of the Row
-        :param stat: Stats Type
-        :return: None
-        """
-        result = None
-        if stat == 'teams':
-            result = get_team_stats(str(row['game_id']), int(row['year']), int(row['week']),
-                                    str(row['game_type']))
+    start = time.perf_counter()
+    result = get_stats(row, stat_type, service)
+    if deadline is not None:
+        deadline.record(time.perf_counter() - start)
+    return result
 
-        if stat == 'players':
-            result = get_player_stats(str(row['game_id']), int(row['year']), int(row['week']),
-                                      str(row['game_type']))
-        if stat == 'games':
-            result = get_game_info(str(row['game_id']), int(row['year']), int(row['week']),
-                                   str(row['game_type']))
 
-        return result
+def fetch_rows(rows: list[dict], stat_type: str, service: BaseService, deadline: Deadline | None,
+               **kwargs) -> list[str]:
+    """
+    Retrieves the Stats of the Schedule Rows with a borrowed Service, in order, until the Deadline
+    does not allow the next game to start.
+    :param rows: Schedule Rows
+    :param stat_type: Stats Type
+    :param service: Stats Service
+    :param deadline: Optional Deadline
+    :keyword store: Optional Checkpoint Store each completed game is saved to
+    :keyword results: List or Spill Accumulator collecting the Stats without a Checkpoint Store
+    :keyword failed: List collecting the Game IDs whose pages failed to load
+    :return: Game IDs not started before the Deadline
+    """
+
+    store = kwargs.get('store')
+    for index, row in enumerate(rows):
+        if deadline is not None and not deadline.can_start():
+            return [str(x['game_id']) for x in rows[index:]]
+        if service.batch_size and index % service.batch_size == 0:
+            service.prefetch([str(x['game_id']) for x in rows[index:index + service.batch_size]])
+        try:
+            result = fetch_game(row, stat_type, service, deadline)
+        except FetchError as ex:
+            logging.getLogger(__name__).error('Deferring game %s: %s', row['game_id'], ex)
+            kwargs['failed'].append(str(row['game_id']))
+            continue
+        if result is not None and store is not None:
+            store.save(str(row['game_id']), result)
+        elif result is not None:
+            kwargs['results'].append(result)
+    return []
+
+
+def fetch_stats(rows: list[dict], stat_type: str, pool: ServicePool,
+                store: CheckpointStore | None = None, deadline: Deadline | None = None, *,
+                frames: SpillAccumulator | None = None) \
+        -> tuple[list[polars.DataFrame] | SpillAccumulator, list[str]]:
+    """
+    Retrieves the Stats for the Schedule Rows. With a Checkpoint Store, games that already have a
+    Checkpoint are skipped and each new game is stored as soon as it completes. With a Deadline,
+    no new game is started once the next game is not expected to complete in time. Games whose
+    pages failed to load within the Fetch Policy's retries are left unprocessed as well. When the
+    Service has a batch size, the pages of the next games are prefetched in one batch; payloads
+    still prefetched when the Service is returned to the pool are dropped, so a later borrower
+    never reads a stale page.
+    :param rows: Schedule Rows
+    :param stat_type: Stats Type
+    :param pool: Pool of warm Services for the Stats Type
+    :param store: Optional Checkpoint Store
+    :param deadline: Optional Deadline
+    :param frames: Optional Spill Accumulator collecting the Stats instead of a list, closed when
+        the fetch fails
+    :return: Stats of every completed game and the Game IDs left unprocessed
+    """
+
+    results: list[polars.DataFrame] | SpillAccumulator = [] if frames is None else frames
+    unprocessed: list[str] = []
+    failed: list[str] = []
+    try:
+        remaining = get_remaining(rows, store)
+        if remaining:
+            with pool.borrow() as service:
+                try:
+                    unprocessed = fetch_rows(remaining, stat_type, service, deadline,
+                                             store=store, results=results, failed=failed)
+                finally:
+                    service.prefetched.clear()
+        if store is not None:
+            results.extend(store.load())
+    except BaseException:
+        if frames is not None:
+            frames.close()
+        raise
+
+    if unprocessed:
+        logging.getLogger(__name__).warning('Deadline reached, %s games left unprocessed: %s',
+                                            len(unprocessed), ', '.join(unprocessed))
+    return results, failed + unprocessed
+
+
+def write_stats(stats: polars.DataFrame | SpillAccumulator, bucket: str, output_key: str,
+                stat_type: str, client: BaseClient, **kwargs) -> list[WriteResult]:
+    """
+    Writes the Stats output and, when requested, the slim Fact table. Spilled Stats are streamed
+    from the spill files and the Dimensions are upserted one spilled batch at a time.
+    :param stats: Stats Data Frame
+    :param bucket: S3 Bucket
+    :param output_key: S3 Key of the Stats output
+    :param stat_type: Stats Type
+    :param client: S3 Client
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :keyword ipc: Optional Arrow IPC Compression of the copies written next to the outputs
+    :keyword enrich: Optional flag to write the Stats of the week pre-joined to its Games
+    :keyword shard: Optional Shard Index and Count, the Stats are written as the Shard's part
+    :keyword game_id: Optional Game ID, the Stats are written as the game's file
+    :return: Write Results
+    """
 
     logger = logging.getLogger(__name__)
-    logger.info('Processing Schedule File for %s Stats: %s', stat_type, schedule_key)
+    if kwargs.get('shard') or kwargs.get('game_id'):
+        logger.info('Writing Part to %s', output_key)
+        if isinstance(stats, SpillAccumulator):
+            return [WriteResult(output_key, stats.upload(client, bucket, output_key), False)]
+        return [WriteResult(output_key, write_part(client, bucket, output_key, stats), False)]
 
-    if stat_type not in ('players', 'games', 'teams'):
-        logging.error('Invalid Stats Type: %s', stat_type)
-        sys.exit(0)
+    logger.info('Writing Output to %s', output_key)
+    results = [write_output(stats, bucket, output_key, client, kwargs.get('force', False),
+                            ipc=kwargs.get('ipc'))]
+
+    if kwargs.get('dimensions') and stat_type in FACT_ENTITIES:
+        facts: polars.DataFrame | SpillAccumulator
+        if isinstance(stats, SpillAccumulator):
+            facts = SpillAccumulator(stats.budget, stats.directory)
+            for batch in stats.batches():
+                facts.append(update_dimensions(client, bucket, stat_type, batch))
+        else:
+            facts = update_dimensions(client, bucket, stat_type, stats)
+        facts_key = output_key.replace(stat_type, FACT_ENTITIES[stat_type], 1)
+        logger.info('Writing Facts to %s', facts_key)
+        results.append(write_output(facts, bucket, facts_key, client, kwargs.get('force', False),
+                                    ipc=kwargs.get('ipc')))
+    if kwargs.get('enrich'):
+        results.extend(enrich_week(stats, bucket, output_key, stat_type, client, **kwargs))
+    return results
+
+
+def enrich_week(stats: polars.DataFrame | SpillAccumulator, bucket: str, output_key: str,
+                stat_type: str, client: BaseClient, **kwargs) -> list[WriteResult]:
+    """
+    Writes the enriched Player and Team Stats of a week. Written Stats are joined to the Games of
+    their week once those exist; written Games enrich the Stats of the week already written, so
+    the entities can be downloaded in any order.
+    :param stats: Stats Data Frame that was written
+    :param bucket: S3 Bucket
+    :param output_key: S3 Key of the Stats week output
+    :param stat_type: Stats Type
+    :param client: S3 Client
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :keyword ipc: Optional Arrow IPC Compression of the copies written next to the outputs
+    :return: Write Results
+    """
 
-    session = Session()
-    schedule_frame = load_schedule_file(bucket, schedule_key, session)
+    if not WEEK_KEY_PATTERN.match(output_key) or \
+            (stat_type not in ENRICHED_ENTITIES and stat_type != 'games'):
+        return []
+
+    targets: dict[str, polars.DataFrame | SpillAccumulator | None]
+    if stat_type == 'games':
+        games: polars.DataFrame | None = polars.concat(stats.batches()) \
+            if isinstance(stats, SpillAccumulator) else stats
+        targets = {x: load_frame(client, bucket, output_key.replace('games', x, 1))[0]
+                   for x in ENRICHED_ENTITIES}
+    else:
+        games, _ = load_frame(client, bucket, output_key.replace(stat_type, 'games', 1))
+        targets = {stat_type: stats}
+    if games is None:
+        logging.getLogger(__name__).info('No Games for %s yet, enriched once they are written',
+                                         output_key)
+        return []
+
+    results = []
+    for entity, target in targets.items():
+        if target is None or len(target) == 0:
+            continue
+        key = get_enriched_key(output_key.replace(stat_type, entity, 1), entity)
+        logging.getLogger(__name__).info('Writing Enriched Stats to %s', key)
+        enriched = enrich_batches(target, games, entity) if isinstance(target, SpillAccumulator) \
+            else enrich_stats(target, games, entity)
+        results.append(write_output(enriched, bucket, key, client,
+                                    kwargs.get('force', False), ipc=kwargs.get('ipc')))
+    return results
+
+
+def process_prefix(bucket: str, prefix: str, stat_type: str, client: BaseClient, workers: int,
+                   **kwargs) -> list[WeekSummary]:
+    """
+    Processes every Schedule File under a Prefix in parallel. Each worker keeps a warm browser
+    and each week is written as soon as it completes.
+    :param bucket: S3 Bucket
+    :param prefix: S3 Key Prefix of the Schedule Files
+    :param stat_type: Stats Type
+    :param client: S3 Client shared by the workers
+    :param workers: Number of Schedule Files processed in parallel
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword checkpoint: Optional local directory or S3 URL for the per-game Checkpoints
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :keyword plan: Optional flag to defer unplayed games to the pending list
+    :return: Week Summaries
+    """
 
-    if schedule_frame is None or len(schedule_frame) == 0:
-        logger.warning('Schedule file is empty: %s', schedule_key)
-        sys.exit('No Schedule File Records')
+    logger = logging.getLogger(__name__)
+    schedule_keys = list_schedule_files(bucket, prefix, client)
+    if not schedule_keys:
+        logger.warning('No Schedule Files found under %s', prefix)
+        return []
+
+    summaries: list[WeekSummary] = []
+    with ServicePool(partial(SERVICES[stat_type], Fetcher.from_env()), workers) as pool, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_schedule, bucket, x, stat_type, client, pool,
+                                   **kwargs): x for x in schedule_keys}
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                logger.error('Failed to process Schedule File: %s : %s', futures[future], ex)
+                continue
+            if summary is not None:
+                summaries.append(summary)
+    return summaries
+
+
+def merge_output(stats: polars.DataFrame | SpillAccumulator, games: polars.DataFrame, bucket: str,
+                 output_key: str, client: BaseClient) -> polars.DataFrame | SpillAccumulator:
+    """
+    Merges the Stats of newly fetched games into the existing week output, replacing any earlier
+    rows of the same games. Team and Player Stats carry no Game ID and are matched on the team,
+    as a team plays once per week. The existing output of spilled Stats is downloaded and its kept
+    rows are added one batch at a time.
+    :param stats: Stats of the fetched games
+    :param games: Schedule Rows of the fetched games
+    :param bucket: S3 Bucket
+    :param output_key: S3 Key of the Stats output
+    :param client: S3 Client
+    :return: Merged Stats
+    """
 
-    frames: list[polars.DataFrame] = []
-    rows = schedule_frame.to_dicts()
-    frames.extend([compile_frames(x, stat_type) for x in rows])
-    frames = [x for x in frames if x is not None]
-    if not frames:
-        logger.warning('No %s Stats Loaded from Schedule File', stat_type)
-        sys.exit(0)
-    stats = polars.concat(frames, how='diagonal')
+    def keep(existing: polars.DataFrame) -> polars.DataFrame:
+        if 'game_id' in existing.columns:
+            game_ids = [str(x) for x in games['game_id'].to_list()]
+            return existing.filter(~polars.col('game_id').cast(polars.String).is_in(game_ids))
+        return existing.filter(~polars.col('team').is_in(games['home_team'].to_list()
+                                                         + games['away_team'].to_list()))
+
+    if isinstance(stats, SpillAccumulator):
+        path = os.path.join(stats.directory, 'existing.parquet')
+        if download_frame(client, bucket, output_key, path):
+            stats.append_parquet(path, keep)
+            os.remove(path)
+        return stats
+
+    existing, _ = load_frame(client, bucket, output_key)
+    if existing is None:
+        return stats
+    return polars.concat([keep(existing), stats], how='diagonal')
 
+
+def finalize_schedule(bucket: str, schedule_key: str, stat_type: str, client: BaseClient,
+                      count: int, **kwargs) -> WeekSummary | None:
+    """
+    Merges the parts written by every Shard into the canonical week output and removes the parts.
+    Nothing is merged until every Shard has written its part.
+    :param bucket: S3 Bucket
+    :param schedule_key: S3 Schedule File Key
+    :param stat_type: Stats Type
+    :param client: S3 Client
+    :param count: Number of Shards
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :keyword ipc: Optional Arrow IPC Compression of the copies written next to the outputs
+    :return: Week Summary, None when parts are missing
+    """
+
+    logger = logging.getLogger(__name__)
+    start = time.perf_counter()
     output_key = schedule_key.replace('schedules', stat_type)
+    parts = load_parts(client, bucket, output_key, count)
+    if parts is None:
+        logger.error('Missing parts for %s, every one of the %s Shards must complete first',
+                     output_key, count)
+        return None
 
-    logger.info('Writing Output to %s', output_key)
-    write_output(stats, bucket, output_key, session)
+    frames = [x for x in parts if len(x) > 0]
+    results = []
+    rows = 0
+    if frames:
+        stats = polars.concat(frames, how='diagonal')
+        rows = len(stats)
+        options = {x: y for x, y in kwargs.items() if x != 'shard'}
+        results = write_stats(stats, bucket, output_key, stat_type, client, **options)
+    delete_parts(client, bucket, output_key, count)
+
+    logger.info('Merged %s parts into %s', count, output_key)
+    return summarize(schedule_key, 0, rows, results, time.perf_counter() - start)
+
+
+def merge_games(bucket: str, schedule_key: str, stat_type: str, client: BaseClient,
+                **kwargs) -> WeekSummary | None:
+    """
+    Folds the game files written by per-game runs and the live poller into the week output,
+    replacing the earlier rows of their games, then removes the game files and any Manifest
+    Entries recorded for them. Only one merge may run for a week at a time.
+    :param bucket: S3 Bucket
+    :param schedule_key: S3 Schedule File Key
+    :param stat_type: Stats Type
+    :param client: S3 Client
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :keyword ipc: Optional Arrow IPC Compression of the copies written next to the outputs
+    :keyword enrich: Optional flag to write the Stats of the week pre-joined to its Games
+    :return: Week Summary, None when the week has no game files or no Schedule File
+    """
+
+    start = time.perf_counter()
+    output_key = schedule_key.replace('schedules', stat_type)
+    keys = list_game_files(client, bucket, output_key)
+    schedule_frame = load_schedule_file(bucket, schedule_key, client) if keys else None
+    if schedule_frame is None:
+        return None
+
+    frames = [x for x in (load_frame(client, bucket, y)[0] for y in keys)
+              if x is not None and len(x) > 0]
+    results: list[WriteResult] = []
+    rows = 0
+    if frames:
+        games = schedule_frame.filter(polars.col('game_id').cast(polars.String).is_in(
+            [x.rsplit('/', 1)[1].removesuffix('.parquet') for x in keys]))
+        stats = merge_output(polars.concat(frames, how='diagonal'), games, bucket, output_key,
+                             client)
+        rows = len(stats)
+        results = write_stats(stats, bucket, output_key, stat_type, client,
+                              **{x: y for x, y in kwargs.items() if x not in ('shard', 'game_id')})
+
+    delete_files(client, bucket, keys)
+    remove_entries(client, bucket, keys)
+    logging.getLogger(__name__).info('Merged %s game files into %s', len(keys), output_key)
+    return summarize(schedule_key, len(keys), rows, results, time.perf_counter() - start)
+
+
+def process_pending_lists(bucket: str, stat_type: str, client: BaseClient,
+                          **kwargs) -> list[WeekSummary]:
+    """
+    Processes every pending list of a Stats Type.
+    :param bucket: S3 Bucket
+    :param stat_type: Stats Type
+    :param client: S3 Client
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :return: Week Summaries
+    """
+
+    summaries = []
+    with ServicePool(partial(SERVICES[stat_type], Fetcher.from_env()), 1) as pool:
+        for key in list_schedule_files(bucket, f"{PENDING_PREFIX}/{stat_type}/", client):
+            summary = process_pending(bucket, key, stat_type, client, pool, **kwargs)
+            if summary is not None:
+                summaries.append(summary)
+    return summaries
+
+
+def log_summary(summaries: list[WeekSummary]) -> None:
+    """
+    Logs the Summary table of the processed Schedule Files.
+    :param summaries: Week Summaries
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    row_format = '%-45s %6s %8s %12s %9s %8s %8s %8s'
+    logger.info(row_format, 'Schedule', 'Games', 'Rows', 'Bytes', 'Seconds', 'Written', 'Skipped',
+                'Deferred')
+    for item in sorted(summaries):
+        logger.info(row_format, item.schedule_key, item.games, item.rows, item.size,
+                    f"{item.seconds:.1f}", item.written, item.skipped, item.deferred)
+    logger.info(row_format, 'Total', sum(x.games for x in summaries),
+                sum(x.rows for x in summaries), sum(x.size for x in summaries),
+                f"{sum(x.seconds for x in summaries):.1f}", sum(x.written for x in summaries),
+                sum(x.skipped for x in summaries), sum(x.deferred for x in summaries))
+
+
+def main(bucket: str, schedule_key: str | None, stat_type: str, **kwargs) -> None:
+    """
+    Main Function to pull Team Level Stats
+    :param bucket: S3 Bucket
+    :param schedule_key: S3 Schedule File Key, None when processing a year or prefix
+    :param stat_type: Stats Type, Player or Team
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword year: Optional Year to process every Schedule File for (schedules/{year}/)
+    :keyword prefix: Optional Prefix to process every Schedule File under
+    :keyword workers: Number of Schedule Files processed in parallel (default 4)
+    :keyword checkpoint: Optional local directory or S3 URL for the per-game Checkpoints
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :keyword ipc: Optional Arrow IPC Compression (uncompressed, lz4) of copies of the outputs
+    :keyword enrich: Optional flag to write the Player and Team Stats pre-joined to their Games
+    :keyword plan: Optional flag to defer unplayed games to the pending list
+    :keyword pending: Optional flag to fetch the pending games that have since been played
+    :keyword today: Optional Game Date of today (YYYYMMDD) used by the planner
+    :keyword shard_index: Optional Shard Index of this run
+    :keyword shard_count: Optional Number of Shards the games are split across
+    :keyword finalize: Optional flag to merge the Shard parts, or without a Shard Count the game
+        files, into the week outputs
+    :keyword deadline: Optional Seconds the run may take, unprocessed games are deferred
+    :keyword deadline_reserve: Seconds of the Deadline kept for writing the outputs (default 10)
+    :keyword memory_budget: Optional MiB of Stats held in memory per Schedule File before spilling
+    :keyword spill_dir: Optional directory of the spill files (default the temp dir)
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+
+    if stat_type not in SERVICES:
+        logging.error('Invalid Stats Type: %s', stat_type)
+        sys.exit(0)
+
+    shard_count = int(kwargs.get('shard_count') or 0)
+    shard_index = kwargs.get('shard_index')
+    if shard_index is not None and not 0 <= shard_index < shard_count:
+        sys.exit('Shard Index must be between 0 and the Shard Count')
+
+    client = create_client(Session())
+    options = {
+        'dimensions': kwargs.get('dimensions', False),
+        'checkpoint': kwargs.get('checkpoint'),
+        'force': kwargs.get('force', False),
+        'ipc': kwargs.get('ipc'),
+        'enrich': kwargs.get('enrich', False),
+        'plan': kwargs.get('plan', False),
+        'today': kwargs.get('today'),
+        'shard': (shard_index, shard_count) if shard_index is not None else None,
+        'deadline': Deadline(float(kwargs['deadline']), float(kwargs.get('deadline_reserve') or 10))
+        if kwargs.get('deadline') else None,
+        'memory_budget': int(kwargs['memory_budget'] * 1024 * 1024)
+        if kwargs.get('memory_budget') else None,
+        'spill_dir': kwargs.get('spill_dir')
+    }
+
+    if kwargs.get('pending'):
+        summaries = process_pending_lists(bucket, stat_type, client, **options)
+        if summaries:
+            log_summary(summaries)
+        compact_manifest(client, bucket)
+        logger.info('Done')
+        return
+
+    prefix = kwargs.get('prefix') or (f"schedules/{kwargs['year']}/" if kwargs.get('year') else '')
+    if kwargs.get('finalize'):
+        keys = list_schedule_files(bucket, prefix, client) if prefix else [str(schedule_key)]
+        if shard_count > 0:
+            finalized = [finalize_schedule(bucket, x, stat_type, client, shard_count, **options)
+                         for x in keys]
+        else:
+            finalized = [merge_games(bucket, x, stat_type, client, **options) for x in keys]
+        compact_manifest(client, bucket)
+        log_summary([x for x in finalized if x is not None])
+        if shard_count > 0 and None in finalized:
+            sys.exit('Missing Shard Parts')
+        logger.info('Done')
+        return
+
+    if not prefix:
+        with ServicePool(partial(SERVICES[stat_type], Fetcher.from_env()), 1) as pool:
+            summary = process_schedule(bucket, str(schedule_key), stat_type, client, pool,
+                                       **options)
+        compact_manifest(client, bucket)
+        if summary is None:
+            sys.exit('No Schedule File Records')
+        if summary.rows == 0:
+            sys.exit(0)
+        logger.info('Done')
+        return
+
+    summaries = process_prefix(bucket, prefix, stat_type, client, int(kwargs.get('workers') or 4),
+                               **options)
+    compact_manifest(client, bucket)
+    if not summaries:
+        sys.exit('No Schedule Files')
+
+    log_summary(summaries)
     logger.info('Done')
 
 
@@ -186,12 +957,18 @@ if __name__ == '__main__':
     logging.getLogger('botocore').setLevel(logging.FATAL)
     logging.getLogger('boto3').setLevel(logging.FATAL)
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-s", "--schedule", type=str,
-                        help='Schedule File S3 Key', required=True)
-    parser.add_argument('-b', '--bucket', type=str,
-                        help='Warehouse S3 Bucket', required=True)
-    parser.add_argument('-t', '--stat', type=str, help='Type of Stats to retrieve', required=True)
-
-    args = parser.parse_args()
-    main(args.bucket, args.schedule, args.stat)
+    args = ARGUMENTS
+    if args.metrics or args.metrics_json or args.metrics_file:
+        METRICS.enable(json_log=args.metrics_json)
+    try:
+        with profile_run(args.profile, f"s3://{args.bucket}/profiles", 'download_stats',
+                         lambda: create_client(Session())):
+            main(args.bucket, args.schedule, args.stat, dimensions=args.dimensions, year=args.year,
+                 prefix=args.prefix, workers=args.workers, checkpoint=args.checkpoint,
+                 force=args.force, ipc=args.ipc, enrich=args.enrich, plan=args.plan,
+                 pending=args.pending, shard_index=args.shard_index, shard_count=args.shard_count,
+                 finalize=args.finalize,
+                 deadline=args.deadline, deadline_reserve=args.deadline_reserve,
+                 memory_budget=args.memory_budget, spill_dir=args.spill_dir)
+    finally:
+        METRICS.report(args.metrics_file, 'download_stats')
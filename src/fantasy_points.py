@@ -0,0 +1,112 @@
+"""
+Scores the Player Stats of a Season under one or more Fantasy Scoring Configs.
+
+Every week output of the Player Stats is scored in a single pass and the Fantasy Points are written
+next to it, partitioned like the warehouse (fantasy/{year}/{game_type}/week_{week}.parquet), with
+one points column per config.
+"""
+
+import argparse
+import logging
+import sys
+
+import polars
+from boto3 import Session
+from botocore.client import BaseClient
+
+from download_stats import WriteResult, create_client, list_schedule_files, write_output
+from services.scoring import PLAYER_KEYS, PRESETS, WEEK_KEY_PATTERN, ScoringConfig, get_config, \
+    get_fantasy_key, score_players
+from services.storage import load_frame
+
+SOURCE_KEY = 'source_key'
+
+
+def load_season(bucket: str, year: int, client: BaseClient) -> polars.DataFrame | None:
+    """
+    Loads every week output of the Player Stats of a Season, tagged with its S3 Key.
+    :param bucket: S3 Bucket
+    :param year: Year Value
+    :param client: S3 Client
+    :return: Data Frame, None when the Season has no Player Stats
+    """
+
+    frames = []
+    for key in list_schedule_files(bucket, f"players/{year}/", client):
+        if not WEEK_KEY_PATTERN.match(key):
+            continue
+        frame, _ = load_frame(client, bucket, key)
+        if frame is not None and len(frame) > 0:
+            frames.append(frame.with_columns(polars.lit(key).alias(SOURCE_KEY)))
+    if not frames:
+        return None
+    return polars.concat(frames, how='diagonal_relaxed')
+
+
+def score_season(bucket: str, year: int, configs: list[ScoringConfig], client: BaseClient,
+                 force: bool = False) -> list[WriteResult]:
+    """
+    Scores the Player Stats of a Season and writes the Fantasy Points of each week.
+    :param bucket: S3 Bucket
+    :param year: Year Value
+    :param configs: Scoring Configs
+    :param client: S3 Client
+    :param force: Write the outputs even when the content has not changed
+    :return: Write Results
+    """
+
+    stats = load_season(bucket, year, client)
+    if stats is None:
+        logging.getLogger(__name__).warning('No Player Stats found for %s', year)
+        return []
+
+    scores = score_players(stats, configs, PLAYER_KEYS + [SOURCE_KEY])
+    logging.getLogger(__name__).info('Scored %s player games from %s Stats rows', len(scores),
+                                     len(stats))
+    results = []
+    for (key,), frame in sorted(scores.partition_by(SOURCE_KEY, as_dict=True).items()):
+        results.append(write_output(frame.drop(SOURCE_KEY), bucket, get_fantasy_key(str(key)),
+                                    client, force))
+    return results
+
+
+def main(bucket: str, year: int, **kwargs) -> None:
+    """
+    Main Function scoring the Player Stats of a Season
+    :param bucket: S3 Bucket
+    :param year: Year Value
+    :keyword configs: Preset names or JSON file paths of the Scoring Configs (default every preset)
+    :keyword force: Write the outputs even when the content has not changed
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    configs = [get_config(x) for x in kwargs.get('configs') or list(PRESETS)]
+    logger.info('Scoring %s Player Stats with %s', year, ', '.join(x.name for x in configs))
+
+    results = score_season(bucket, year, configs, create_client(Session()),
+                           bool(kwargs.get('force')))
+    if not results:
+        sys.exit('No Player Stats')
+    written = [x for x in results if not x.skipped]
+    logger.info('Written %s weeks, skipped %s unchanged', len(written),
+                len(results) - len(written))
+    logger.info('Done')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-b', '--bucket', type=str, help='Warehouse S3 Bucket', required=True)
+    parser.add_argument('-y', '--year', type=int, help='Year Value', required=True)
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Write the outputs even when the content has not changed')
+    parser.add_argument('-c', '--config', type=str, nargs='+', dest='configs',
+                        help=f"Scoring presets ({', '.join(PRESETS)}) or JSON config files "
+                             f"(default every preset)")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('botocore').setLevel(logging.FATAL)
+    logging.getLogger('boto3').setLevel(logging.FATAL)
+    main(args.bucket, args.year, configs=args.configs, force=args.force)
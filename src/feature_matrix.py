@@ -0,0 +1,141 @@
+"""
+Exports the Matchup Feature Matrix of a range of Seasons for model training.
+
+The Team Stats and the Games of every Season are loaded once and turned into the matrix in a single
+vectorized pass. The export is written under features/matchups/{start}-{end}/:
+
+* matrix.npy - float32 rows of home stats, away stats, deltas and the game values (row-major)
+* index.parquet - Row number, Game ID, year, game type, week and teams of each matrix row
+* columns.parquet - Position and name of each matrix column
+"""
+
+import argparse
+import logging
+import re
+import sys
+from datetime import date
+from io import BytesIO
+
+import polars
+from boto3 import Session
+from botocore.client import BaseClient
+
+from download_stats import create_client, list_schedule_files
+from services.features import create_matchups, encode_npy
+from services.metrics import METRICS
+from services.storage import load_frame
+
+EXPORT_PREFIX = 'features/matchups'
+
+
+def load_entity(bucket: str, entity: str, years: range, client: BaseClient) \
+        -> polars.DataFrame | None:
+    """
+    Loads every week output of an entity for a range of Seasons, skipping the game and shard
+    files.
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (teams, games)
+    :param years: Seasons
+    :param client: S3 Client
+    :return: Data Frame, None when the Seasons hold no rows
+    """
+
+    pattern = re.compile(rf"^{entity}/[^/]+/[^/]+/week_\d+\.parquet$")
+    frames = []
+    for year in years:
+        for key in list_schedule_files(bucket, f"{entity}/{year}/", client):
+            if not pattern.match(key):
+                continue
+            frame, _ = load_frame(client, bucket, key)
+            if frame is not None and len(frame) > 0:
+                frames.append(frame)
+    return polars.concat(frames, how='diagonal_relaxed') if frames else None
+
+
+def put_file(client: BaseClient, bucket: str, key: str, body: bytes) -> None:
+    """
+    Uploads an export file.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: S3 Key
+    :param body: File Content
+    :return: None
+    """
+    with METRICS.stage('upload') as timer:
+        timer.add(len(body))
+        client.put_object(Bucket=bucket, Key=key, Body=body)
+
+
+def export_matchups(bucket: str, years: range, client: BaseClient, prefix: str) -> int:
+    """
+    Builds and writes the Matchup Feature Matrix of a range of Seasons.
+    :param bucket: S3 Bucket
+    :param years: Seasons
+    :param client: S3 Client
+    :param prefix: S3 Prefix of the export
+    :return: Number of matrix rows, 0 when nothing was exported
+    """
+
+    logger = logging.getLogger(__name__)
+    teams = load_entity(bucket, 'teams', years, client)
+    games = load_entity(bucket, 'games', years, client)
+    if teams is None or games is None:
+        logger.warning('No Team Stats or Games found for %s to %s', years.start, years.stop - 1)
+        return 0
+
+    features, index = create_matchups(teams, games)
+    if len(features) == 0:
+        logger.warning('No Games matched the Team Stats of both sides')
+        return 0
+    logger.info('Built a %s x %s matrix from %s Team Stats rows and %s Games', len(features),
+                features.width, len(teams), len(games))
+
+    put_file(client, bucket, f"{prefix}/matrix.npy", encode_npy(features))
+    for name, frame in (('index', index),
+                        ('columns', polars.DataFrame({'column': range(features.width),
+                                                      'name': features.columns}))):
+        stream = BytesIO()
+        frame.write_parquet(stream)
+        put_file(client, bucket, f"{prefix}/{name}.parquet", stream.getvalue())
+    return len(features)
+
+
+def main(bucket: str, start_year: int, **kwargs) -> None:
+    """
+    Main Function exporting the Matchup Feature Matrix
+    :param bucket: S3 Bucket
+    :param start_year: First Season
+    :keyword end_year: Last Season (default the current year)
+    :keyword prefix: S3 Prefix of the export (default features/matchups/{start}-{end})
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    end_year = int(kwargs.get('end_year') or date.today().year)
+    if end_year < start_year:
+        sys.exit('End Year must not be before the Start Year')
+
+    prefix = (kwargs.get('prefix') or f"{EXPORT_PREFIX}/{start_year}-{end_year}").rstrip('/')
+    rows = export_matchups(bucket, range(start_year, end_year + 1), create_client(Session()),
+                           prefix)
+    if not rows:
+        sys.exit('No Matchups')
+    logger.info('Exported %s matchups to s3://%s/%s', rows, bucket, prefix)
+    logger.info('Done')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-b', '--bucket', type=str, help='Warehouse S3 Bucket', required=True)
+    parser.add_argument('-s', '--start-year', type=int, required=True, help='First Season')
+    parser.add_argument('-e', '--end-year', type=int, help='Last Season (default current year)')
+    parser.add_argument('-o', '--prefix', type=str,
+                        help='S3 Prefix of the export (default features/matchups/{start}-{end})')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('botocore').setLevel(logging.FATAL)
+    logging.getLogger('boto3').setLevel(logging.FATAL)
+    main(args.bucket, args.start_year, end_year=args.end_year, prefix=args.prefix)
@@ -0,0 +1,318 @@
+"""
+Materializes the rolling-window form tables of the Player and Team Stats.
+
+Each week output of the Stats gets a form partition ({entity}_form/{year}/{game_type}/week_{week}
+.parquet) holding the mean of every statistic over the last N games of each player or team. The
+job is incremental: only the weeks after the newest materialized week are read, their windows are
+seeded from a state file holding the last values of every key, and the state is advanced. The
+ETag of every source week is kept next to the state, so a week rewritten later (late games merged
+by the planner), or a late week older than the state, is materialized again together with every
+week after it, seeded from the weeks before it. A change of windows rebuilds the tables.
+"""
+
+import argparse
+import logging
+import re
+import sys
+from io import BytesIO
+
+import polars
+from boto3 import Session
+from botocore.client import BaseClient
+from botocore.exceptions import ClientError
+
+from download_stats import WriteResult, create_client, list_schedule_files, write_output
+from schedule_info_pull import get_game_types
+from services.form import DEFAULT_WINDOWS, ENTITY_KEYS, get_state, prepare_stats, rolling_form
+from services.storage import MISSING_CODES, load_frame
+
+SOURCE_KEY = 'source_key'
+STATE_FILE = '_state.parquet'
+SOURCES_FILE = '_sources.parquet'
+
+
+def get_week_order(key: str) -> tuple[int, int, int] | None:
+    """
+    Returns the Year, Game Type ID and Week of a week output Key
+    (players/2023/regular/week_1.parquet or players/2023/2/week_1.parquet).
+    :param key: S3 Key
+    :return: Year, Game Type ID and Week, None when the Key is not a week output
+    """
+
+    match = re.match(r'^[^/]+/(\d+)/([^/]+)/week_(\d+)\.parquet$', key)
+    if match is None:
+        return None
+    names = {x.game_type: x.type_id for x in get_game_types()}
+    if match.group(2) in names:
+        return int(match.group(1)), names[match.group(2)], int(match.group(3))
+    if match.group(2).isdigit():
+        return int(match.group(1)), int(match.group(2)), int(match.group(3))
+    return None
+
+
+def get_form_prefix(entity: str) -> str:
+    """
+    Returns the Prefix of the form table of an entity (players to player_form).
+    :param entity: Entity Name (players, teams)
+    :return: S3 Prefix
+    """
+    return f"{entity.removesuffix('s')}_form"
+
+
+def get_form_key(key: str, entity: str) -> str:
+    """
+    Returns the Key of the form partition of a week output
+    (players/2023/regular/week_1.parquet to player_form/2023/regular/week_1.parquet).
+    :param key: Week Output S3 Key
+    :param entity: Entity Name (players, teams)
+    :return: S3 Key
+    """
+    return key.replace(entity, get_form_prefix(entity), 1)
+
+
+def list_weeks(bucket: str, entity: str, client: BaseClient) -> list[tuple[tuple, str, str]]:
+    """
+    Lists the week outputs of an entity in game order, skipping the game and shard files.
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (players, teams)
+    :param client: S3 Client
+    :return: Week Order, S3 Key and ETag of every week
+    """
+
+    weeks = []
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{entity}/"):
+        for item in page.get('Contents', []):
+            order = get_week_order(item['Key'])
+            if order is not None:
+                weeks.append((order, item['Key'], item['ETag']))
+    return sorted(weeks)
+
+
+def load_state(bucket: str, entity: str, client: BaseClient) \
+        -> tuple[polars.DataFrame | None, dict]:
+    """
+    Loads the state of a form table along with its Metadata (windows and last week).
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (players, teams)
+    :param client: S3 Client
+    :return: Data Frame and Metadata, None and empty when the table was never built
+    """
+
+    try:
+        response = client.get_object(Bucket=bucket, Key=f"{get_form_prefix(entity)}/{STATE_FILE}")
+    except ClientError as ex:
+        if ex.response.get('Error', {}).get('Code') in MISSING_CODES:
+            return None, {}
+        raise ex
+    return polars.read_parquet(response['Body'].read()), response.get('Metadata', {})
+
+
+def load_sources(bucket: str, entity: str, client: BaseClient) -> dict[str, str] | None:
+    """
+    Loads the ETags of the source weeks the form table was built from.
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (players, teams)
+    :param client: S3 Client
+    :return: ETag by S3 Key, None when not recorded
+    """
+
+    sources, _ = load_frame(client, bucket, f"{get_form_prefix(entity)}/{SOURCES_FILE}")
+    if sources is None:
+        return None
+    return dict(zip(sources['key'].to_list(), sources['etag'].to_list()))
+
+
+def write_state(state: polars.DataFrame, bucket: str, entity: str, client: BaseClient,
+                metadata: dict, *, weeks: list[tuple[tuple, str, str]]) -> None:
+    """
+    Writes the state of a form table, then the ETags of the source weeks it was built from.
+    :param state: Last values of every key
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (players, teams)
+    :param client: S3 Client
+    :param metadata: Windows and last week of the state
+    :param weeks: Week Order, S3 Key and ETag of the source weeks
+    :return: None
+    """
+
+    prefix = get_form_prefix(entity)
+    stream = BytesIO()
+    state.write_parquet(stream)
+    client.put_object(Bucket=bucket, Key=f"{prefix}/{STATE_FILE}", Body=stream.getvalue(),
+                      Metadata=metadata)
+
+    stream = BytesIO()
+    polars.DataFrame({'key': [x[1] for x in weeks], 'etag': [x[2] for x in weeks]},
+                     schema={'key': polars.String, 'etag': polars.String}).write_parquet(stream)
+    client.put_object(Bucket=bucket, Key=f"{prefix}/{SOURCES_FILE}", Body=stream.getvalue())
+
+
+def get_missing(bucket: str, entity: str, weeks: list[tuple[tuple, str, str]],
+                client: BaseClient) -> set[str]:
+    """
+    Returns the week outputs without a form partition.
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (players, teams)
+    :param weeks: Week Order, S3 Key and ETag of the Stats weeks
+    :param client: S3 Client
+    :return: Set of S3 Keys
+    """
+
+    built = set(list_schedule_files(bucket, f"{get_form_prefix(entity)}/", client))
+    return {x for _, x, _ in weeks if get_form_key(x, entity) not in built}
+
+
+def get_pending(weeks: list[tuple[tuple, str, str]], metadata: dict, windows: list[int],
+                sources: dict[str, str], missing: set[str]) -> tuple[list[tuple[tuple, str, str]],
+                                                                     bool]:
+    """
+    Returns the weeks to materialize. Without a change they are the weeks after the state and
+    continue from it; a source week rewritten since the build, a late week older than the state
+    or a missing form partition restarts from that week.
+    :param weeks: Week Order, S3 Key and ETag of the Stats weeks
+    :param metadata: Metadata of the state
+    :param windows: Window sizes in games
+    :param sources: ETags of the source weeks the state was built from
+    :param missing: Keys of the week outputs without a form partition
+    :return: Weeks to materialize and whether their windows continue from the state
+    """
+
+    if metadata.get('windows') != ','.join(str(x) for x in windows):
+        return weeks, False
+    last = tuple(int(x) for x in metadata.get('last', '').split(',') if x)
+    changed = [order for order, key, etag in weeks
+               if order <= last and (sources.get(key) != etag or key in missing)]
+    if changed:
+        return [x for x in weeks if x[0] >= min(changed)], False
+    return [x for x in weeks if x[0] > last], True
+
+
+def load_weeks(bucket: str, entity: str, weeks: list[tuple[tuple, str, str]],
+               client: BaseClient) -> polars.DataFrame | None:
+    """
+    Loads the Stats of the weeks to materialize, tagged with their S3 Key.
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (players, teams)
+    :param weeks: Week Order, S3 Key and ETag of the weeks
+    :param client: S3 Client
+    :return: Prepared Stats, None when the weeks hold no rows
+    """
+
+    frames = []
+    for _, key, _ in weeks:
+        response = client.get_object(Bucket=bucket, Key=key)
+        frame = polars.read_parquet(response['Body'].read())
+        if len(frame) > 0:
+            frames.append(prepare_stats(frame, entity).with_columns(
+                polars.lit(key).alias(SOURCE_KEY)))
+    return polars.concat(frames, how='diagonal_relaxed') if frames else None
+
+
+def seed_history(bucket: str, entity: str, weeks: list[tuple[tuple, str, str]],
+                 windows: list[int], client: BaseClient) -> polars.DataFrame | None:
+    """
+    Rebuilds the state of the weeks before a restarted week from their Stats.
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (players, teams)
+    :param weeks: Week Order, S3 Key and ETag of the earlier weeks
+    :param windows: Window sizes in games
+    :param client: S3 Client
+    :return: Last values of every key, None without earlier Stats
+    """
+
+    stats = load_weeks(bucket, entity, weeks, client) if weeks else None
+    return get_state(stats.drop(SOURCE_KEY), entity, windows) if stats is not None else None
+
+
+def build_form(bucket: str, entity: str, windows: list[int], client: BaseClient,
+               **kwargs) -> list[WriteResult]:
+    """
+    Materializes the form partitions of the weeks not yet in the form table of an entity, and of
+    the weeks from the earliest source week rewritten since the last build.
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (players, teams)
+    :param windows: Window sizes in games
+    :param client: S3 Client
+    :keyword rebuild: Optional flag to rebuild the tables from the first week
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :return: Write Results
+    """
+
+    logger = logging.getLogger(__name__)
+    weeks = list_weeks(bucket, entity, client)
+    state, metadata = (None, {}) if kwargs.get('rebuild') \
+        else load_state(bucket, entity, client)
+    sources = load_sources(bucket, entity, client) if state is not None else None
+    pending, seeded = weeks, False
+    if state is not None and sources is not None:
+        pending, seeded = get_pending(weeks, metadata, windows, sources,
+                                      get_missing(bucket, entity, weeks, client))
+    if not pending:
+        logger.info('The %s form tables are up to date', entity)
+        return []
+    if not seeded:
+        logger.info('Building the %s form tables from %s of %s weeks', entity, len(pending),
+                    len(weeks))
+        state = seed_history(bucket, entity, [x for x in weeks if x[0] < pending[0][0]],
+                             windows, client)
+
+    stats = load_weeks(bucket, entity, pending, client)
+    if stats is None:
+        return []
+
+    form = rolling_form(stats, entity, windows, state)
+    logger.info('Computed %s %s form rows of %s weeks', len(form), entity, len(pending))
+    results = [write_output(frame.drop(SOURCE_KEY), bucket, get_form_key(str(key), entity),
+                            client, bool(kwargs.get('force')))
+               for (key,), frame in sorted(form.partition_by(SOURCE_KEY, as_dict=True).items())]
+    write_state(get_state(form.drop(SOURCE_KEY), entity, windows, state), bucket, entity, client,
+                {'windows': ','.join(str(x) for x in windows),
+                 'last': ','.join(str(x) for x in weeks[-1][0])}, weeks=weeks)
+    return results
+
+
+def main(bucket: str, **kwargs) -> None:
+    """
+    Main Function materializing the form tables
+    :param bucket: S3 Bucket
+    :keyword entities: Entities to build (default players and teams)
+    :keyword windows: Window sizes in games (default 3, 5 and 10)
+    :keyword rebuild: Optional flag to rebuild the tables from the first week
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    windows = sorted(set(kwargs.get('windows') or DEFAULT_WINDOWS))
+    if windows[0] < 1:
+        sys.exit(f"Invalid Window: {windows[0]}")
+
+    client = create_client(Session())
+    for entity in kwargs.get('entities') or list(ENTITY_KEYS):
+        results = build_form(bucket, entity, windows, client, rebuild=kwargs.get('rebuild'),
+                             force=kwargs.get('force'))
+        logger.info('Written %s %s form weeks', len([x for x in results if not x.skipped]),
+                    entity)
+    logger.info('Done')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-b', '--bucket', type=str, help='Warehouse S3 Bucket', required=True)
+    parser.add_argument('-e', '--entities', type=str, nargs='+', choices=list(ENTITY_KEYS),
+                        help='Entities to build (default players and teams)')
+    parser.add_argument('-n', '--windows', type=int, nargs='+',
+                        help='Window sizes in games (default 3 5 10)')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Write the outputs even when the content has not changed')
+    parser.add_argument('-r', '--rebuild', action='store_true',
+                        help='Rebuild the form tables from the first week')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('botocore').setLevel(logging.FATAL)
+    logging.getLogger('boto3').setLevel(logging.FATAL)
+    main(args.bucket, entities=args.entities, windows=args.windows, rebuild=args.rebuild,
+         force=args.force)
@@ -0,0 +1,341 @@
+"""
+Polls the Stats of the in-progress games of a Schedule File on game days.
+
+Each poll only loads the pages of live games, so page loads scale with the number of games in
+progress rather than the size of the Schedule File. A game is no longer polled once it is final,
+and its Stats are only rewritten when they changed since the previous poll. The changed games are
+written to their game files and folded into the week outputs at the end of each poll.
+"""
+
+import argparse
+import logging
+import signal
+import sys
+import threading
+from datetime import date
+from typing import cast
+
+import polars
+from boto3 import Session
+from botocore.client import BaseClient
+
+import download_stats
+from download_stats import WriteResult
+from services.changes import content_hash
+from services.fetch import Fetcher, FetchError
+from services.sharding import get_game_key, write_part
+from services.stats import BaseService, GameService, PlayerService, TeamService, \
+    BOXSCORE_URL, MATCHUP_URL
+
+LIVE_STATES = ('in', 'post')
+FINAL_STATE = 'post'
+PAGES = {
+    'matchup': MATCHUP_URL,
+    'boxscore': BOXSCORE_URL
+}
+
+
+def add_partitions(items: list[dict], week: int, year: int, game_type: str) -> list[dict]:
+    """
+    Adds the Week, Year and Type to each item.
+    :param items: Stats Rows
+    :param week: Week Number
+    :param year: Year Number
+    :param game_type: Game Type
+    :return: Stats Rows
+    """
+
+    return [{**x, 'week': week, 'year': year, 'game_type': game_type} for x in items]
+
+
+class LivePoller:  # pylint: disable=too-many-instance-attributes
+    """
+    Polls the games of a Schedule File and merges each game's changed Stats into the week outputs
+    through its game file.
+    """
+    bucket: str
+    schedule_key: str
+    stat_types: list[str]
+    client: BaseClient
+    today: str
+    probe_every: int
+    polls: int
+
+    def __init__(self, bucket: str, schedule_key: str, stat_types: list[str],
+                 client: BaseClient, **kwargs) -> None:
+        """
+        Live Poller Constructor.
+        :param bucket: S3 Bucket
+        :param schedule_key: S3 Schedule File Key
+        :param stat_types: Stats Types to refresh (teams, players, games)
+        :param client: S3 Client
+        :keyword today: Optional Game Date of today (YYYYMMDD)
+        :keyword probe_every: Polls between status checks of games not yet started (default 5)
+        """
+        self.bucket = bucket
+        self.schedule_key = schedule_key
+        self.stat_types = stat_types
+        self.client = client
+        self.today = kwargs.get('today') or date.today().strftime('%Y%m%d')
+        self.probe_every = max(int(kwargs.get('probe_every') or 5), 1)
+        self.polls = 0
+        self.states: dict[str, str] = {}
+        self.digests: dict[str, str] = {}
+        self.services: dict[str, BaseService] = {}
+        self.fetcher = Fetcher.from_env()
+
+    def _service_(self, page: str) -> BaseService:
+        """
+        Returns the Service loading a page, starting its browser on first use.
+        :param page: Page Name (matchup, boxscore)
+        :return: Service
+        """
+
+        if page not in self.services:
+            if page == 'boxscore':
+                self.services[page] = PlayerService(self.fetcher)
+            elif 'teams' in self.stat_types:
+                self.services[page] = TeamService(self.fetcher)
+            else:
+                self.services[page] = GameService(self.fetcher)
+        return self.services[page]
+
+    def is_due(self, row: dict) -> bool:
+        """
+        Checks if a game is polled this round. Live games are polled every round, final games are
+        never polled again and games not yet started are checked every few rounds from their game
+        date onwards.
+        :param row: Schedule Row
+        :return: True when the game is polled
+        """
+
+        state = self.states.get(str(row['game_id']), '')
+        if state == FINAL_STATE:
+            return False
+        if state == 'in':
+            return True
+        return str(row.get('game_date') or self.today) <= self.today \
+            and self.polls % self.probe_every == 0
+
+    def is_done(self, rows: list[dict]) -> bool:
+        """
+        Checks if no game in the Schedule File can still change today.
+        :param rows: Schedule Rows
+        :return: True when polling can stop
+        """
+
+        return all(self.states.get(str(x['game_id'])) == FINAL_STATE
+                   or str(x.get('game_date') or self.today) > self.today for x in rows)
+
+    def fetch_game(self, row: dict) -> tuple[str, dict[str, polars.DataFrame]]:
+        """
+        Loads the status page of a game and, once the game has started, its Stats. The Matchup page
+        both carries the status and the Team and Game Stats, so it is only loaded once.
+        :param row: Schedule Row
+        :return: Game State and the Stats by Stats Type
+        """
+
+        game_id = str(row['game_id'])
+        probe = 'matchup' if {'teams', 'games'} & set(self.stat_types) else 'boxscore'
+        payloads = {probe: self._service_(probe).get_stats_payload(
+            PAGES[probe].format(game_id=game_id))}
+
+        state = BaseService.get_game_state(payloads[probe]) or self.states.get(game_id, '')
+        if state not in LIVE_STATES:
+            return state, {}
+
+        if 'players' in self.stat_types and 'boxscore' not in payloads:
+            payloads['boxscore'] = self._service_('boxscore').get_stats_payload(
+                BOXSCORE_URL.format(game_id=game_id))
+        return state, self.parse_stats(row, payloads)
+
+    def parse_stats(self, row: dict, payloads: dict[str, dict | None]) \
+            -> dict[str, polars.DataFrame]:
+        """
+        Parses the Stats of a game from the loaded pages.
+        :param row: Schedule Row
+        :param payloads: Page Payloads by Page Name
+        :return: Stats by Stats Type
+        """
+
+        game_id, week, year, game_type = (str(row['game_id']), int(row['week']), int(row['year']),
+                                          str(row['game_type']))
+        matchup = payloads.get('matchup')
+        box_score = payloads.get('boxscore')
+        results = {}
+
+        if 'teams' in self.stat_types and matchup:
+            teams = cast(TeamService, self.services['matchup']).parse_team_stats(matchup)
+            if teams:
+                results['teams'] = polars.DataFrame(add_partitions(teams, week, year, game_type))
+        if 'games' in self.stat_types and matchup:
+            results['games'] = polars.DataFrame([
+                GameService.parse_game_info(matchup, game_id, week, year, game_type)
+            ])
+        if 'players' in self.stat_types and box_score:
+            players = cast(PlayerService, self.services['boxscore']).parse_player_stats(box_score)
+            if players:
+                results['players'] = polars.DataFrame(add_partitions(players, week, year,
+                                                                     game_type))
+        return results
+
+    def write_changes(self, game_id: str, frames: dict[str, polars.DataFrame]) \
+            -> list[WriteResult]:
+        """
+        Writes the game files whose Stats differ from the previous poll.
+        :param game_id: Game ID
+        :param frames: Stats by Stats Type
+        :return: Write Results
+        """
+
+        results = []
+        for stat_type, frame in frames.items():
+            key = get_game_key(self.schedule_key.replace('schedules', stat_type), game_id)
+            digest = content_hash(frame)
+            if self.digests.get(key) == digest:
+                results.append(WriteResult(key, 0, True))
+                continue
+            results.append(WriteResult(key, write_part(self.client, self.bucket, key, frame),
+                                       False))
+            self.digests[key] = digest
+        return results
+
+    def merge(self, results: list[WriteResult]) -> None:
+        """
+        Folds the game files written this poll into the week outputs of their Stats Types.
+        :param results: Write Results of the poll
+        :return: None
+        """
+
+        for stat_type in self.stat_types:
+            prefix = f"{stat_type}/"
+            if any(x.key.startswith(prefix) and not x.skipped for x in results):
+                download_stats.merge_games(self.bucket, self.schedule_key, stat_type, self.client)
+
+    def poll(self, rows: list[dict]) -> list[WriteResult]:
+        """
+        Refreshes the games due this round.
+        :param rows: Schedule Rows
+        :return: Write Results
+        """
+
+        due = [x for x in rows if self.is_due(x)]
+        results = []
+        for row in due:
+            game_id = str(row['game_id'])
+            try:
+                state, frames = self.fetch_game(row)
+            except FetchError as ex:
+                logging.getLogger(__name__).error('Skipping game %s this poll: %s', game_id, ex)
+                continue
+            results.extend(self.write_changes(game_id, frames))
+            if state != self.states.get(game_id, ''):
+                logging.getLogger(__name__).info('Game %s is now %s', game_id, state or 'unknown')
+            self.states[game_id] = state
+
+        self.merge(results)
+        self.polls += 1
+        written = [x for x in results if not x.skipped]
+        logging.getLogger(__name__).info(
+            'Poll %s: refreshed %s games, written %s outputs, skipped %s unchanged', self.polls,
+            len(due), len(written), len(results) - len(written))
+        return results
+
+    def close(self) -> None:
+        """
+        Releases the Services so their browsers are shut down.
+        :return: None
+        """
+        self.services.clear()
+
+
+def run(poller: LivePoller, rows: list[dict], stop: threading.Event, **kwargs) -> int:
+    """
+    Polls the games until every game is final or the Stop Event is set.
+    :param poller: Live Poller
+    :param rows: Schedule Rows
+    :param stop: Event signalling a graceful shutdown
+    :keyword interval: Seconds between polls (default 60)
+    :keyword max_polls: Optional number of polls before stopping
+    :return: Number of polls
+    """
+
+    interval = float(kwargs.get('interval') or 60)
+    max_polls = kwargs.get('max_polls')
+
+    while not stop.is_set() and (max_polls is None or poller.polls < max_polls):
+        poller.poll(rows)
+        if poller.is_done(rows):
+            logging.getLogger(__name__).info('Every game of the day is final')
+            break
+        stop.wait(interval)
+
+    poller.close()
+    return poller.polls
+
+
+def main(bucket: str, schedule_key: str, stat_types: list[str], **kwargs) -> None:
+    """
+    Main Function polling a Schedule File until its games are final or it receives SIGTERM or
+    SIGINT.
+    :param bucket: S3 Bucket
+    :param schedule_key: S3 Schedule File Key
+    :param stat_types: Stats Types to refresh
+    :keyword interval: Seconds between polls (default 60)
+    :keyword probe_every: Polls between status checks of games not yet started (default 5)
+    :keyword max_polls: Optional number of polls before stopping
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    if not bucket or not schedule_key:
+        logger.error('Bucket and Schedule File are required')
+        sys.exit()
+
+    invalid = [x for x in stat_types if x not in download_stats.SERVICES]
+    if invalid or not stat_types:
+        logger.error('Invalid Stats Type: %s', invalid)
+        sys.exit(0)
+
+    client = download_stats.create_client(Session())
+    schedule_frame = download_stats.load_schedule_file(bucket, schedule_key, client)
+    if schedule_frame is None or len(schedule_frame) == 0:
+        sys.exit('No Schedule File Records')
+
+    stop = threading.Event()
+
+    def shutdown(signum, _frame):
+        """
+        Stops polling once the current poll completes.
+        """
+        logger.info('Received signal %s, stopping after the current poll', signum)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    poller = LivePoller(bucket, schedule_key, stat_types, client,
+                        probe_every=kwargs.get('probe_every'))
+    run(poller, schedule_frame.to_dicts(), stop, interval=kwargs.get('interval'),
+        max_polls=kwargs.get('max_polls'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-s', '--schedule', type=str, required=True, help='Schedule File S3 Key')
+    parser.add_argument('-b', '--bucket', type=str, help='Warehouse S3 Bucket', required=True)
+    parser.add_argument('-t', '--types', type=str, nargs='+', default=['teams', 'players'],
+                        choices=list(download_stats.SERVICES), help='Stats Types to refresh')
+    parser.add_argument('-i', '--interval', type=float, default=60,
+                        help='Seconds between polls')
+    parser.add_argument('-e', '--probe-every', type=int, default=5,
+                        help='Polls between status checks of games not yet started')
+    parser.add_argument('-m', '--max-polls', type=int, help='Stop after N polls')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('botocore').setLevel(logging.FATAL)
+    logging.getLogger('boto3').setLevel(logging.FATAL)
+    main(args.bucket, args.schedule, args.types, interval=args.interval,
+         probe_every=args.probe_every, max_polls=args.max_polls)
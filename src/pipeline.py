@@ -0,0 +1,306 @@
+"""
+Pulls the Schedules of a Season and the Stats of their games in a single process.
+
+The Schedule pulls are the producers: each week is written to S3 as soon as it is retrieved and its
+Schedule Rows are handed straight to the Stats consumers, one task per Stats Type, without reading
+the Schedule File back. Stats are fetched while the later weeks' schedules are still loading. With
+enrichment, a week is enriched by one more task once every Stats task of the week has finished, so
+the Player and Team Stats are joined to the Games whatever order the types complete in.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from contextlib import ExitStack
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+
+import polars
+from boto3 import Session
+from botocore.client import BaseClient
+
+import download_stats
+import schedule_info_pull
+from download_stats import WeekSummary, WriteResult, create_client
+from schedule_info_pull import GameType
+from services import metrics, profiler
+from services.fetch import Fetcher
+from services.ipc import COMPRESSIONS
+from services.manifest import compact_manifest
+from services.metrics import METRICS
+from services.pool import ServiceBudget, ServicePool
+from services.profiler import profile_run
+from services.stats import ScheduleService
+from services.storage import load_frame
+
+ENRICH_TASK = 'enriched'
+
+
+class Pipeline:
+    """
+    Schedule producers feeding the Stats consumers.
+    """
+    bucket: str
+    workers: int
+
+    def __init__(self, bucket: str, client: BaseClient, stat_types: list[str], **kwargs) -> None:
+        """
+        Pipeline Constructor. The Schedule and Stats Pools share a Budget, so no more browsers
+        run than there are producer and consumer threads, whatever the number of Stats Types.
+        :param bucket: S3 Bucket
+        :param client: S3 Client shared by the workers
+        :param stat_types: Stats Types fetched for every week
+        :keyword schedule_workers: Number of Schedules fetched in parallel (default 2)
+        :keyword workers: Number of Stats Schedule Files processed in parallel (default 4)
+        :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+        :keyword force: Optional flag to write the outputs even when unchanged
+        :keyword ipc: Optional Arrow IPC Compression of the copies written next to the outputs
+        :keyword enrich: Optional flag to write the Player and Team Stats pre-joined to their Games
+        :keyword plan: Optional flag to defer unplayed games to the pending list
+        """
+        self.bucket = bucket
+        self.client = client
+        self.workers = int(kwargs.pop('workers', None) or 4)
+        schedule_workers = int(kwargs.pop('schedule_workers', None) or 2)
+        fetcher = Fetcher.from_env()
+        budget = ServiceBudget(schedule_workers + self.workers)
+        self.schedule_pool = ServicePool(partial(ScheduleService, fetcher), schedule_workers,
+                                         budget)
+        self.pools = {x: ServicePool(partial(download_stats.SERVICES[x], fetcher),
+                                     self.workers, budget) for x in stat_types}
+        self.options = kwargs
+        self.tasks: dict[Future, tuple[str, str]] = {}
+        self.summaries: list[WeekSummary] = []
+        self.started = time.perf_counter()
+
+    def pull_schedule(self, year: int, task: tuple[GameType, int]) \
+            -> tuple[str, polars.DataFrame | None]:
+        """
+        Retrieves and writes the Schedule of a week.
+        :param year: Year Value
+        :param task: Game Type and Week
+        :return: S3 Key and Schedule Rows, None when the schedule could not be retrieved
+        """
+
+        game_type, week = task
+        key = schedule_info_pull.get_schedule_key(year, game_type, week)
+        records = schedule_info_pull.fetch_schedule(year, week, game_type.type_id,
+                                                    self.schedule_pool)
+        if not records:
+            logging.getLogger(__name__).error('Failed to retrieve Schedule for Type %s : Week %s',
+                                              game_type.game_type, week)
+            return key, None
+        schedule_info_pull.write_output(self.bucket, key, records, self.client,
+                                        bool(self.options.get('force')),
+                                        ipc=self.options.get('ipc'))
+        return key, polars.DataFrame(records)
+
+    def run(self, year: int, tasks: list[tuple[GameType, int]]) -> list[WeekSummary]:
+        """
+        Runs the Schedule producers and the Stats consumers until every week is processed.
+        :param year: Year Value
+        :param tasks: Game Type and Week combinations
+        :return: Week Summaries
+        """
+
+        self.started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.schedule_pool.size,
+                                thread_name_prefix='schedule') as producers, \
+                ThreadPoolExecutor(max_workers=self.workers,
+                                   thread_name_prefix='stats') as consumers:
+            schedules = {producers.submit(self.pull_schedule, year, x) for x in tasks}
+            pending = set(schedules)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in schedules:
+                        pending |= self.dispatch(future, consumers)
+                    else:
+                        pending |= self.collect(future, consumers)
+        return self.summaries
+
+    def dispatch(self, future: Future, consumers: ThreadPoolExecutor) -> set[Future]:
+        """
+        Hands a retrieved Schedule to the Stats consumers, one task per Stats Type. The tasks do
+        not enrich the week themselves, it is enriched once all of them have finished.
+        :param future: Completed Schedule pull
+        :param consumers: Executor of the Stats tasks
+        :return: Submitted Stats tasks
+        """
+
+        try:
+            schedule_key, frame = future.result()
+        except Exception as ex:  # pylint: disable=broad-exception-caught
+            logging.getLogger(__name__).error('Failed to pull Schedule: %s', ex)
+            return set()
+        if frame is None:
+            return set()
+
+        options = {x: y for x, y in self.options.items() if x != 'enrich'}
+        submitted = set()
+        for stat_type, pool in self.pools.items():
+            task = consumers.submit(download_stats.process_schedule, self.bucket, schedule_key,
+                                    stat_type, self.client, pool, schedule=frame, **options)
+            self.tasks[task] = (schedule_key, stat_type)
+            submitted.add(task)
+        return submitted
+
+    def collect(self, future: Future, consumers: ThreadPoolExecutor) -> set[Future]:
+        """
+        Collects the Week Summary of a completed Stats task. Once the last Stats task of a week has
+        finished, the enrichment of the week is submitted.
+        :param future: Completed Stats or enrichment task
+        :param consumers: Executor of the Stats tasks
+        :return: Submitted enrichment task
+        """
+
+        logger = logging.getLogger(__name__)
+        schedule_key, stat_type = self.tasks.pop(future)
+        try:
+            result = future.result()
+        except Exception as ex:  # pylint: disable=broad-exception-caught
+            logger.error('Failed to process %s Stats: %s : %s', stat_type, schedule_key, ex)
+            result = None
+        if isinstance(result, WeekSummary):
+            if not self.summaries:
+                logger.info('First Stats written after %.1f seconds',
+                            time.perf_counter() - self.started)
+            self.summaries.append(result)
+
+        if stat_type == ENRICH_TASK or not self.options.get('enrich') or \
+                any(x == schedule_key for x, _ in self.tasks.values()):
+            return set()
+        task = consumers.submit(self.enrich, schedule_key)
+        self.tasks[task] = (schedule_key, ENRICH_TASK)
+        return {task}
+
+    def enrich(self, schedule_key: str) -> list[WriteResult]:
+        """
+        Writes the enriched Player and Team Stats of a week from the written Games and Stats.
+        :param schedule_key: S3 Schedule File Key of the week
+        :return: Write Results
+        """
+
+        games_key = schedule_key.replace('schedules', 'games', 1)
+        games, _ = load_frame(self.client, self.bucket, games_key)
+        if games is None:
+            logging.getLogger(__name__).warning('No Games written for %s, Stats not enriched',
+                                                schedule_key)
+            return []
+        return download_stats.enrich_week(games, self.bucket, games_key, 'games', self.client,
+                                          force=self.options.get('force', False),
+                                          ipc=self.options.get('ipc'))
+
+    def close(self) -> None:
+        """
+        Quits the browsers of the Services.
+        :return: None
+        """
+        with ExitStack() as stack:
+            stack.enter_context(self.schedule_pool)
+            for pool in self.pools.values():
+                stack.enter_context(pool)
+
+    def __enter__(self) -> 'Pipeline':
+        """
+        Enters the Pipeline.
+        :return: Pipeline
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Quits the browsers of the Services on leaving the block.
+        :return: None
+        """
+        self.close()
+
+
+def main(bucket: str, year: int, **kwargs) -> None:
+    """
+    Main Function pulling the Schedules and the Stats of a Season
+    :param bucket: S3 Bucket
+    :param year: Year Value
+    :keyword week: Optional Week Value
+    :keyword type: Optional Game Type
+    :keyword stats: Stats Types to fetch (default every Stats Type)
+    :keyword schedule_workers: Number of Schedules fetched in parallel (default 2)
+    :keyword workers: Number of Stats Schedule Files processed in parallel (default 4)
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :keyword force: Optional flag to write the outputs even when unchanged
+    :keyword ipc: Optional Arrow IPC Compression (uncompressed, lz4) of copies of the outputs
+    :keyword enrich: Optional flag to write the Player and Team Stats pre-joined to their Games
+    :keyword plan: Optional flag to defer unplayed games to the pending list
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    stat_types = kwargs.get('stats') or list(download_stats.SERVICES)
+    invalid = [x for x in stat_types if x not in download_stats.SERVICES]
+    if invalid:
+        sys.exit(f"Invalid Stats Type: {', '.join(invalid)}")
+
+    tasks = schedule_info_pull.get_tasks(year, int(kwargs.get('type') or 0),
+                                         int(kwargs.get('week') or 0))
+    logger.info('Pulling %s Schedules of %s with %s Stats', len(tasks), year,
+                ', '.join(stat_types))
+    client = create_client(Session())
+    try:
+        with Pipeline(bucket, client, stat_types, schedule_workers=kwargs.get('schedule_workers'),
+                      workers=kwargs.get('workers'), dimensions=kwargs.get('dimensions', False),
+                      force=kwargs.get('force', False), ipc=kwargs.get('ipc'),
+                      enrich=kwargs.get('enrich', False), plan=kwargs.get('plan', False)) \
+                as runner:
+            summaries = runner.run(year, tasks)
+    finally:
+        compact_manifest(client, bucket)
+    if not summaries:
+        sys.exit('No Stats Loaded')
+
+    download_stats.log_summary(summaries)
+    logger.info('Pipeline took %.1f seconds', time.perf_counter() - runner.started)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-y', '--year', type=int, help='Year Value', required=True)
+    parser.add_argument('-b', '--bucket', type=str, help='Warehouse S3 Bucket', required=True)
+    parser.add_argument('-t', '--type', type=int, help='Game Type')
+    parser.add_argument('-w', '--week', type=int, help='Week Value')
+    parser.add_argument('-s', '--stats', type=str, nargs='+',
+                        choices=list(download_stats.SERVICES),
+                        help='Types of Stats to retrieve (default every type)')
+    parser.add_argument('--schedule-workers', type=int, default=2,
+                        help='Number of Schedules fetched in parallel')
+    parser.add_argument('-j', '--workers', type=int, default=4,
+                        help='Number of Stats Schedule Files processed in parallel')
+    parser.add_argument('-d', '--dimensions', action='store_true',
+                        help='Upsert the Dimension tables and write the slim Fact table')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Write the outputs even when the content has not changed')
+    parser.add_argument('--ipc', type=str, choices=COMPRESSIONS,
+                        help='Also write an Arrow IPC copy of the outputs with this compression')
+    parser.add_argument('-e', '--enrich', action='store_true',
+                        help='Also write the Player and Team Stats pre-joined to their Games')
+    parser.add_argument('--plan', action='store_true',
+                        help='Defer unplayed games to the pending list instead of fetching them')
+    metrics.add_arguments(parser)
+    profiler.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('botocore').setLevel(logging.FATAL)
+    logging.getLogger('boto3').setLevel(logging.FATAL)
+    if any([args.metrics, args.metrics_json, args.metrics_file]):
+        METRICS.enable(json_log=args.metrics_json)
+    try:
+        with profile_run(args.profile, f"s3://{args.bucket}/profiles", 'pipeline',
+                         lambda: create_client(Session())):
+            main(args.bucket, args.year, week=args.week, type=args.type, stats=args.stats,
+                 schedule_workers=args.schedule_workers, workers=args.workers,
+                 dimensions=args.dimensions, force=args.force, ipc=args.ipc,
+                 enrich=args.enrich, plan=args.plan)
+    finally:
+        METRICS.report(args.metrics_file, 'pipeline')
@@ -1,21 +1,39 @@
 """
 Script to pull Game information and combine in a single parquet file.
 """
-import argparse
 import logging
 import os
 import os.path
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from io import BytesIO
 from typing import NamedTuple
 
+if __name__ == '__main__':
+    # Parsed before the heavy imports below, so --help and usage errors return immediately
+    from services.arguments import create_schedule_parser
+    ARGUMENTS = create_schedule_parser().parse_args()
+
+# pylint: disable=ungrouped-imports
 import polars
 from boto3 import Session
 from botocore.client import BaseClient
 from botocore.exceptions import ClientError
 
+from services.changes import DIGEST_METADATA, content_hash, is_unchanged
+from services.fetch import Fetcher, FetchError
+from services.ipc import refresh_ipc, write_ipc
+from services.manifest import compact_manifest, create_entry, update_manifest
+from services.metrics import METRICS
+from services.profiler import profile_run
+from services.pool import ServicePool
 from services.stats import ScheduleService
 
+# Captured for the planner of the run that pulled the schedule, but not persisted: the state
+# changes on game day and would rewrite the schedule files and change the schema read by the Stats
+TRANSIENT_COLUMNS = ['status']
+
 
 class GameType(NamedTuple):
     """
@@ -50,15 +68,28 @@ def get_game_types() -> list[GameType]:
     ]
 
 
-def get_schedule(year: int, week: int, game_type: int) -> list[dict]:
+def get_schedule_key(year: int, game_type: GameType, week: int) -> str:
+    """
+    Returns the Key of the Schedule File of a week (schedules/2023/regular/week_1.parquet).
+    :param year: Year Value
+    :param game_type: Game Type
+    :param week: Week Number
+    :return: S3 Key
+    """
+    return f"schedules/{year}/{game_type.game_type}/week_{week}.parquet"
+
+
+def get_schedule(year: int, week: int, game_type: int,
+                 service: ScheduleService | None = None) -> list[dict]:
     """
     Retrieves the Schedule for a given Season Week.
     :param year: Year Value
     :param week: Week Value
     :param game_type: Game Type
+    :param service: Optional warm ScheduleService to reuse
     :return: List of Game Stats
     """
-    service = ScheduleService()
+    service = service or ScheduleService()
     return service.get_schedule(week, year, game_type)
 
 
@@ -84,26 +115,129 @@ def get_weeks(year: int, game_type: int) -> list[int]:
     return list(range(1, 19))
 
 
-def write_output(bucket: str, key: str, records: list[dict], session: Session) -> None:
+def get_tasks(year: int, game_type: int, week_number: int) -> list[tuple[GameType, int]]:
     """
-    Writes the Output Parquet File to S3 Storage
+    Returns the Game Type and Week combinations to retrieve.
+    :param year: Year Value
+    :param game_type: Optional Game Type, 0 for all types
+    :param week_number: Optional Week Value, 0 for all weeks
+    :return: List of Game Type and Week tuples
+    """
+
+    game_types = get_game_types()
+    if game_type and game_type != 0:
+        game_types = [x for x in game_types if x.type_id == game_type]
+
+    tasks = []
+    for gt in game_types:
+        weeks = get_weeks(year, gt.type_id)
+        if week_number and week_number != 0:
+            weeks = [int(week_number)]
+        tasks.extend([(gt, wk) for wk in weeks])
+    return tasks
+
+
+def fetch_schedule(year: int, week: int, game_type: int, pool: ServicePool) -> list[dict]:
+    """
+    Retrieves the Schedule for a given Season Week using a Service from the Pool.
+    :param year: Year Value
+    :param week: Week Value
+    :param game_type: Game Type
+    :param pool: Pool of warm ScheduleServices
+    :return: List of Game Stats, empty when the page failed to load
+    """
+
+    with pool.borrow() as service:
+        try:
+            return get_schedule(year, week, game_type, service)
+        except FetchError as ex:
+            logging.getLogger(__name__).error('Schedule page failed: %s', ex)
+            return []
+
+
+def write_output(bucket: str, key: str, records: list[dict], client: BaseClient,
+                 force: bool = False, *, ipc: str | None = None) -> bool:
+    """
+    Writes the Output Parquet File to S3 Storage and records it in the Manifest. The upload is
+    skipped when the stored schedule already holds the same content. The transient columns, such
+    as the game status, are not written.
     :param bucket: S3 Bucket
     :param key: S3 Key
     :param records: Records
-    :param session: Boto3 Session
-    :return: None
+    :param client: S3 Client
+    :param force: Write the output even when the content has not changed
+    :param ipc: Optional Arrow IPC Compression (uncompressed, lz4) of a copy written next to it,
+        also written for an unchanged schedule whose copy is missing or stale
+    :return: True when the output was written, False when skipped
     """
 
-    client = create_client(session)
     stream = BytesIO()
-    frame = polars.DataFrame(records)
+    with METRICS.stage('frame') as timer:
+        timer.add(rows=len(records))
+        frame = polars.DataFrame(records).drop(TRANSIENT_COLUMNS, strict=False)
+    with METRICS.stage('digest') as timer:
+        timer.add(rows=len(frame))
+        digest = content_hash(frame)
 
     try:
-        frame.write_parquet(stream, compression='snappy')
-        client.put_object(Bucket=bucket, Key=key, Body=stream.getvalue())
+        if not force and is_unchanged(client, bucket, key, digest):
+            logging.getLogger(__name__).info('Schedule unchanged, skipping %s', key)
+            if ipc:
+                refresh_ipc(client, bucket, key, frame, ipc, digest=digest)
+            return False
+
+        with METRICS.stage('encode') as timer:
+            frame.write_parquet(stream, compression='snappy')
+            body = stream.getvalue()
+            timer.add(len(body), len(frame))
+        with METRICS.stage('upload') as timer:
+            client.put_object(Bucket=bucket, Key=key, Body=body,
+                              Metadata={DIGEST_METADATA: digest})
+            timer.add(len(body))
+        with METRICS.stage('manifest'):
+            update_manifest(client, bucket, [create_entry(key, frame, len(body))])
+        if ipc:
+            write_ipc(client, bucket, key, frame, ipc, digest=digest)
     except ClientError as ex:
         logging.error('Failed to write schedule parquet: %s : %s', key, ex.args)
         raise ex
+    return True
+
+
+def pull_schedules(bucket: str, year: int, tasks: list[tuple[GameType, int]],
+                   client: BaseClient, **kwargs) -> list[bool]:
+    """
+    Retrieves the Schedules for the Game Type and Week combinations in parallel and writes each
+    one as soon as it is retrieved.
+    :param bucket: S3 Bucket
+    :param year: Year Value
+    :param tasks: Game Type and Week combinations
+    :param client: S3 Client
+    :keyword workers: Number of Weeks fetched in parallel (default 4)
+    :keyword force: Write the schedules even when the content has not changed
+    :keyword ipc: Optional Arrow IPC Compression of the copies written next to the schedules
+    :return: List of write results, True when written and False when skipped
+    """
+
+    logger = logging.getLogger(__name__)
+    results: list[bool] = []
+    with ServicePool(partial(ScheduleService, Fetcher.from_env()),
+                     int(kwargs.get('workers') or 4)) as pool, \
+            ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = {executor.submit(fetch_schedule, year, x[1], x[0].type_id, pool): x
+                   for x in tasks}
+        for future in as_completed(futures):
+            gt, wk = futures[future]
+            output_key = get_schedule_key(year, gt, wk)
+            records = future.result()
+            if not records:
+                logger.error('Failed to retrieve Schedule for Type %s : Week %s', gt.game_type, wk)
+                continue
+
+            logger.info('Writing Output %s', output_key)
+            results.append(write_output(bucket, output_key, records, client,
+                                        bool(kwargs.get('force')), ipc=kwargs.get('ipc')))
+    return results
 
 
 def main(bucket: str, year: int, **kwargs) -> None:
@@ -113,15 +247,14 @@ def main(bucket: str, year: int, **kwargs) -> None:
     :param year: Year Value
     :keyword week: Optional Week Value
     :keyword type: Optional Game Type
+    :keyword workers: Number of Weeks fetched in parallel (default 4)
+    :keyword force: Write the schedules even when the content has not changed
+    :keyword ipc: Optional Arrow IPC Compression (uncompressed, lz4) of copies of the schedules
     :return: None
     """
 
     logger = logging.getLogger(__name__)
 
-    week_number = int(kwargs.get('week', 0))
-    game_type = int(kwargs.get('type', 0))
-    session = Session()
-
     if not year:
         logger.error('Year Value is Missing')
         sys.exit()
@@ -130,25 +263,14 @@ def main(bucket: str, year: int, **kwargs) -> None:
         logger.error('Output Bucket is Missing')
         sys.exit()
 
-    game_types = get_game_types()
-    if game_type and game_type != 0:
-        game_types = [x for x in game_types if x.type_id == game_type]
+    client = create_client(Session())
+    tasks = get_tasks(year, int(kwargs.get('type') or 0), int(kwargs.get('week') or 0))
 
     logger.info('Retrieving Schedule for %s', year)
-    for gt in game_types:
-        weeks = get_weeks(year, gt.type_id)
-        if week_number and week_number != 0:
-            weeks = [int(week_number)]
-
-        for wk in weeks:
-            output_key = f"schedules/{year}/{gt.game_type}/week_{wk}.parquet"
-            records = get_schedule(year, wk, gt.type_id)
-            if not records:
-                logger.error('Failed to retrieve Schedule for Type %s : Week %s', gt.game_type, wk)
-                continue
-
-            logger.info('Writing Output %s', output_key)
-            write_output(bucket, output_key, records, session)
+    results = pull_schedules(bucket, year, tasks, client, **kwargs)
+    compact_manifest(client, bucket)
+    logger.info('Written %s schedules, skipped %s unchanged', results.count(True),
+                results.count(False))
     logger.info('Done')
 
 
@@ -156,12 +278,15 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     logging.getLogger('botocore').setLevel(logging.FATAL)
     logging.getLogger('boto3').setLevel(logging.FATAL)
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-y", "--year", type=int, help="Year Value", required=True)
-    parser.add_argument("-b", "--bucket", type=str, help="Output Bucket", required=True)
-    parser.add_argument('-t', '--type', type=int, help='Game Type', required=False)
-    parser.add_argument('-w', '--week', type=str, help='Week Value', required=False)
-
-    args = parser.parse_args()
+    args = ARGUMENTS
     cli_args = vars(args)
-    main(**cli_args)
+    metrics_file = cli_args.pop('metrics_file')
+    if cli_args.pop('metrics') or cli_args['metrics_json'] or metrics_file:
+        METRICS.enable(json_log=cli_args['metrics_json'])
+    cli_args.pop('metrics_json')
+    try:
+        with profile_run(cli_args.pop('profile'), f"s3://{args.bucket}/profiles",
+                         'schedule_info_pull', lambda: create_client(Session())):
+            main(**cli_args)
+    finally:
+        METRICS.report(metrics_file, 'schedule_info_pull')
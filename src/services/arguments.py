@@ -0,0 +1,87 @@
+"""
+Argument Parsers of the Stats and Schedule scripts.
+
+The parsers only depend on the standard library and the Metrics and Profiler options, so a script
+parses its arguments before importing polars, boto3 and the Services: --help and usage errors
+return without loading them.
+"""
+
+import argparse
+
+from services import metrics, profiler
+
+IPC_COMPRESSIONS = ('uncompressed', 'lz4')
+
+
+def create_stats_parser() -> argparse.ArgumentParser:
+    """
+    Creates the Argument Parser of download_stats.py.
+    :return: Argument Parser
+    """
+
+    parser = argparse.ArgumentParser()
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("-s", "--schedule", type=str, help='Schedule File S3 Key')
+    source.add_argument('-y', '--year', type=int,
+                        help='Process every Schedule File for the Year')
+    source.add_argument('-p', '--prefix', type=str,
+                        help='Process every Schedule File under the S3 Prefix')
+    source.add_argument('-n', '--pending', action='store_true',
+                        help='Fetch the deferred games that have since been played')
+    parser.add_argument('-b', '--bucket', type=str,
+                        help='Warehouse S3 Bucket', required=True)
+    parser.add_argument('-t', '--stat', type=str, help='Type of Stats to retrieve', required=True)
+    parser.add_argument('-d', '--dimensions', action='store_true',
+                        help='Upsert the Dimension tables and write the slim Fact table')
+    parser.add_argument('-j', '--workers', type=int, default=4,
+                        help='Number of Schedule Files processed in parallel')
+    parser.add_argument('-c', '--checkpoint', type=str,
+                        help='Local directory or s3://bucket/prefix for per-game checkpoints')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Write the outputs even when the content has not changed')
+    parser.add_argument('--plan', action='store_true',
+                        help='Defer unplayed games to the pending list instead of fetching them')
+    parser.add_argument('--ipc', type=str, choices=IPC_COMPRESSIONS,
+                        help='Also write an Arrow IPC copy of the outputs with this compression')
+    parser.add_argument('-e', '--enrich', action='store_true',
+                        help='Also write the Player and Team Stats pre-joined to their Games')
+    parser.add_argument('--shard-index', type=int,
+                        help='Shard of the games processed by this run (0 to count - 1)')
+    parser.add_argument('--shard-count', type=int,
+                        help='Number of Shards the games are split across')
+    parser.add_argument('--finalize', action='store_true',
+                        help='Merge the Shard parts, or the game files without --shard-count, '
+                             'into the week outputs')
+    parser.add_argument('--deadline', type=float,
+                        help='Seconds the run may take before unprocessed games are deferred')
+    parser.add_argument('--deadline-reserve', type=float, default=10,
+                        help='Seconds of the deadline kept for writing the outputs')
+    parser.add_argument('--memory-budget', type=float,
+                        help='MiB of Stats held in memory before spilling to disk')
+    parser.add_argument('--spill-dir', type=str,
+                        help='Directory of the spill files (default the temp directory)')
+    metrics.add_arguments(parser)
+    profiler.add_arguments(parser)
+    return parser
+
+
+def create_schedule_parser() -> argparse.ArgumentParser:
+    """
+    Creates the Argument Parser of schedule_info_pull.py.
+    :return: Argument Parser
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-y", "--year", type=int, help="Year Value", required=True)
+    parser.add_argument("-b", "--bucket", type=str, help="Output Bucket", required=True)
+    parser.add_argument('-t', '--type', type=int, help='Game Type', required=False)
+    parser.add_argument('-w', '--week', type=str, help='Week Value', required=False)
+    parser.add_argument('-j', '--workers', type=int, default=4,
+                        help='Number of Weeks fetched in parallel')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Write the schedules even when the content has not changed')
+    parser.add_argument('--ipc', type=str, choices=IPC_COMPRESSIONS,
+                        help='Also write an Arrow IPC copy of the schedules with this compression')
+    metrics.add_arguments(parser)
+    profiler.add_arguments(parser)
+    return parser
@@ -0,0 +1,22 @@
+"""
+Backoff delays shared by the retrying Services.
+
+The Fetcher retries page loads and the Storage helpers retry conflicting conditional writes, both
+with the same full jitter exponential backoff.
+"""
+
+import random
+from typing import Callable
+
+
+def backoff_delay(attempt: int, base: float, cap: float,
+                  rand: Callable[[float, float], float] = random.uniform) -> float:
+    """
+    Returns the full jitter backoff delay of a retry.
+    :param attempt: Zero based Retry Attempt
+    :param base: Seconds of the first backoff
+    :param cap: Maximum Seconds of a backoff
+    :param rand: Function returning a random number between two bounds
+    :return: Seconds
+    """
+    return rand(0.0, min(cap, base * 2 ** attempt))
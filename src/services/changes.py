@@ -0,0 +1,90 @@
+"""
+Change Detection for Warehouse outputs.
+
+Each output is stored with a digest of its content in the object metadata. Before rewriting an
+output the new digest is compared with the stored one and the upload is skipped when the content
+has not changed, so downstream caches are not invalidated by identical rewrites.
+"""
+
+import hashlib
+
+import polars
+from botocore.client import BaseClient
+from botocore.exceptions import ClientError
+
+from services.storage import MISSING_CODES
+
+DIGEST_METADATA = 'content-sha256'
+ROW_MODULUS = 1 << 256
+
+
+def hash_rows(frame: polars.DataFrame) -> int:
+    """
+    Sums the digests of the rows of a Frame. The sum does not depend on the order of the rows, so
+    the rows of a large output can be hashed one batch at a time without sorting them.
+    :param frame: Data Frame
+    :return: Sum of the row digests
+    """
+
+    total = 0
+    for row in frame.iter_rows():
+        total += int.from_bytes(hashlib.sha256(repr(row).encode('utf-8')).digest(), 'big')
+    return total % ROW_MODULUS
+
+
+def combine_hash(schema: polars.Schema, rows: int, total: int) -> str:
+    """
+    Computes the digest of a content from its schema, row count and sum of row digests.
+    :param schema: Schema with the columns sorted
+    :param rows: Row count
+    :param total: Sum of the row digests (hash_rows)
+    :return: Hex Digest
+    """
+
+    digest = hashlib.sha256()
+    digest.update(';'.join(f"{x}:{y}" for x, y in schema.items()).encode('utf-8'))
+    digest.update(f"{rows}:{total % ROW_MODULUS:064x}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def content_hash(frame: polars.DataFrame) -> str:
+    """
+    Computes a stable digest of the Frame content. Columns are sorted and the rows are hashed on
+    their own, so the digest does not depend on the order the games were retrieved in.
+    :param frame: Data Frame
+    :return: Hex Digest
+    """
+
+    ordered = frame.select(sorted(frame.columns))
+    return combine_hash(ordered.schema, len(ordered), hash_rows(ordered))
+
+
+def get_stored_hash(client: BaseClient, bucket: str, key: str) -> str | None:
+    """
+    Returns the Content Digest stored with an existing output.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: S3 Key
+    :return: Hex Digest, None when the output or its digest is missing
+    """
+
+    try:
+        response = client.head_object(Bucket=bucket, Key=key)
+    except ClientError as ex:
+        if ex.response.get('Error', {}).get('Code') in MISSING_CODES:
+            return None
+        raise ex
+    return response.get('Metadata', {}).get(DIGEST_METADATA)
+
+
+def is_unchanged(client: BaseClient, bucket: str, key: str, digest: str) -> bool:
+    """
+    Checks if the stored output already holds the content with the given digest.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: S3 Key
+    :param digest: Digest of the new content
+    :return: True when the upload can be skipped
+    """
+
+    return get_stored_hash(client, bucket, key) == digest
@@ -0,0 +1,161 @@
+"""
+Per-game Checkpoints for resuming a failed Schedule File run.
+
+Each game's stats are persisted as soon as they are retrieved. A restart with the same arguments
+loads the completed games and only fetches the rest.
+"""
+
+import os
+import os.path
+import shutil
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Iterator
+
+import polars
+from botocore.client import BaseClient
+
+
+class CheckpointStore(ABC):
+    """
+    Base Checkpoint Store
+    """
+
+    @abstractmethod
+    def completed(self) -> set[str]:
+        """
+        Returns the Game IDs with a stored Checkpoint.
+        :return: Set of Game IDs
+        """
+
+    @abstractmethod
+    def save(self, game_id: str, frame: polars.DataFrame) -> None:
+        """
+        Stores the Checkpoint for a Game.
+        :param game_id: Game ID
+        :param frame: Game Stats
+        :return: None
+        """
+
+    @abstractmethod
+    def load(self) -> Iterator[polars.DataFrame]:
+        """
+        Loads the stored Checkpoints one at a time.
+        :return: Iterator of Game Stats
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Removes the stored Checkpoints once the output has been written.
+        :return: None
+        """
+
+
+class LocalCheckpointStore(CheckpointStore):
+    """
+    Checkpoint Store on the local file system.
+    """
+    directory: str
+
+    def __init__(self, directory: str) -> None:
+        """
+        Local Checkpoint Store Constructor.
+        :param directory: Directory holding the Checkpoint files
+        """
+        self.directory = directory
+
+    def _files_(self) -> list[str]:
+        """
+        Lists the Checkpoint files.
+        :return: List of File Names
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(x for x in os.listdir(self.directory) if x.endswith('.parquet'))
+
+    def completed(self) -> set[str]:
+        return {x.removesuffix('.parquet') for x in self._files_()}
+
+    def save(self, game_id: str, frame: polars.DataFrame) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{game_id}.parquet")
+        frame.write_parquet(f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+    def load(self) -> Iterator[polars.DataFrame]:
+        for name in self._files_():
+            yield polars.read_parquet(os.path.join(self.directory, name))
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class S3CheckpointStore(CheckpointStore):
+    """
+    Checkpoint Store in an S3 Bucket.
+    """
+    client: BaseClient
+    bucket: str
+    prefix: str
+
+    def __init__(self, client: BaseClient, bucket: str, prefix: str) -> None:
+        """
+        S3 Checkpoint Store Constructor.
+        :param client: S3 Client
+        :param bucket: S3 Bucket
+        :param prefix: Key Prefix holding the Checkpoint files
+        """
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/') + '/'
+
+    def _keys_(self) -> list[str]:
+        """
+        Lists the Checkpoint keys.
+        :return: List of S3 Keys
+        """
+        paginator = self.client.get_paginator('list_objects_v2')
+        keys = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            keys.extend([x['Key'] for x in page.get('Contents', [])])
+        return sorted(keys)
+
+    def completed(self) -> set[str]:
+        return {x.removeprefix(self.prefix).removesuffix('.parquet') for x in self._keys_()}
+
+    def save(self, game_id: str, frame: polars.DataFrame) -> None:
+        stream = BytesIO()
+        frame.write_parquet(stream)
+        self.client.put_object(Bucket=self.bucket, Key=f"{self.prefix}{game_id}.parquet",
+                               Body=stream.getvalue())
+
+    def load(self) -> Iterator[polars.DataFrame]:
+        for key in self._keys_():
+            yield polars.read_parquet(
+                self.client.get_object(Bucket=self.bucket, Key=key)['Body'].read())
+
+    def clear(self) -> None:
+        keys = self._keys_()
+        for index in range(0, len(keys), 1000):
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                'Objects': [{'Key': x} for x in keys[index:index + 1000]]
+            })
+
+
+def create_checkpoint_store(location: str, output_key: str,
+                            client: BaseClient) -> CheckpointStore:
+    """
+    Creates the Checkpoint Store for an output.
+    :param location: Local directory or S3 URL (s3://bucket/prefix) holding the Checkpoints
+    :param output_key: Output S3 Key the Checkpoints are assembled into
+    :param client: S3 Client
+    :return: Checkpoint Store
+    """
+
+    scope = output_key.removesuffix('.parquet')
+    if location.startswith('s3://'):
+        bucket, _, prefix = location.removeprefix('s3://').partition('/')
+        return S3CheckpointStore(client, bucket, '/'.join(x for x in [prefix.strip('/'), scope]
+                                                          if x))
+    return LocalCheckpointStore(os.path.join(location, scope))
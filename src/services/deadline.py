@@ -0,0 +1,62 @@
+"""
+Run Deadline for time-limited execution environments.
+
+The latency of each game is tracked so a new game is only started when it is expected to complete
+before the deadline, leaving a reserve to write the completed games.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class Deadline:
+    """
+    Deadline shared by the workers of a run.
+    """
+    expires_at: float
+    reserve: float
+
+    def __init__(self, seconds: float, reserve: float = 10.0, window: int = 20) -> None:
+        """
+        Deadline Constructor.
+        :param seconds: Seconds from now until the run is stopped
+        :param reserve: Seconds kept for writing the outputs
+        :param window: Number of recent game latencies the estimate is based on
+        """
+        self.expires_at = time.monotonic() + seconds
+        self.reserve = reserve
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """
+        Returns the seconds left until the deadline.
+        :return: Seconds
+        """
+        return self.expires_at - time.monotonic()
+
+    def record(self, seconds: float) -> None:
+        """
+        Records the latency of a completed game.
+        :param seconds: Seconds the game took
+        :return: None
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def estimate(self) -> float:
+        """
+        Estimates the latency of the next game as the slowest recent game.
+        :return: Seconds, 0 before any game completed
+        """
+        with self._lock:
+            return max(self._latencies, default=0.0)
+
+    def can_start(self) -> bool:
+        """
+        Checks if another game fits before the deadline.
+        :return: True when the game can be started
+        """
+        available = self.remaining() - self.reserve
+        return available > 0 and available >= self.estimate()
@@ -0,0 +1,249 @@
+"""
+Services for maintaining the Player, Team and Statistic Dimension tables.
+
+The Dimensions hold the long descriptive strings once, keyed by a stable integer. The slim fact
+tables written alongside the Player and Team entities reference the Dimensions by key instead of
+repeating the strings on every row.
+"""
+
+import polars
+from botocore.client import BaseClient
+
+from services.storage import replace_frame
+
+DIMENSION_KEYS = {
+    'players': 'dimensions/players.parquet',
+    'teams': 'dimensions/teams.parquet',
+    'statistics': 'dimensions/statistics.parquet'
+}
+
+FACT_ENTITIES = {
+    'players': 'player_facts',
+    'teams': 'team_facts'
+}
+
+PLAYER_SCHEMA: dict = {
+    'player_id': polars.Int64,
+    'player_name': polars.String,
+    'player_url': polars.String
+}
+
+TEAM_SCHEMA: dict = {
+    'team_id': polars.Int64,
+    'team': polars.String,
+    'team_url': polars.String
+}
+
+STATISTIC_SCHEMA: dict = {
+    'statistic_id': polars.Int64,
+    'entity': polars.String,
+    'statistic_type': polars.String,
+    'statistic_code': polars.String,
+    'statistic_name': polars.String
+}
+
+STATISTIC_KEYS = ['entity', 'statistic_type', 'statistic_code', 'statistic_name']
+PARTITION_COLUMNS = ['week', 'year', 'game_type']
+PLAYER_ID_PATTERN = r'/id/(\d+)'
+
+
+def assign_keys(existing: polars.DataFrame, candidates: polars.DataFrame, id_column: str,
+                natural_keys: list[str]) -> polars.DataFrame:
+    """
+    Adds the Candidate members missing from the Dimension, assigning the next surrogate keys.
+    Existing members keep their keys.
+    :param existing: Current Dimension
+    :param candidates: Candidate Members
+    :param id_column: Surrogate Key Column
+    :param natural_keys: Columns identifying a member
+    :return: Updated Dimension
+    """
+
+    new_members = candidates.unique(subset=natural_keys, keep='first', maintain_order=True) \
+        .join(existing.select(natural_keys), on=natural_keys, how='anti') \
+        .sort(natural_keys)
+
+    if len(new_members) == 0:
+        return existing
+
+    start = 1
+    if len(existing) > 0:
+        start = existing.select(polars.col(id_column).max()).item() + 1
+    new_members = new_members.with_columns(
+        polars.int_range(start, start + len(new_members), dtype=polars.Int64).alias(id_column)
+    )
+    return polars.concat([existing, new_members.select(existing.columns)], how='vertical')
+
+
+def get_player_members(frame: polars.DataFrame) -> polars.DataFrame:
+    """
+    Extracts the Player Dimension members from the Player Stats.
+    :param frame: Player Stats
+    :return: Player Members
+    """
+
+    return frame.select(['player_name', 'player_url']) \
+        .with_columns(polars.col('player_url').str.extract(PLAYER_ID_PATTERN)
+                      .cast(polars.Int64).alias('player_id')) \
+        .filter(polars.col('player_id').is_not_null()) \
+        .unique(subset=['player_id'], keep='first', maintain_order=True) \
+        .select(list(PLAYER_SCHEMA))
+
+
+def get_team_members(frame: polars.DataFrame) -> polars.DataFrame:
+    """
+    Extracts the Team Dimension members from the Team or Player Stats.
+    :param frame: Stats Frame
+    :return: Team Members
+    """
+
+    teams = frame.select(
+        polars.col('team'),
+        polars.col('team_url') if 'team_url' in frame.columns
+        else polars.lit(None, dtype=polars.String).alias('team_url')
+    )
+    opponents = frame.select(polars.col('opponent').alias('team'),
+                             polars.lit(None, dtype=polars.String).alias('team_url'))
+    return polars.concat([teams, opponents]) \
+        .filter(polars.col('team') != '') \
+        .sort('team_url', nulls_last=True) \
+        .unique(subset=['team'], keep='first', maintain_order=True)
+
+
+def get_statistic_members(frame: polars.DataFrame, entity: str) -> polars.DataFrame:
+    """
+    Extracts the Statistic Dimension members from the Stats. Team Stats only carry the name so
+    the type and code are left blank.
+    :param frame: Stats Frame
+    :param entity: Entity Name (players, teams)
+    :return: Statistic Members
+    """
+
+    return frame.select(
+        polars.lit(entity).alias('entity'),
+        *[polars.col(x).fill_null('') if x in frame.columns else polars.lit('').alias(x)
+          for x in STATISTIC_KEYS[1:]]
+    ).unique(maintain_order=True)
+
+
+def upsert_players(client: BaseClient, bucket: str, frame: polars.DataFrame) -> polars.DataFrame:
+    """
+    Upserts the Players from the Stats into the Player Dimension.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param frame: Player Stats
+    :return: Player Dimension
+    """
+
+    members = get_player_members(frame)
+
+    def update(existing: polars.DataFrame | None) -> polars.DataFrame:
+        """
+        Appends the new Players, keyed by the ID from their URL.
+        """
+        if existing is None:
+            existing = polars.DataFrame(schema=PLAYER_SCHEMA)
+        new_members = members.join(existing.select('player_id'), on='player_id', how='anti')
+        return polars.concat([existing, new_members], how='vertical')
+
+    return replace_frame(client, bucket, DIMENSION_KEYS['players'], update)
+
+
+def upsert_teams(client: BaseClient, bucket: str, frame: polars.DataFrame) -> polars.DataFrame:
+    """
+    Upserts the Teams and Opponents from the Stats into the Team Dimension.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param frame: Team or Player Stats
+    :return: Team Dimension
+    """
+
+    members = get_team_members(frame)
+
+    def update(existing: polars.DataFrame | None) -> polars.DataFrame:
+        """
+        Appends the new Teams and fills in URLs that were not previously known.
+        """
+        if existing is None:
+            existing = polars.DataFrame(schema=TEAM_SCHEMA)
+        existing = existing.join(members.rename({'team_url': 'new_url'}), on='team', how='left') \
+            .with_columns(polars.coalesce('team_url', 'new_url').alias('team_url')) \
+            .select(list(TEAM_SCHEMA))
+        return assign_keys(existing, members, 'team_id', ['team'])
+
+    return replace_frame(client, bucket, DIMENSION_KEYS['teams'], update)
+
+
+def upsert_statistics(client: BaseClient, bucket: str, frame: polars.DataFrame,
+                      entity: str) -> polars.DataFrame:
+    """
+    Upserts the Statistics into the Statistic Dimension.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param frame: Stats Frame
+    :param entity: Entity Name (players, teams)
+    :return: Statistic Dimension
+    """
+
+    members = get_statistic_members(frame, entity)
+
+    def update(existing: polars.DataFrame | None) -> polars.DataFrame:
+        """
+        Appends the new Statistics.
+        """
+        if existing is None:
+            existing = polars.DataFrame(schema=STATISTIC_SCHEMA)
+        return assign_keys(existing, members, 'statistic_id', STATISTIC_KEYS)
+
+    return replace_frame(client, bucket, DIMENSION_KEYS['statistics'], update)
+
+
+def create_facts(frame: polars.DataFrame, entity: str, teams: polars.DataFrame,
+                 statistics: polars.DataFrame) -> polars.DataFrame:
+    """
+    Creates the slim Fact table, replacing the descriptive strings with Dimension keys.
+    :param frame: Stats Frame
+    :param entity: Entity Name (players, teams)
+    :param teams: Team Dimension
+    :param statistics: Statistic Dimension
+    :return: Fact Data Frame
+    """
+
+    facts = frame.with_columns(
+        polars.lit(entity).alias('entity'),
+        *[polars.col(x).fill_null('') if x in frame.columns else polars.lit('').alias(x)
+          for x in STATISTIC_KEYS[1:]]
+    )
+    team_keys = teams.select('team', 'team_id')
+    facts = facts.join(statistics.select(['statistic_id', *STATISTIC_KEYS]),
+                       on=STATISTIC_KEYS, how='left') \
+        .join(team_keys, on='team', how='left') \
+        .join(team_keys.rename({'team': 'opponent', 'team_id': 'opponent_id'}),
+              on='opponent', how='left')
+
+    columns = ['team_id', 'opponent_id', 'statistic_id', 'statistic_value']
+    if entity == 'players':
+        facts = facts.with_columns(polars.col('player_url').str.extract(PLAYER_ID_PATTERN)
+                                   .cast(polars.Int64).alias('player_id'))
+        columns = ['player_id', *columns]
+
+    columns = [x for x in ['game_id'] if x in frame.columns] + columns
+    return facts.select(columns + [x for x in PARTITION_COLUMNS if x in frame.columns])
+
+
+def update_dimensions(client: BaseClient, bucket: str, entity: str,
+                      frame: polars.DataFrame) -> polars.DataFrame:
+    """
+    Upserts the Dimension members found in the Stats and returns the slim Fact table.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param entity: Entity Name (players, teams)
+    :param frame: Stats Frame
+    :return: Fact Data Frame
+    """
+
+    if entity == 'players':
+        upsert_players(client, bucket, frame)
+    teams = upsert_teams(client, bucket, frame)
+    statistics = upsert_statistics(client, bucket, frame, entity)
+    return create_facts(frame, entity, teams, statistics)
@@ -0,0 +1,225 @@
+"""
+Managed Web Browser with health monitoring and recycling.
+
+Long-lived headless Chrome sessions grow in memory and eventually crash. The managed driver counts
+the pages served and the RSS of the Chrome process tree, recycles the browser after a number of
+pages or once it exceeds a memory limit, and restarts a dead session transparently, retrying the
+page that was in flight.
+"""
+
+import logging
+import os
+import os.path
+from typing import TYPE_CHECKING, Callable, TypeVar
+
+from services.metrics import METRICS
+
+if TYPE_CHECKING:
+    from selenium.webdriver import Chrome
+
+T = TypeVar('T')
+
+DEAD_SESSION_ERRORS = ('InvalidSessionIdException', 'NoSuchWindowException',
+                       'MaxRetryError', 'NewConnectionError', 'ConnectionRefusedError',
+                       'RemoteDisconnected')
+DEAD_SESSION_MESSAGES = ('invalid session id', 'session deleted', 'chrome not reachable',
+                         'disconnected', 'target window already closed', 'tab crashed',
+                         'no such window')
+
+
+def create_browser() -> 'Chrome':
+    """
+    Starts a headless Chrome browser. Selenium is only imported here.
+    :return: Chrome Web Driver
+    """
+
+    # pylint: disable=import-outside-toplevel
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--ignore-certificate-errors')
+
+    if os.getenv('SELENIUM_DRIVER'):
+        return webdriver.Chrome(options=options, service=Service(os.getenv('SELENIUM_DRIVER')))
+    return webdriver.Chrome(options=options)
+
+
+def is_dead_session(error: Exception) -> bool:
+    """
+    Checks if an error means the browser session is gone and has to be restarted.
+    :param error: Error raised by the browser
+    :return: True for a dead session
+    """
+
+    message = str(error).lower()
+    return type(error).__name__ in DEAD_SESSION_ERRORS \
+        or any(x in message for x in DEAD_SESSION_MESSAGES)
+
+
+def process_tree_rss(pid: int, proc: str = '/proc') -> int:
+    """
+    Returns the resident memory of a process and all of its descendants.
+    :param pid: Root Process ID
+    :param proc: Mount point of the proc file system
+    :return: Bytes, 0 when the process tree cannot be read
+    """
+
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir(proc) if os.path.isdir(proc) else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join(proc, entry, 'stat'), 'r', encoding='utf-8') as file:
+                parent = int(file.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(os.path.join(proc, str(current), 'statm'), 'r', encoding='utf-8') as file:
+                total += int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, IndexError, ValueError):
+            pass
+        pending.extend(children.get(current, []))
+    return total
+
+
+class ManagedDriver:
+    """
+    Web Browser recycled after a number of pages or a memory limit and restarted when it dies.
+    """
+    max_pages: int
+    max_rss_mb: int
+    retries: int
+    rss_every: int
+    timeout: float
+
+    def __init__(self, factory: Callable[[], 'Chrome'] = create_browser, max_pages: int = 200,
+                 max_rss_mb: int = 1024, retries: int = 2, rss_every: int = 10, *,
+                 timeout: float = 30.0) -> None:
+        """
+        Managed Driver Constructor. The browser is started on first use.
+        :param factory: Function starting a browser
+        :param max_pages: Pages served before the browser is recycled, 0 for no limit
+        :param max_rss_mb: MiB of Chrome process tree RSS before recycling, 0 for no limit
+        :param retries: Restarts of a dead session before the page fails
+        :param rss_every: Pages between RSS checks
+        :param timeout: Seconds a page load or script may take, 0 for the browser default
+        """
+        self.factory = factory
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.retries = retries
+        self.rss_every = max(rss_every, 1)
+        self.timeout = timeout
+        self.counters = {'pages': 0, 'starts': 0, 'recycles': 0, 'crashes': 0}
+        self._browser: 'Chrome | None' = None
+        self._served = 0
+
+    @classmethod
+    def from_env(cls) -> 'ManagedDriver':
+        """
+        Creates a Managed Driver configured from the BROWSER_MAX_PAGES, BROWSER_MAX_RSS_MB,
+        BROWSER_RETRIES and BROWSER_TIMEOUT environment variables.
+        :return: Managed Driver
+        """
+        return cls(max_pages=int(os.getenv('BROWSER_MAX_PAGES') or 200),
+                   max_rss_mb=int(os.getenv('BROWSER_MAX_RSS_MB') or 1024),
+                   retries=int(os.getenv('BROWSER_RETRIES') or 2),
+                   timeout=float(os.getenv('BROWSER_TIMEOUT') or 30))
+
+    @property
+    def browser(self) -> 'Chrome':
+        """
+        Returns the Web Browser, starting it when there is none.
+        :return: Chrome Web Driver
+        """
+        if self._browser is None:
+            with METRICS.stage('browser_start'):
+                self._browser = self.factory()
+                if self.timeout:
+                    self._browser.set_page_load_timeout(self.timeout)
+                    self._browser.set_script_timeout(self.timeout)
+            self.counters['starts'] += 1
+            self._served = 0
+        return self._browser
+
+    def run(self, action: Callable[['Chrome'], T]) -> T:
+        """
+        Runs a page action on the browser. A dead session is restarted and the action retried;
+        the browser is recycled once it reached its page or memory limit.
+        :param action: Function loading a page with the browser
+        :return: Result of the action
+        """
+
+        for attempt in range(self.retries + 1):
+            try:
+                result = action(self.browser)
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                if not is_dead_session(ex) or attempt == self.retries:
+                    raise
+                self.counters['crashes'] += 1
+                METRICS.record('browser_crash', 0.0)
+                logging.getLogger(__name__).warning(
+                    'Browser session lost, restarting (attempt %s of %s): %s', attempt + 1,
+                    self.retries, str(ex).splitlines()[0] if str(ex) else type(ex).__name__)
+                self.quit()
+                continue
+
+            self.counters['pages'] += 1
+            self._served += 1
+            self._check_limits_()
+            return result
+        raise RuntimeError('Browser retries exhausted')
+
+    def _check_limits_(self) -> None:
+        """
+        Recycles the browser once it served its page limit or exceeds the memory limit.
+        :return: None
+        """
+        if self.max_pages and self._served >= self.max_pages:
+            self.recycle(f"{self._served} pages served")
+        elif self.max_rss_mb and self._served % self.rss_every == 0:
+            rss = self.rss()
+            if rss >= self.max_rss_mb * 1024 * 1024:
+                self.recycle(f"{rss // (1024 * 1024)} MiB RSS")
+
+    def rss(self) -> int:
+        """
+        Returns the RSS of the Chrome process tree, from the chromedriver process down.
+        :return: Bytes, 0 when unknown
+        """
+        process = getattr(getattr(self._browser, 'service', None), 'process', None)
+        pid = getattr(process, 'pid', None)
+        return process_tree_rss(pid) if isinstance(pid, int) else 0
+
+    def recycle(self, reason: str) -> None:
+        """
+        Quits the browser so the next page starts a fresh one.
+        :param reason: Reason logged for the recycle
+        :return: None
+        """
+        with METRICS.stage('browser_recycle'):
+            self.quit()
+        self.counters['recycles'] += 1
+        logging.getLogger(__name__).info('Recycled browser after %s', reason)
+
+    def quit(self) -> None:
+        """
+        Quits the browser, ignoring the errors of a session that is already dead.
+        :return: None
+        """
+        browser, self._browser = self._browser, None
+        self._served = 0
+        if browser is None:
+            return
+        try:
+            browser.quit()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logging.getLogger(__name__).debug('Browser quit failed', exc_info=True)
@@ -0,0 +1,91 @@
+"""
+Enriched Player and Team Stats pre-joined to the Game Information of their week.
+
+The Stats carry no Game ID: a team plays once per week, so every Stats row is matched to its game
+by team. The games of the week are expanded into one row per side (home and away) and joined to the
+Stats as a small build side, the equivalent of a broadcast join. The enriched tables are written
+next to the Stats under their own entity, sorted by game, team and statistic, so dashboards read the
+game date, venue, scores and line without joining the Games again.
+"""
+
+import re
+
+import polars
+
+from services.spill import SpillAccumulator
+
+ENRICHED_ENTITIES = {
+    'players': 'player_enriched',
+    'teams': 'team_enriched'
+}
+SORT_COLUMNS = {
+    'players': ['game_id', 'team', 'player_name', 'statistic_type', 'statistic_code'],
+    'teams': ['game_id', 'team', 'statistic_name']
+}
+GAME_COLUMNS = ['game_id', 'game_date', 'location', 'city', 'state', 'line', 'over_under']
+WEEK_KEY_PATTERN = re.compile(r'^[^/]+/[^/]+/[^/]+/week_\d+\.parquet$')
+
+
+def get_sides(games: polars.DataFrame) -> polars.DataFrame:
+    """
+    Expands the games into one row per team with the side it played and its score.
+    :param games: Game Information of a week
+    :return: Data Frame keyed by team
+    """
+
+    columns = [x for x in GAME_COLUMNS if x in games.columns]
+    home = games.select(polars.col('home_team').alias('team'), *columns,
+                        polars.lit(True).alias('is_home'),
+                        polars.col('home_score').alias('team_score'),
+                        polars.col('away_score').alias('opponent_score'))
+    away = games.select(polars.col('away_team').alias('team'), *columns,
+                        polars.lit(False).alias('is_home'),
+                        polars.col('away_score').alias('team_score'),
+                        polars.col('home_score').alias('opponent_score'))
+    return polars.concat([home, away], how='vertical_relaxed') \
+        .unique(subset=['team'], keep='last', maintain_order=True)
+
+
+def enrich_stats(stats: polars.DataFrame, games: polars.DataFrame, entity: str) \
+        -> polars.DataFrame:
+    """
+    Joins the Stats of a week to the games they were recorded in and sorts them. Stats of a team
+    without a game in the week keep null game columns.
+    :param stats: Player or Team Stats of a week
+    :param games: Game Information of the same week
+    :param entity: Entity Name (players, teams)
+    :return: Data Frame
+    """
+
+    sides = get_sides(games)
+    sides = sides.drop([x for x in sides.columns if x in stats.columns and x != 'team'])
+    order = [x for x in SORT_COLUMNS[entity] if x in stats.columns or x in sides.columns]
+    return stats.join(sides, on='team', how='left').sort(order, nulls_last=True)
+
+
+def enrich_batches(stats: SpillAccumulator, games: polars.DataFrame,
+                   entity: str) -> SpillAccumulator:
+    """
+    Joins spilled Stats of a week to their games one spilled batch at a time. Each batch is
+    sorted on its own, the enriched Stats are spilled next to the Stats.
+    :param stats: Spilled Player or Team Stats of a week
+    :param games: Game Information of the same week
+    :param entity: Entity Name (players, teams)
+    :return: Spilled enriched Stats
+    """
+
+    enriched = SpillAccumulator(stats.budget, stats.directory)
+    for batch in stats.batches():
+        enriched.append(enrich_stats(batch, games, entity))
+    return enriched
+
+
+def get_enriched_key(key: str, entity: str) -> str:
+    """
+    Returns the Key of the enriched table of a Stats week output
+    (players/2023/regular/week_1.parquet to player_enriched/2023/regular/week_1.parquet).
+    :param key: Stats S3 Key
+    :param entity: Entity Name (players, teams)
+    :return: S3 Key
+    """
+    return key.replace(entity, ENRICHED_ENTITIES[entity], 1)
@@ -0,0 +1,105 @@
+"""
+Matchup Feature Matrix of the Team Stats for model training.
+
+The long-format Team Stats are pivoted once to one row per team and game, then joined to the Games
+as the home and the away side. Each game becomes a row of the home statistics, the away statistics,
+their deltas (home - away) and the game values (scores, line and over/under). The matrix is encoded
+as a contiguous row-major float32 NumPy .npy array directly from the Arrow buffer, so it can be
+memory mapped with numpy.load(path, mmap_mode='r') without numpy being needed to write it.
+"""
+
+import struct
+import sys
+
+import polars
+
+GAME_KEYS = ['year', 'game_type', 'week']
+INDEX_COLUMNS = ['game_id', 'year', 'game_type', 'week', 'home_team', 'away_team']
+GAME_VALUES = ['home_score', 'away_score', 'line', 'over_under']
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+NPY_ALIGNMENT = 64
+
+
+def cast_keys(frame: polars.LazyFrame) -> polars.LazyFrame:
+    """
+    Casts the partition columns to integers so the Stats and the Games join on the same types.
+    :param frame: Lazy Frame
+    :return: Lazy Frame
+    """
+    return frame.with_columns([polars.col(x).cast(polars.Int64, strict=False) for x in GAME_KEYS])
+
+
+def pivot_teams(teams: polars.DataFrame | polars.LazyFrame) -> polars.DataFrame:
+    """
+    Pivots the Team Stats to one row per team and game with a column per statistic.
+    :param teams: Team Stats
+    :return: Data Frame keyed by the partitions and the team, statistic columns sorted by name
+    """
+
+    stats = cast_keys(teams.lazy()) \
+        .select(*GAME_KEYS, 'team', 'statistic_name',
+                polars.col('statistic_value').cast(polars.Float32, strict=False)) \
+        .collect()
+    names = sorted(stats['statistic_name'].unique().drop_nulls().to_list())
+    wide = stats.pivot(on='statistic_name', index=[*GAME_KEYS, 'team'], values='statistic_value',
+                       aggregate_function='first')
+    return wide.select(*GAME_KEYS, 'team', *[
+        polars.col(x).cast(polars.Float32) if x in wide.columns
+        else polars.lit(None, polars.Float32).alias(x) for x in names
+    ])
+
+
+def create_matchups(teams: polars.DataFrame | polars.LazyFrame,
+                    games: polars.DataFrame | polars.LazyFrame) -> tuple[polars.DataFrame,
+                                                                         polars.DataFrame]:
+    """
+    Builds the Matchup Feature Matrix of every game. Games missing the Stats of a side are dropped.
+    :param teams: Team Stats
+    :param games: Game Information
+    :return: Features (float32 columns) and Index (one row per feature row) Data Frames
+    """
+
+    wide = pivot_teams(teams)
+    names = [x for x in wide.columns if x not in GAME_KEYS and x != 'team']
+    home = wide.lazy().rename({x: f"home_{x}" for x in names})
+    away = wide.lazy().rename({x: f"away_{x}" for x in names})
+
+    matchups = cast_keys(games.lazy()) \
+        .unique(subset=['game_id'], keep='last', maintain_order=True) \
+        .join(home, left_on=[*GAME_KEYS, 'home_team'], right_on=[*GAME_KEYS, 'team'], how='inner') \
+        .join(away, left_on=[*GAME_KEYS, 'away_team'], right_on=[*GAME_KEYS, 'team'], how='inner') \
+        .sort(GAME_KEYS + ['game_id']) \
+        .with_columns([(polars.col(f"home_{x}") - polars.col(f"away_{x}")).alias(f"delta_{x}")
+                       for x in names]) \
+        .with_columns([polars.col(x).cast(polars.String).cast(polars.Float32, strict=False)
+                       for x in GAME_VALUES]) \
+        .collect()
+
+    features = [f"{side}_{x}" for side in ('home', 'away', 'delta') for x in names] + GAME_VALUES
+    index = matchups.select(polars.col('game_id').cast(polars.String),
+                            *INDEX_COLUMNS[1:]).with_row_index('row')
+    return matchups.select([polars.col(x).cast(polars.Float32) for x in features]), index
+
+
+def encode_npy(features: polars.DataFrame) -> bytes:
+    """
+    Encodes the features as a row-major float32 NumPy .npy array (format version 1.0). The values
+    are laid out row by row in one vectorized pass and written from the Arrow buffer; missing
+    values become NaN.
+    :param features: Float32 Data Frame
+    :return: File Content
+    """
+
+    rows, columns = features.shape
+    endian = '<' if sys.byteorder == 'little' else '>'
+    header = f"{{'descr': '{endian}f4', 'fortran_order': False, 'shape': ({rows}, {columns}), }}"
+    padding = NPY_ALIGNMENT - (len(NPY_MAGIC) + 2 + len(header) + 1) % NPY_ALIGNMENT
+    header = f"{header}{' ' * (padding % NPY_ALIGNMENT)}\n"
+
+    values = features.select(
+        polars.concat_list(polars.all().fill_null(float('nan'))).alias('values')) \
+        .explode('values')['values'].cast(polars.Float32).fill_null(float('nan')).rechunk()
+    array = values.to_arrow()
+    data = array.buffers()[1]
+    body = data.slice(array.offset * 4, len(array) * 4).to_pybytes() if data is not None else b''
+    return NPY_MAGIC + struct.pack('<H', len(header)) + header.encode('latin1') + body
@@ -0,0 +1,252 @@
+"""
+Fetch Policy for the page loads of the Stats pipeline.
+
+Every page load goes through a Fetcher shared by the Services of a run, each run creating its own
+so that runs and tests never share limits or breaker state. A load that fails or returns no
+payload is retried with jittered exponential backoff. The number of concurrent loads is
+adjusted with AIMD (additive increase, multiplicative decrease): it grows by one slot per window
+of fast successes and is halved on an error or a load slower than the target latency. After
+repeated consecutive transport errors or timeouts a circuit breaker opens and pauses fetching for
+a cool-down, then lets a single trial load through before closing again. A page that loaded
+without a payload is retried but does not count against the breaker.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, TypeVar
+
+from services.backoff import backoff_delay
+from services.metrics import METRICS
+
+T = TypeVar('T')
+
+
+class FetchError(Exception):
+    """
+    Raised when a page could not be loaded within the retries.
+    """
+
+
+class AimdLimiter:
+    """
+    Concurrency Limit adjusted with Additive Increase and Multiplicative Decrease.
+    """
+    minimum: int
+    maximum: int
+    target_latency: float
+    decrease: float
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 8,
+                 target_latency: float = 15.0, decrease: float = 0.5) -> None:
+        """
+        AIMD Limiter Constructor.
+        :param initial: Initial number of concurrent fetches
+        :param minimum: Minimum number of concurrent fetches
+        :param maximum: Maximum number of concurrent fetches
+        :param target_latency: Seconds above which a successful fetch counts as congestion
+        :param decrease: Factor the limit is multiplied by on congestion
+        """
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self._decreased = float('-inf')
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """
+        Waits for a free fetch slot and takes it.
+        :return: None
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, success: bool) -> None:
+        """
+        Releases a fetch slot and adjusts the limit from the outcome of the fetch. The limit is
+        decreased at most once per target latency, so the failures of the fetches already in
+        flight count as a single congestion event.
+        :param latency: Seconds the fetch took
+        :param success: True when the fetch returned a payload
+        :return: None
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if success and latency <= self.target_latency:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            elif now - self._decreased >= self.target_latency:
+                self.limit = max(float(self.minimum), self.limit * self.decrease)
+                self._decreased = now
+                logging.getLogger(__name__).info('Fetch concurrency decreased to %s',
+                                                 int(self.limit))
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Circuit Breaker pausing the fetches after repeated consecutive failures.
+    """
+    threshold: int
+    cooldown: float
+
+    def __init__(self, threshold: int = 5, cooldown: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Circuit Breaker Constructor.
+        :param threshold: Consecutive failures opening the circuit, 0 to never open
+        :param cooldown: Seconds the circuit stays open before a trial fetch
+        :param clock: Monotonic Clock
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self._opened = 0.0
+        self._trial = False
+        self._condition = threading.Condition()
+
+    def wait(self) -> None:
+        """
+        Waits until a fetch is allowed. While open every fetch waits for the cool-down; once it
+        passed a single trial fetch is let through and the others wait for its outcome.
+        :return: None
+        """
+        with self._condition:
+            while True:
+                if self.state == 'closed':
+                    return
+                remaining = self._opened + self.cooldown - self.clock()
+                if self.state == 'open' and remaining <= 0:
+                    self.state = 'half-open'
+                if self.state == 'half-open' and not self._trial:
+                    self._trial = True
+                    return
+                self._condition.wait(max(remaining, 0.0) if self.state == 'open' else None)
+
+    def success(self) -> None:
+        """
+        Records a successful fetch, closing the circuit.
+        :return: None
+        """
+        with self._condition:
+            if self.state != 'closed':
+                logging.getLogger(__name__).info('Circuit closed, fetching resumed')
+            self.state = 'closed'
+            self.failures = 0
+            self._trial = False
+            self._condition.notify_all()
+
+    def failure(self) -> None:
+        """
+        Records a failed fetch, opening the circuit after the threshold or a failed trial.
+        :return: None
+        """
+        with self._condition:
+            self.failures += 1
+            if self.state == 'half-open' or \
+                    (self.threshold and self.state == 'closed' and
+                     self.failures >= self.threshold):
+                self.state = 'open'
+                self.trips += 1
+                self._opened = self.clock()
+                METRICS.record('circuit_open', 0.0)
+                logging.getLogger(__name__).warning(
+                    'Circuit opened after %s consecutive failures, pausing fetches for %s seconds',
+                    self.failures, self.cooldown)
+            self._trial = False
+            self._condition.notify_all()
+
+
+class Fetcher:
+    """
+    Fetch Policy applying retries, adaptive concurrency and a circuit breaker to page loads.
+    """
+    retries: int
+    backoff: float
+    max_backoff: float
+
+    def __init__(self, limiter: AimdLimiter | None = None, breaker: CircuitBreaker | None = None,
+                 retries: int = 3, backoff: float = 1.0, max_backoff: float = 30.0) -> None:
+        """
+        Fetcher Constructor.
+        :param limiter: Concurrency Limiter
+        :param breaker: Circuit Breaker
+        :param retries: Retries of a failed fetch
+        :param backoff: Seconds of the first retry backoff
+        :param max_backoff: Maximum Seconds of a retry backoff
+        """
+        self.limiter = limiter or AimdLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep: Callable[[float], None] = time.sleep
+
+    @classmethod
+    def from_env(cls) -> 'Fetcher':
+        """
+        Creates a Fetcher configured from the FETCH_RETRIES, FETCH_BACKOFF, FETCH_MAX_BACKOFF,
+        FETCH_CONCURRENCY, FETCH_MAX_CONCURRENCY, FETCH_TARGET_LATENCY, BREAKER_THRESHOLD and
+        BREAKER_COOLDOWN environment variables.
+        :return: Fetcher
+        """
+        limiter = AimdLimiter(initial=int(os.getenv('FETCH_CONCURRENCY') or 4),
+                              maximum=int(os.getenv('FETCH_MAX_CONCURRENCY') or 8),
+                              target_latency=float(os.getenv('FETCH_TARGET_LATENCY') or 15))
+        breaker = CircuitBreaker(threshold=int(os.getenv('BREAKER_THRESHOLD') or 5),
+                                 cooldown=float(os.getenv('BREAKER_COOLDOWN') or 60))
+        return cls(limiter, breaker, retries=int(os.getenv('FETCH_RETRIES') or 3),
+                   backoff=float(os.getenv('FETCH_BACKOFF') or 1),
+                   max_backoff=float(os.getenv('FETCH_MAX_BACKOFF') or 30))
+
+    def fetch(self, load: Callable[[], T | None], name: str) -> T | None:
+        """
+        Runs a page load under the Fetch Policy. A load raising an error or returning no payload
+        is retried after a backoff. Only errors such as transport failures and timeouts count as
+        breaker failures, as a page that loaded without a payload shows the site is reachable.
+        :param load: Function loading the page and returning its payload
+        :param name: Name of the page for the logs
+        :return: Payload, None when every attempt returned no payload
+        """
+
+        error: Exception | None = None
+        for attempt in range(self.retries + 1):
+            self.breaker.wait()
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                result, error = load(), None
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                result, error = None, ex
+            self.limiter.release(time.perf_counter() - start, result is not None)
+
+            if error is None:
+                self.breaker.success()
+            else:
+                self.breaker.failure()
+            if result is not None:
+                return result
+            if attempt == self.retries:
+                break
+            delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+            METRICS.record('fetch_retry', delay)
+            reason = type(error).__name__ if error is not None else 'no payload'
+            logging.getLogger(__name__).warning(
+                'Fetch of %s failed (attempt %s of %s), retrying in %.1f seconds: %s', name,
+                attempt + 1, self.retries + 1, delay,
+                str(error).splitlines()[0] if str(error or '') else reason)
+            self.sleep(delay)
+
+        if error is not None:
+            raise FetchError(f"Fetch of {name} failed after {self.retries + 1} attempts") \
+                from error
+        return None
@@ -0,0 +1,89 @@
+"""
+Rolling-window form tables of the Player and Team Stats.
+
+For every player or team and statistic, each game carries the mean of the statistic over its last N
+games for every configured window, ending at (and including) that game. A window only depends on
+the games before it, so the windows of earlier games never change when a new week arrives. The
+materialization is therefore incremental: the last N - 1 values of every key are kept in a state
+file, and a run only reads the new weeks, computes their windows on top of the state and appends
+them as new partitions.
+"""
+
+import polars
+
+ENTITY_KEYS = {
+    'players': ['player_url', 'statistic_type', 'statistic_code'],
+    'teams': ['team', 'statistic_name']
+}
+CONTEXT_COLUMNS = ['player_name', 'team', 'opponent']
+ORDER_COLUMNS = ['year', 'game_type', 'week']
+HISTORY_COLUMN = '_history'
+DEFAULT_WINDOWS = [3, 5, 10]
+
+
+def prepare_stats(frame: polars.DataFrame, entity: str) -> polars.DataFrame:
+    """
+    Selects the columns of the Stats used by the form table, with a numeric Game Type to order by.
+    :param frame: Week Stats
+    :param entity: Entity Name (players, teams)
+    :return: Data Frame
+    """
+
+    columns = [x for x in ENTITY_KEYS[entity] + CONTEXT_COLUMNS if x in frame.columns]
+    columns = list(dict.fromkeys(columns))
+    return frame.select([*columns,
+                         polars.col('year').cast(polars.Int64),
+                         polars.col('game_type').cast(polars.Int64, strict=False),
+                         polars.col('week').cast(polars.Int64),
+                         polars.col('statistic_value').cast(polars.Float64)])
+
+
+def rolling_form(stats: polars.DataFrame, entity: str, windows: list[int],
+                 history: polars.DataFrame | None = None) -> polars.DataFrame:
+    """
+    Computes the rolling means of every key over each window. The history rows only feed the
+    windows of the new games and are not returned.
+    :param stats: Prepared Stats of the new games
+    :param entity: Entity Name (players, teams)
+    :param windows: Window sizes in games
+    :param history: Optional last values of every key from the earlier games
+    :return: Data Frame of the new games with a games column and an avg_{N} column per window
+    """
+
+    keys = ENTITY_KEYS[entity]
+    frames = [stats.with_columns(polars.lit(False).alias(HISTORY_COLUMN))]
+    if history is not None and len(history) > 0:
+        frames.insert(0, history.with_columns(polars.lit(True).alias(HISTORY_COLUMN)))
+    value = polars.col('statistic_value')
+    return polars.concat(frames, how='diagonal_relaxed') \
+        .sort(keys + ORDER_COLUMNS) \
+        .with_columns(
+            polars.int_range(1, polars.len() + 1).over(keys).clip(upper_bound=max(windows))
+            .alias('games'),
+            *[value.rolling_mean(window_size=x, min_samples=1).over(keys).alias(f"avg_{x}")
+              for x in windows]) \
+        .filter(~polars.col(HISTORY_COLUMN)) \
+        .drop(HISTORY_COLUMN)
+
+
+def get_state(form: polars.DataFrame, entity: str, windows: list[int],
+              history: polars.DataFrame | None = None) -> polars.DataFrame:
+    """
+    Returns the last values of every key needed by the windows of the next games.
+    :param form: Form rows of the new games
+    :param entity: Entity Name (players, teams)
+    :param windows: Window sizes in games
+    :param history: Optional earlier state
+    :return: Data Frame of at most max(windows) - 1 rows per key
+    """
+
+    keys = ENTITY_KEYS[entity]
+    columns = [x for x in form.columns
+               if x not in ('games', HISTORY_COLUMN) and not x.startswith('avg_')]
+    frames = [form.select(columns)]
+    if history is not None and len(history) > 0:
+        frames.insert(0, history.select([x for x in columns if x in history.columns]))
+    return polars.concat(frames, how='diagonal_relaxed') \
+        .sort(keys + ORDER_COLUMNS) \
+        .group_by(keys, maintain_order=True) \
+        .tail(max(max(windows) - 1, 0))
@@ -0,0 +1,139 @@
+"""
+Arrow IPC (Feather v2) copies of the Parquet outputs for hot consumers.
+
+A Parquet output can also be written as an Arrow IPC file next to it, under the same partition
+scheme with an .arrow extension (players/2023/regular/week_1.arrow). Uncompressed IPC files hold the
+Arrow buffers as they are laid out in memory, so a local copy can be memory mapped and read without
+decoding or copying. LZ4 trades a fast decompression for smaller files. Each copy stores the content
+digest of its output and its compression, so a missing or stale copy is written again even when
+the Parquet file itself is unchanged.
+"""
+
+import os
+from typing import Literal, cast
+
+import polars
+import pyarrow
+from botocore.client import BaseClient
+
+from services.changes import DIGEST_METADATA, is_unchanged
+from services.metrics import METRICS
+from services.spill import SpillAccumulator
+
+IPC_EXTENSION = '.arrow'
+COMPRESSIONS = ('uncompressed', 'lz4')
+
+IpcCompression = Literal['uncompressed', 'lz4']
+
+
+def get_ipc_key(key: str) -> str:
+    """
+    Returns the Key of the Arrow IPC copy of a Parquet output
+    (players/2023/regular/week_1.parquet to players/2023/regular/week_1.arrow).
+    :param key: Parquet or Arrow IPC S3 Key
+    :return: S3 Key
+    """
+    return f"{key.removesuffix(IPC_EXTENSION).removesuffix('.parquet')}{IPC_EXTENSION}"
+
+
+def get_ipc_digest(digest: str, compression: str) -> str:
+    """
+    Returns the digest stored with an Arrow IPC copy, the content digest of the output tagged
+    with the compression of the copy.
+    :param digest: Content Digest of the output
+    :param compression: IPC Compression (uncompressed, lz4)
+    :return: Digest
+    """
+    return f"{compression}:{digest}"
+
+
+def write_ipc(client: BaseClient, bucket: str, key: str,
+              frame: polars.DataFrame | SpillAccumulator, compression: str, *,
+              digest: str | None = None) -> int:
+    """
+    Writes the Arrow IPC copy of an output. Spilled Stats are written into a local file one batch
+    at a time before the upload.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: Parquet S3 Key of the output
+    :param frame: Output Data Frame
+    :param compression: IPC Compression (uncompressed, lz4)
+    :param digest: Optional Content Digest of the output, stored with the copy
+    :return: Size in bytes
+    :raises ValueError: When the compression is not supported
+    """
+
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Invalid IPC Compression: {compression}")
+
+    codec = cast(IpcCompression, compression)
+    ipc_key = get_ipc_key(key)
+    metadata = {DIGEST_METADATA: get_ipc_digest(digest, compression)} if digest else {}
+    with METRICS.stage('ipc') as timer:
+        if isinstance(frame, SpillAccumulator):
+            path = os.path.join(frame.directory, f"output{IPC_EXTENSION}")
+            try:
+                size = frame.write_ipc(path, codec)
+                client.upload_file(path, bucket, ipc_key, ExtraArgs={'Metadata': metadata})
+            finally:
+                if os.path.exists(path):
+                    os.remove(path)
+        else:
+            body = frame.write_ipc(None, compression=codec).getvalue()
+            size = len(body)
+            client.put_object(Bucket=bucket, Key=ipc_key, Body=body, Metadata=metadata)
+        timer.add(size)
+    return size
+
+
+def refresh_ipc(client: BaseClient, bucket: str, key: str,
+                frame: polars.DataFrame | SpillAccumulator, compression: str, *,
+                digest: str) -> int:
+    """
+    Writes the Arrow IPC copy of an unchanged output when the stored copy is missing, holds other
+    content or uses another compression.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: Parquet S3 Key of the output
+    :param frame: Output Data Frame
+    :param compression: IPC Compression (uncompressed, lz4)
+    :param digest: Content Digest of the output
+    :return: Size in bytes, 0 when the stored copy is current
+    """
+
+    if is_unchanged(client, bucket, get_ipc_key(key), get_ipc_digest(digest, compression)):
+        return 0
+    return write_ipc(client, bucket, key, frame, compression, digest=digest)
+
+
+def download_ipc(client: BaseClient, bucket: str, key: str, directory: str) -> str:
+    """
+    Downloads the Arrow IPC copy of an output into a local directory, keeping the partition layout.
+    The download is skipped when the local copy has the size of the stored one.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: Parquet or Arrow IPC S3 Key of the output
+    :param directory: Local Directory
+    :return: Local File Path
+    """
+
+    ipc_key = get_ipc_key(key)
+    path = os.path.join(directory, *ipc_key.split('/'))
+    size = client.head_object(Bucket=bucket, Key=ipc_key)['ContentLength']
+    if not os.path.exists(path) or os.path.getsize(path) != size:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        client.download_file(bucket, ipc_key, path)
+    return path
+
+
+def read_ipc(path: str) -> polars.DataFrame:
+    """
+    Reads a local Arrow IPC file through a memory map. The buffers of an uncompressed file are
+    used in place, LZ4 files are decompressed on read.
+    :param path: Local File Path
+    :return: Data Frame
+    """
+
+    with pyarrow.memory_map(path, 'r') as source:
+        table = pyarrow.ipc.open_file(source).read_all()
+    return cast(polars.DataFrame, polars.from_arrow(table))
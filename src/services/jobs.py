@@ -0,0 +1,288 @@
+"""
+Job Queues consumed by the long-running Worker.
+
+A Job asks for the Stats of a Schedule File, or of a single game within it. Jobs are only
+acknowledged once their output has been written; a released or unacknowledged Job becomes
+available again. A received Job is leased to its Worker, which extends the lease with a heartbeat
+while the Job runs, so a long Job is not handed to a second Worker. A Job that can never succeed
+is rejected to a dead letter location instead of being retried.
+"""
+
+import json
+import logging
+import os
+import os.path
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple
+
+from botocore.client import BaseClient
+
+DEFAULT_LEASE = 300
+
+
+class InvalidJobError(ValueError):
+    """
+    Raised for a Job that can never succeed, such as one with an unknown Stats Type.
+    """
+
+
+class Job(NamedTuple):
+    """
+    Stats Job
+    """
+    stat_type: str
+    schedule_key: str
+    game_id: str | None = None
+    receipt: str = ''
+
+    def to_json(self) -> str:
+        """
+        Serializes the Job body.
+        :return: JSON String
+        """
+        return json.dumps({
+            'stat_type': self.stat_type,
+            'schedule_key': self.schedule_key,
+            'game_id': self.game_id
+        })
+
+    @staticmethod
+    def from_json(body: str, receipt: str) -> 'Job':
+        """
+        Parses a Job body.
+        :param body: JSON String
+        :param receipt: Queue handle used to acknowledge the Job
+        :return: Job
+        """
+        values = json.loads(body)
+        return Job(values['stat_type'], values['schedule_key'], values.get('game_id'), receipt)
+
+
+class JobQueue(ABC):
+    """
+    Base Job Queue
+    """
+    lease: float
+
+    @abstractmethod
+    def send(self, job: Job) -> None:
+        """
+        Adds a Job to the Queue.
+        :param job: Job
+        :return: None
+        """
+
+    @abstractmethod
+    def receive(self, wait_seconds: int) -> Job | None:
+        """
+        Takes the next Job from the Queue, waiting up to the given time for one to arrive.
+        :param wait_seconds: Seconds to wait
+        :return: Job or None
+        """
+
+    @abstractmethod
+    def ack(self, job: Job) -> None:
+        """
+        Removes a completed Job from the Queue.
+        :param job: Job
+        :return: None
+        """
+
+    @abstractmethod
+    def release(self, job: Job) -> None:
+        """
+        Returns a failed Job to the Queue so it can be retried.
+        :param job: Job
+        :return: None
+        """
+
+    @abstractmethod
+    def extend(self, job: Job) -> None:
+        """
+        Extends the lease of a Job that is still being processed.
+        :param job: Job
+        :return: None
+        """
+
+    @abstractmethod
+    def reject(self, job: Job) -> None:
+        """
+        Removes a Job that can never succeed from the Queue, keeping it in the dead letter
+        location.
+        :param job: Job
+        :return: None
+        """
+
+    @contextmanager
+    def hold(self, job: Job) -> Iterator[None]:
+        """
+        Extends the lease of a Job every third of the lease while the block runs.
+        :param job: Job
+        :return: None
+        """
+
+        stop = threading.Event()
+
+        def heartbeat() -> None:
+            """
+            Extends the lease until the block completes.
+            """
+            while not stop.wait(self.lease / 3):
+                try:
+                    self.extend(job)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    logging.getLogger(__name__).warning('Failed to extend the lease of %s', job,
+                                                        exc_info=True)
+
+        thread = threading.Thread(target=heartbeat, name='job-heartbeat', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+
+class SqsJobQueue(JobQueue):
+    """
+    Job Queue backed by an SQS Queue. The lease is the visibility timeout of the received message.
+    """
+    client: BaseClient
+    queue_url: str
+    retry_delay: int
+    dead_letter_url: str | None
+
+    def __init__(self, client: BaseClient, queue_url: str, retry_delay: int = 30, *,
+                 lease: int = DEFAULT_LEASE, dead_letter_url: str | None = None) -> None:
+        """
+        SQS Job Queue Constructor.
+        :param client: SQS Client
+        :param queue_url: SQS Queue URL
+        :param retry_delay: Seconds before a released Job becomes visible again
+        :param lease: Seconds a received Job stays invisible to other Workers between heartbeats
+        :param dead_letter_url: Optional SQS Queue URL of the rejected Jobs. Without it a rejected
+            Job is released, for the redrive policy of the Queue to move it
+        """
+        self.client = client
+        self.queue_url = queue_url
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.dead_letter_url = dead_letter_url
+
+    def send(self, job: Job) -> None:
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=job.to_json())
+
+    def receive(self, wait_seconds: int) -> Job | None:
+        response = self.client.receive_message(QueueUrl=self.queue_url, MaxNumberOfMessages=1,
+                                               WaitTimeSeconds=min(wait_seconds, 20),
+                                               VisibilityTimeout=int(self.lease))
+        messages = response.get('Messages', [])
+        if not messages:
+            return None
+        return Job.from_json(messages[0]['Body'], messages[0]['ReceiptHandle'])
+
+    def ack(self, job: Job) -> None:
+        self.client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=job.receipt)
+
+    def release(self, job: Job) -> None:
+        self.client.change_message_visibility(QueueUrl=self.queue_url, ReceiptHandle=job.receipt,
+                                              VisibilityTimeout=self.retry_delay)
+
+    def extend(self, job: Job) -> None:
+        self.client.change_message_visibility(QueueUrl=self.queue_url, ReceiptHandle=job.receipt,
+                                              VisibilityTimeout=int(self.lease))
+
+    def reject(self, job: Job) -> None:
+        if self.dead_letter_url is None:
+            self.release(job)
+            return
+        self.client.send_message(QueueUrl=self.dead_letter_url, MessageBody=job.to_json())
+        self.ack(job)
+
+
+class LocalJobQueue(JobQueue):
+    """
+    Job Queue backed by a local directory. Pending Jobs are files in the pending folder and are
+    moved to the processing folder while a Worker holds them. The modification time of a held Job
+    is its lease, refreshed by the heartbeat; rejected Jobs are moved to the failed folder.
+    """
+    pending: str
+    processing: str
+    failed: str
+
+    def __init__(self, directory: str, lease: float = DEFAULT_LEASE) -> None:
+        """
+        Local Job Queue Constructor.
+        :param directory: Queue Directory
+        :param lease: Seconds after the last heartbeat before a held Job is recovered
+        """
+        self.pending = os.path.join(directory, 'pending')
+        self.processing = os.path.join(directory, 'processing')
+        self.failed = os.path.join(directory, 'failed')
+        self.lease = lease
+        for folder in (self.pending, self.processing, self.failed):
+            os.makedirs(folder, exist_ok=True)
+
+    def send(self, job: Job) -> None:
+        name = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.json"
+        path = os.path.join(self.pending, name)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as file:
+            file.write(job.to_json())
+        os.replace(f"{path}.tmp", path)
+
+    def receive(self, wait_seconds: int) -> Job | None:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            for name in sorted(x for x in os.listdir(self.pending) if x.endswith('.json')):
+                source = os.path.join(self.pending, name)
+                target = os.path.join(self.processing, name)
+                try:
+                    # The lease starts before the move, so recover never sees a stale time
+                    os.utime(source)
+                    os.rename(source, target)
+                except FileNotFoundError:
+                    continue
+                with open(target, encoding='utf-8') as file:
+                    return Job.from_json(file.read(), name)
+
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(min(1.0, max(deadline - time.monotonic(), 0)))
+
+    def ack(self, job: Job) -> None:
+        os.remove(os.path.join(self.processing, job.receipt))
+
+    def release(self, job: Job) -> None:
+        os.rename(os.path.join(self.processing, job.receipt),
+                  os.path.join(self.pending, job.receipt))
+
+    def extend(self, job: Job) -> None:
+        os.utime(os.path.join(self.processing, job.receipt))
+
+    def reject(self, job: Job) -> None:
+        os.rename(os.path.join(self.processing, job.receipt),
+                  os.path.join(self.failed, job.receipt))
+
+    def recover(self) -> int:
+        """
+        Returns Jobs left in processing by a Worker that stopped without releasing them, those
+        whose lease expired. Jobs of running Workers are kept alive by their heartbeat.
+        :return: Number of recovered Jobs
+        """
+
+        expired = time.time() - self.lease
+        recovered = 0
+        for name in os.listdir(self.processing):
+            path = os.path.join(self.processing, name)
+            try:
+                if os.path.getmtime(path) >= expired:
+                    continue
+                os.rename(path, os.path.join(self.pending, name))
+            except FileNotFoundError:
+                continue
+            recovered += 1
+        return recovered
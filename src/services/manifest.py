@@ -0,0 +1,302 @@
+"""
+Services for maintaining the Warehouse Manifest.
+
+The Manifest is a single Parquet file listing every Entity file in the warehouse along with its
+size, row count, partition values and the min/max of the commonly filtered columns. Readers can
+plan a query from the manifest without listing the bucket or opening each file footer.
+
+Writers never rewrite the Manifest itself: every update is stored as a small fragment under
+manifest/fragments/, which needs no coordination between concurrent writers. Readers merge the
+fragments into the Manifest, and compact_manifest folds them in with a single conditional write at
+the end of a run. A reader finding more than MAX_FRAGMENTS fragments compacts them itself, so reads
+stay bounded when runs end before compacting.
+"""
+
+import logging
+import uuid
+from datetime import datetime, timezone
+from io import BytesIO
+
+import polars
+from botocore.client import BaseClient
+
+from services.storage import load_frame, replace_frame
+
+MANIFEST_KEY = 'manifest/manifest.parquet'
+FRAGMENT_FOLDER = 'fragments'
+MAX_FRAGMENTS = 100
+STAT_COLUMNS = ['game_id', 'team', 'player_name']
+
+MANIFEST_SCHEMA: dict = {
+    'key': polars.String,
+    'entity': polars.String,
+    'year': polars.Int64,
+    'game_type': polars.String,
+    'week': polars.Int64,
+    'size': polars.Int64,
+    'row_count': polars.Int64,
+    'updated_at': polars.String,
+    **{f"{bound}_{column}": polars.String for column in STAT_COLUMNS for bound in ('min', 'max')}
+}
+
+
+def get_partitions(key: str) -> dict:
+    """
+    Parses the Partition values from an Entity Key (entity/year/game_type/week_n.parquet).
+    :param key: S3 Key
+    :return: Dictionary of Partition Values
+    """
+
+    parts = key.split('/')
+    partitions: dict = {
+        'entity': parts[0],
+        'year': None,
+        'game_type': None,
+        'week': None
+    }
+
+    if len(parts) > 1 and parts[1].isnumeric():
+        partitions['year'] = int(parts[1])
+    if len(parts) > 2:
+        partitions['game_type'] = parts[2]
+    if len(parts) > 3:
+        week = parts[3].split('.')[0].replace('week_', '')
+        if week.isnumeric():
+            partitions['week'] = int(week)
+    return partitions
+
+
+def create_entry(key: str, frame: polars.DataFrame | polars.LazyFrame, size: int) -> dict:
+    """
+    Creates a Manifest Entry for a written Entity File. A Lazy Frame is summarized without being
+    collected.
+    :param key: S3 Key of the File
+    :param frame: Data Frame that was written
+    :param size: Size of the written file in bytes
+    :return: Manifest Entry
+    """
+
+    lazy = frame.lazy()
+    columns = [x for x in STAT_COLUMNS if x in lazy.collect_schema().names()]
+    bounds = lazy.select(
+        [polars.len().alias('row_count')]
+        + [polars.col(x).cast(polars.String).min().alias(f"min_{x}") for x in columns]
+        + [polars.col(x).cast(polars.String).max().alias(f"max_{x}") for x in columns]
+    ).collect().to_dicts()[0]
+
+    entry = {
+        'key': key,
+        **get_partitions(key),
+        'size': size,
+        'row_count': bounds['row_count'],
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }
+
+    for column in STAT_COLUMNS:
+        entry[f"min_{column}"] = bounds.get(f"min_{column}")
+        entry[f"max_{column}"] = bounds.get(f"max_{column}")
+    return entry
+
+
+def get_fragment_prefix(key: str = MANIFEST_KEY) -> str:
+    """
+    Returns the Prefix of the fragments of a Manifest (manifest/fragments/).
+    :param key: Manifest Key
+    :return: S3 Prefix
+    """
+    folder = key.rsplit('/', 1)[0] if '/' in key else ''
+    return f"{folder}/{FRAGMENT_FOLDER}/" if folder else f"{FRAGMENT_FOLDER}/"
+
+
+def list_fragments(client: BaseClient, bucket: str, key: str = MANIFEST_KEY) -> list[str]:
+    """
+    Lists the Manifest fragments that have not been compacted yet.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: Manifest Key
+    :return: List of S3 Keys
+    """
+
+    keys: list[str] = []
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=get_fragment_prefix(key)):
+        keys.extend(x['Key'] for x in page.get('Contents', []))
+    return sorted(keys)
+
+
+def merge_entries(manifest: polars.DataFrame | None, updates: list[polars.DataFrame]) \
+        -> polars.DataFrame:
+    """
+    Upserts Manifest Entries, keeping the most recently updated Entry of every key.
+    :param manifest: Current Manifest (None when missing)
+    :param updates: Frames of Entries to upsert
+    :return: Manifest Data Frame sorted by key
+    """
+
+    frames = ([manifest] if manifest is not None else []) + updates
+    if not frames:
+        return polars.DataFrame(schema=MANIFEST_SCHEMA)
+    return polars.concat(frames, how='diagonal_relaxed') \
+        .sort('updated_at', maintain_order=True) \
+        .unique(subset=['key'], keep='last') \
+        .sort('key')
+
+
+def load_fragments(client: BaseClient, bucket: str,
+                   keys: list[str]) -> list[polars.DataFrame]:
+    """
+    Loads the Manifest fragments, skipping any removed by a concurrent compaction.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param keys: Fragment Keys
+    :return: List of Data Frames
+    """
+
+    frames = []
+    for fragment_key in keys:
+        frame, _ = load_frame(client, bucket, fragment_key)
+        if frame is not None:
+            frames.append(frame)
+    return frames
+
+
+def load_manifest(client: BaseClient, bucket: str, key: str = MANIFEST_KEY,
+                  max_fragments: int = MAX_FRAGMENTS) -> tuple[polars.DataFrame, str | None]:
+    """
+    Loads the Manifest from the S3 Bucket, merged with the fragments not compacted yet. More than
+    max_fragments fragments are compacted first.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: Manifest Key
+    :param max_fragments: Number of fragments read before compacting them
+    :return: Manifest Data Frame and the ETag of the compacted version (None when not present)
+    """
+
+    keys = list_fragments(client, bucket, key)
+    if len(keys) > max_fragments and fold_fragments(client, bucket, key, keys) > 0:
+        keys = list_fragments(client, bucket, key)
+
+    frame, etag = load_frame(client, bucket, key)
+    fragments = load_fragments(client, bucket, keys)
+    if frame is None and not fragments:
+        return polars.DataFrame(schema=MANIFEST_SCHEMA), None
+    return merge_entries(frame, fragments), etag
+
+
+def update_manifest(client: BaseClient, bucket: str, entries: list[dict],
+                    key: str = MANIFEST_KEY) -> None:
+    """
+    Records the Entries as a new Manifest fragment. Each update is its own object, so concurrent
+    writers never contend on the Manifest; the fragments are folded in by compact_manifest.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param entries: Manifest Entries to upsert
+    :param key: Manifest Key
+    :return: None
+    """
+
+    if not entries:
+        return
+
+    stream = BytesIO()
+    polars.DataFrame(entries, schema=MANIFEST_SCHEMA).write_parquet(stream)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    client.put_object(Bucket=bucket, Key=f"{get_fragment_prefix(key)}{stamp}-{uuid.uuid4().hex}"
+                      f".parquet", Body=stream.getvalue())
+
+
+def compact_manifest(client: BaseClient, bucket: str, key: str = MANIFEST_KEY) -> int:
+    """
+    Folds the Manifest fragments into the Manifest with one conditional write and removes them.
+    When the write keeps conflicting the fragments are left for the next compaction, readers still
+    see their Entries.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: Manifest Key
+    :return: Number of fragments compacted
+    """
+
+    return fold_fragments(client, bucket, key, list_fragments(client, bucket, key))
+
+
+def fold_fragments(client: BaseClient, bucket: str, key: str, keys: list[str]) -> int:
+    """
+    Folds the listed Manifest fragments into the Manifest and removes them.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: Manifest Key
+    :param keys: Fragment Keys
+    :return: Number of fragments compacted, 0 when the write was deferred
+    """
+
+    if not keys:
+        return 0
+
+    fragments = load_fragments(client, bucket, keys)
+    try:
+        replace_frame(client, bucket, key, lambda manifest: merge_entries(manifest, fragments))
+    except RuntimeError as ex:
+        logging.getLogger(__name__).warning('Manifest compaction deferred: %s', ex)
+        return 0
+
+    for start in range(0, len(keys), 1000):
+        client.delete_objects(Bucket=bucket, Delete={
+            'Objects': [{'Key': x} for x in keys[start:start + 1000]], 'Quiet': True})
+    return len(keys)
+
+
+def remove_entries(client: BaseClient, bucket: str, keys: list[str],
+                   key: str = MANIFEST_KEY) -> int:
+    """
+    Removes the Entries of deleted files. The fragments are compacted first, so none of them adds
+    the Entries back.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param keys: S3 Keys of the deleted files
+    :param key: Manifest Key
+    :return: Number of Entries removed
+    """
+
+    manifest, _ = load_manifest(client, bucket, key)
+    removed = manifest.filter(polars.col('key').is_in(keys)).height
+    if removed == 0:
+        return 0
+
+    compact_manifest(client, bucket, key)
+    try:
+        replace_frame(client, bucket, key,
+                      lambda current: merge_entries(current, []).filter(
+                          ~polars.col('key').is_in(keys)))
+    except RuntimeError as ex:
+        logging.getLogger(__name__).warning('Manifest Entries not removed: %s', ex)
+        return 0
+    return removed
+
+
+def find_files(manifest: polars.DataFrame, entity: str, **filters) -> list[str]:
+    """
+    Plans the Files to read for an Entity from the Manifest.
+    :param manifest: Manifest Data Frame
+    :param entity: Entity Name (schedules, teams, players, games)
+    :keyword year: Optional Year Value
+    :keyword game_type: Optional Game Type
+    :keyword week: Optional Week Value
+    :keyword game_id: Optional Game ID, pruned on the file min/max
+    :keyword team: Optional Team Name, pruned on the file min/max
+    :keyword player_name: Optional Player Name, pruned on the file min/max
+    :return: List of S3 Keys
+    """
+
+    predicate = polars.col('entity') == entity
+    for partition in ('year', 'game_type', 'week'):
+        if filters.get(partition) is not None:
+            predicate &= polars.col(partition) == filters[partition]
+
+    for column in STAT_COLUMNS:
+        if filters.get(column) is not None:
+            value = str(filters[column])
+            predicate &= (polars.col(f"min_{column}").is_null()
+                          | ((polars.col(f"min_{column}") <= value)
+                             & (polars.col(f"max_{column}") >= value)))
+
+    return manifest.filter(predicate)['key'].to_list()
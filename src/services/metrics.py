@@ -0,0 +1,313 @@
+"""
+Lightweight per-stage Instrumentation of the Stats pipeline.
+
+Stages such as browser startup, page loads, script marshalling, parsing, Data Frame construction,
+Parquet encoding and S3 uploads record their duration, bytes and rows. Recording is disabled by
+default; a disabled stage returns a shared no-op timer so instrumented code only pays for a flag
+check. When enabled, each record can be logged as a JSON line, and the run totals are exported as
+a summary table and a Prometheus textfile (also accepted by a Pushgateway).
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+
+class StageTimer:
+    """
+    Times a single stage and records it when the block exits.
+    """
+    __slots__ = ('metrics', 'name', 'start', 'bytes', 'rows', 'previous')
+
+    def __init__(self, metrics: 'Metrics', name: str) -> None:
+        """
+        Stage Timer Constructor.
+        :param metrics: Metrics receiving the record
+        :param name: Stage Name
+        """
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+        self.bytes = 0
+        self.rows = 0
+        self.previous: str | None = None
+
+    def add(self, size: int = 0, rows: int = 0) -> None:
+        """
+        Adds bytes and rows processed by the stage.
+        :param size: Bytes
+        :param rows: Rows
+        :return: None
+        """
+        self.bytes += size
+        self.rows += rows
+
+    def __enter__(self) -> 'StageTimer':
+        context = self.metrics.context_entry()
+        self.previous = context[0]
+        context[0] = self.name
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.metrics.record(self.name, time.perf_counter() - self.start, self.bytes, self.rows)
+        self.metrics.context_entry()[0] = self.previous
+
+
+class NullTimer:
+    """
+    Timer used while Metrics are disabled.
+    """
+    __slots__ = ()
+
+    def add(self, size: int = 0, rows: int = 0) -> None:
+        """
+        Ignores the bytes and rows.
+        :param size: Bytes
+        :param rows: Rows
+        :return: None
+        """
+
+    def __enter__(self) -> 'NullTimer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        return None
+
+
+NULL_TIMER = NullTimer()
+
+
+class GameScope:
+    """
+    Sets the Game the stages of the current thread are attributed to.
+    """
+    __slots__ = ('metrics', 'game_id', 'previous')
+
+    def __init__(self, metrics: 'Metrics', game_id: str) -> None:
+        """
+        Game Scope Constructor.
+        :param metrics: Metrics holding the context of the thread
+        :param game_id: Game ID
+        """
+        self.metrics = metrics
+        self.game_id = game_id
+        self.previous: str | None = None
+
+    def __enter__(self) -> 'GameScope':
+        context = self.metrics.context_entry()
+        self.previous = context[1]
+        context[1] = self.game_id
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.metrics.context_entry()[1] = self.previous
+
+
+class Metrics:
+    """
+    Per-stage Metrics of a run, shared by every thread of the process.
+    """
+    enabled: bool
+    json_log: bool
+
+    def __init__(self) -> None:
+        """
+        Metrics Constructor. Metrics start disabled.
+        """
+        self.enabled = False
+        self.json_log = False
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._context: dict[int, list[str | None]] = {}
+        self._stages: dict[str, list[float]] = {}
+        self._games: dict[str, float] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def enable(self, json_log: bool = False) -> None:
+        """
+        Enables recording and resets the totals.
+        :param json_log: Log every record as a JSON line
+        :return: None
+        """
+        with self._lock:
+            self.enabled = True
+            self.json_log = json_log
+            self.started = time.time()
+            self._stages = {}
+            self._games = {}
+            self._context = {}
+
+    def disable(self) -> None:
+        """
+        Disables recording.
+        :return: None
+        """
+        self.enabled = False
+
+    def stage(self, name: str) -> StageTimer | NullTimer:
+        """
+        Returns a Timer for a stage, a no-op Timer while disabled.
+        :param name: Stage Name
+        :return: Timer
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return StageTimer(self, name)
+
+    def game(self, game_id: str) -> 'GameScope | NullTimer':
+        """
+        Attributes the stages recorded by the current thread within the block to a game.
+        :param game_id: Game ID
+        :return: Context Manager
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return GameScope(self, game_id)
+
+    def context_entry(self) -> list[str | None]:
+        """
+        Returns the Stage and Game ID entry of the current thread.
+        :return: List of Stage and Game ID
+        """
+        return self._context.setdefault(threading.get_ident(), [None, None])
+
+    def context(self, thread_id: int) -> tuple[str | None, str | None]:
+        """
+        Returns the Stage and Game ID a thread is currently in, readable from any thread.
+        :param thread_id: Thread Identifier
+        :return: Stage and Game ID
+        """
+        entry = self._context.get(thread_id)
+        if entry is None:
+            return None, None
+        return entry[0], entry[1]
+
+    def record(self, name: str, seconds: float, size: int = 0, rows: int = 0) -> None:
+        """
+        Records a completed stage.
+        :param name: Stage Name
+        :param seconds: Duration
+        :param size: Bytes processed
+        :param rows: Rows processed
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        game_id = self.context(threading.get_ident())[1]
+        with self._lock:
+            totals = self._stages.setdefault(name, [0, 0.0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+            totals[3] += size
+            totals[4] += rows
+            if game_id is not None:
+                self._games[game_id] = self._games.get(game_id, 0.0) + seconds
+
+        if self.json_log:
+            self.logger.info(json.dumps({
+                'stage': name, 'game_id': game_id, 'seconds': round(seconds, 6), 'bytes': size,
+                'rows': rows, 'thread': threading.current_thread().name
+            }))
+
+    def summary(self) -> dict[str, dict]:
+        """
+        Returns the run totals of each stage.
+        :return: Dictionary of Stage Name and Totals
+        """
+        with self._lock:
+            return {x: {'count': int(y[0]), 'seconds': y[1], 'max_seconds': y[2],
+                        'bytes': int(y[3]), 'rows': int(y[4])} for x, y in self._stages.items()}
+
+    def slowest_games(self, count: int = 5) -> list[tuple[str, float]]:
+        """
+        Returns the games with the most recorded time.
+        :param count: Number of games
+        :return: List of Game ID and Seconds
+        """
+        with self._lock:
+            return sorted(self._games.items(), key=lambda x: x[1], reverse=True)[:count]
+
+    def log_summary(self) -> None:
+        """
+        Logs the summary table of the run.
+        :return: None
+        """
+        row_format = '%-15s %8s %10s %10s %10s %14s %10s'
+        self.logger.info(row_format, 'Stage', 'Count', 'Seconds', 'Mean', 'Max', 'Bytes', 'Rows')
+        for name, totals in sorted(self.summary().items(), key=lambda x: -x[1]['seconds']):
+            self.logger.info(row_format, name, totals['count'], f"{totals['seconds']:.3f}",
+                             f"{totals['seconds'] / totals['count']:.3f}",
+                             f"{totals['max_seconds']:.3f}", totals['bytes'], totals['rows'])
+        self.logger.info('Run took %.1f seconds', time.time() - self.started)
+        for game_id, seconds in self.slowest_games():
+            self.logger.info('Game %s took %.3f seconds', game_id, seconds)
+
+    def to_prometheus(self, job: str) -> str:
+        """
+        Formats the run totals in the Prometheus text exposition format.
+        :param job: Job Label
+        :return: Metrics Text
+        """
+        summary = self.summary()
+        lines = []
+        for metric, field, description in (
+                ('stats_stage_calls_total', 'count', 'Number of times the stage ran'),
+                ('stats_stage_seconds_total', 'seconds', 'Seconds spent in the stage'),
+                ('stats_stage_bytes_total', 'bytes', 'Bytes processed by the stage'),
+                ('stats_stage_rows_total', 'rows', 'Rows processed by the stage')):
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend([f'{metric}{{job="{job}",stage="{x}"}} {y[field]}'
+                          for x, y in sorted(summary.items())])
+        lines.append('# HELP stats_run_seconds Seconds since the run started')
+        lines.append('# TYPE stats_run_seconds gauge')
+        lines.append(f'stats_run_seconds{{job="{job}"}} {time.time() - self.started:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str, job: str) -> None:
+        """
+        Writes the Prometheus textfile. The file is replaced atomically so a collector never reads
+        a partial file.
+        :param path: File Path
+        :param job: Job Label
+        :return: None
+        """
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus(job))
+        os.replace(f"{path}.tmp", path)
+
+    def report(self, path: str | None = None, job: str = 'football_stats') -> None:
+        """
+        Logs the summary table and writes the optional textfile at the end of a run.
+        :param path: Optional Prometheus textfile Path
+        :param job: Job Label
+        :return: None
+        """
+        if not self.enabled:
+            return
+        self.log_summary()
+        if path:
+            self.write_textfile(path, job)
+
+
+METRICS = Metrics()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the Metrics options to a script's Argument Parser.
+    :param parser: Argument Parser
+    :return: None
+    """
+    parser.add_argument('-m', '--metrics', action='store_true',
+                        help='Record the per-stage timings and log a summary table')
+    parser.add_argument('--metrics-json', action='store_true',
+                        help='Log every recorded stage as a JSON line')
+    parser.add_argument('--metrics-file', type=str,
+                        help='Path of the Prometheus textfile written at the end of the run')
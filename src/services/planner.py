@@ -0,0 +1,105 @@
+"""
+Pre-fetch Planner for the games of a Schedule File.
+
+Games that have not been played only load pages without stats. The planner defers them, based on
+the game date and, when the schedule was pulled in the same run, the game status, to a pending
+list in the schedule format that a later run picks up once the games are played.
+"""
+
+from datetime import date
+from io import BytesIO
+from typing import NamedTuple
+
+import polars
+from botocore.client import BaseClient
+
+from services.sharding import get_base_key
+
+PENDING_PREFIX = 'pending'
+UNPLAYED_STATES = ['pre', 'in']
+
+
+class Plan(NamedTuple):
+    """
+    Games of a Schedule File split into those to fetch and those deferred
+    """
+    ready: polars.DataFrame
+    pending: polars.DataFrame
+
+
+def plan_games(frame: polars.DataFrame, today: str | None = None) -> Plan:
+    """
+    Splits the Schedule games into played and unplayed games. A game is unplayed when its date is
+    after today, or when it is dated today and its status has not reached final. The status of
+    earlier games is not trusted as the Schedule File may have been pulled before they were played.
+    :param frame: Schedule Data Frame
+    :param today: Optional Game Date of today (YYYYMMDD)
+    :return: Plan
+    """
+
+    if 'game_date' not in frame.columns:
+        return Plan(frame, frame.clear())
+
+    today = today or date.today().strftime('%Y%m%d')
+    game_date = polars.col('game_date').cast(polars.String)
+    unplayed = game_date > today
+    if 'status' in frame.columns:
+        unplayed = unplayed | ((game_date == today)
+                               & polars.col('status').is_in(UNPLAYED_STATES))
+
+    mask = frame.select(unplayed.fill_null(False)).to_series()
+    return Plan(frame.filter(~mask), frame.filter(mask))
+
+
+def defer_games(plan: Plan, game_ids: list[str]) -> Plan:
+    """
+    Moves games that were planned but not processed to the pending games.
+    :param plan: Plan
+    :param game_ids: Game IDs left unprocessed
+    :return: Plan
+    """
+
+    unprocessed = polars.col('game_id').cast(polars.String).is_in(game_ids)
+    return Plan(plan.ready.filter(~unprocessed),
+                polars.concat([plan.pending, plan.ready.filter(unprocessed)], how='diagonal'))
+
+
+def get_pending_key(output_key: str) -> str:
+    """
+    Returns the Key of the pending list of an output (pending/teams/2023/2/week_1.parquet).
+    :param output_key: S3 Key of the Stats output
+    :return: S3 Key
+    """
+
+    return f"{PENDING_PREFIX}/{output_key}"
+
+
+def get_schedule_key(pending_key: str, stat_type: str) -> str:
+    """
+    Returns the Key of the Schedule File a pending list was deferred from. The pending list of a
+    Shard's part maps to the Schedule File of the whole week.
+    :param pending_key: S3 Key of the pending list
+    :param stat_type: Stats Type
+    :return: S3 Schedule File Key
+    """
+
+    return get_base_key(f"schedules/{pending_key.removeprefix(f'{PENDING_PREFIX}/{stat_type}/')}")
+
+
+def write_pending(client: BaseClient, bucket: str, key: str, pending: polars.DataFrame) -> None:
+    """
+    Stores the pending list, or removes it once no game is left pending.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: S3 Key of the pending list
+    :param pending: Unplayed Schedule games
+    :return: None
+    """
+
+    if len(pending) == 0:
+        client.delete_object(Bucket=bucket, Key=key)
+        return
+
+    stream = BytesIO()
+    pending.write_parquet(stream)
+    client.put_object(Bucket=bucket, Key=key, Body=stream.getvalue())
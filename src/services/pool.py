@@ -0,0 +1,223 @@
+"""
+Pool of warm Services shared between worker threads.
+
+A Pool is a context manager: leaving it quits the browser of every Service, even when an exception
+escapes the block, instead of leaving them to the garbage collector.
+"""
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Generic, Iterator, TypeVar
+
+T = TypeVar('T')
+
+
+class ServiceBudget:
+    """
+    Limit on the Services alive across several Pools. Each Service owns a Web Browser, so Pools
+    sharing a Budget never run more browsers together than its size: when the limit is reached,
+    an idle Service of another Pool is released to make room for the new one.
+    """
+    size: int
+    pools: list['ServicePool']
+
+    def __init__(self, size: int) -> None:
+        """
+        Budget Constructor
+        :param size: Maximum number of Services alive across the Pools
+        """
+        self.size = max(size, 1)
+        self.pools = []
+        self._alive = 0
+        self._condition = threading.Condition()
+
+    def reserve(self, pool: 'ServicePool') -> bool:
+        """
+        Reserves room for a new Service of a Pool, releasing an idle Service of another Pool when
+        the limit is reached. Otherwise waits until a Service is returned to any Pool.
+        :param pool: Pool creating the Service
+        :return: True when reserved, False when the caller should look for an idle Service again
+        """
+
+        with self._condition:
+            if self._alive < self.size:
+                self._alive += 1
+                return True
+            if any(x.discard_idle() for x in self.pools if x is not pool):
+                return True
+            self._condition.wait(timeout=1)
+            return False
+
+    def free(self) -> None:
+        """
+        Frees the room of a Service that was released.
+        :return: None
+        """
+        with self._condition:
+            self._alive -= 1
+            self._condition.notify_all()
+
+    def notify(self) -> None:
+        """
+        Wakes the Pools waiting for room once a Service is returned.
+        :return: None
+        """
+        with self._condition:
+            self._condition.notify_all()
+
+
+def shutdown(service: object) -> None:
+    """
+    Quits the browser of a Service that is no longer pooled.
+    :param service: Service
+    :return: None
+    """
+    close = getattr(service, 'close', None)
+    if callable(close):
+        close()
+
+
+class ServicePool(Generic[T]):
+    """
+    Pool of Service instances. Each Service owns a Web Browser, so the pool keeps the browsers
+    warm between games and bounds the number of browsers running at the same time.
+    """
+    factory: Callable[[], T]
+    size: int
+    budget: ServiceBudget | None
+
+    def __init__(self, factory: Callable[[], T], size: int = 1,
+                 budget: ServiceBudget | None = None) -> None:
+        """
+        Pool Constructor. Services are created on demand up to the pool size.
+        :param factory: Function creating a new Service
+        :param size: Maximum number of Services
+        :param budget: Optional Budget of the Services alive across several Pools
+        """
+        self.factory = factory
+        self.size = max(size, 1)
+        self.budget = budget
+        if budget is not None:
+            budget.pools.append(self)
+        self._idle: queue.Queue = queue.Queue()
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'ServicePool[T]':
+        """
+        Enters the Pool.
+        :return: Service Pool
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Closes the Pool on leaving the block.
+        :return: None
+        """
+        self.close()
+
+    @contextmanager
+    def borrow(self) -> Iterator[T]:
+        """
+        Borrows a Service from the Pool, waiting for one to be returned when all are in use.
+        :return: Service
+        """
+
+        service = self._acquire()
+        try:
+            yield service
+        finally:
+            if self._closed:
+                shutdown(service)
+                self._release_slot()
+            else:
+                self._idle.put(service)
+            if self.budget is not None:
+                self.budget.notify()
+
+    def _acquire(self) -> T:
+        """
+        Takes an idle Service or creates a new one when the pool and its Budget are not full.
+        :return: Service
+        """
+
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+
+            if not create and self.budget is None:
+                return self._idle.get()
+            if not create:
+                try:
+                    return self._idle.get(timeout=1)
+                except queue.Empty:
+                    continue
+            if self.budget is None or self.budget.reserve(self):
+                return self._create()
+            with self._lock:
+                self._created -= 1
+
+    def _create(self) -> T:
+        """
+        Creates a new Service, giving its slot back when the creation fails.
+        :return: Service
+        """
+
+        try:
+            return self.factory()
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        """
+        Gives back the slot of a Service that was released or failed to start.
+        :return: None
+        """
+        with self._lock:
+            self._created -= 1
+        if self.budget is not None:
+            self.budget.free()
+
+    def discard_idle(self) -> bool:
+        """
+        Quits the browser of one idle Service, keeping its Budget room for the caller.
+        :return: True when a Service was released
+        """
+
+        try:
+            service = self._idle.get_nowait()
+        except queue.Empty:
+            return False
+        with self._lock:
+            self._created -= 1
+        shutdown(service)
+        return True
+
+    def close(self) -> None:
+        """
+        Quits the browsers of the idle Services. Services still borrowed are quit when they are
+        returned.
+        :return: None
+        """
+
+        self._closed = True
+        while True:
+            try:
+                service = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                shutdown(service)
+            finally:
+                self._release_slot()
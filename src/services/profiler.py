@@ -0,0 +1,242 @@
+"""
+Profiling mode capturing the CPU and allocation profiles of a single run.
+
+A run is wrapped in cProfile for the main thread, a sampler that records the stacks of every thread
+tagged with the Stage and Game ID it is in, and tracemalloc for the top allocation sites. The
+artifacts are written to a local directory or an S3 prefix once the run ends. Stacks are keyed by
+function rather than line and capped in number, so the samples stay bounded on long runs, and the
+time spent sampling is reported with them so the overhead of a profiled run is known.
+"""
+
+import argparse
+import cProfile
+import io
+import logging
+import marshal
+import os
+import os.path
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator
+
+from services.metrics import METRICS
+
+if TYPE_CHECKING:
+    from botocore.client import BaseClient
+
+MAX_DEPTH = 64
+MAX_STACKS = 10000
+DEFAULT_INTERVAL = 0.05
+OVERFLOW_FRAME = '[other stacks]'
+
+
+class Profiler:  # pylint: disable=too-many-instance-attributes
+    """
+    CPU, Stack Sampling and Allocation Profiler of a run.
+    """
+    interval: float
+    top: int
+    frames: int
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, top: int = 25, frames: int = 1) -> None:
+        """
+        Profiler Constructor.
+        :param interval: Seconds between stack samples
+        :param top: Number of entries in the text reports
+        :param frames: Number of frames tracemalloc keeps per allocation
+        """
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.started = 0.0
+        self.seconds = 0.0
+        self.sampling = 0.0
+        self._profile = cProfile.Profile()
+        self._samples: Counter[str] = Counter()
+        self._names: dict = {}
+        self._stages: Counter[tuple[str, str]] = Counter()
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._peak = 0
+
+    def start(self) -> None:
+        """
+        Starts profiling. The Metrics are enabled so the samples can be tagged with the Stage.
+        :return: None
+        """
+        if not METRICS.enabled:
+            METRICS.enable()
+        tracemalloc.start(self.frames)
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_, name='profiler', daemon=True)
+        self._sampler.start()
+        self.started = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self) -> None:
+        """
+        Stops profiling and takes the allocation snapshot.
+        :return: None
+        """
+        self._profile.disable()
+        self.seconds = time.perf_counter() - self.started
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')
+        ])
+        self._peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def _sample_(self) -> None:
+        """
+        Samples the stacks of the other threads until stopped. Once MAX_STACKS distinct stacks are
+        recorded, new stacks are counted under a single overflow entry per Stage and Game.
+        :return: None
+        """
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            for thread_id, frame in frames.items():
+                if thread_id == own:
+                    continue
+                stage, game_id = METRICS.context(thread_id)
+                tags = (stage or 'none', game_id or 'none')
+                self._stages[tags] += 1
+                key = ';'.join([*tags, *self._stack_(frame)])
+                if key not in self._samples and len(self._samples) >= MAX_STACKS:
+                    key = ';'.join([*tags, OVERFLOW_FRAME])
+                self._samples[key] += 1
+            del frames
+            self.sampling += time.perf_counter() - start
+
+    def _stack_(self, frame) -> list[str]:
+        """
+        Formats a stack from the outermost to the innermost frame. Frame names are cached per
+        code object.
+        :param frame: Innermost Frame
+        :return: List of Frame Names
+        """
+        stack: list[str] = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            code = frame.f_code
+            name = self._names.get(code)
+            if name is None:
+                name = self._names[code] = \
+                    f"{code.co_name} ({os.path.basename(code.co_filename)})"
+            stack.append(name)
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def artifacts(self) -> dict[str, bytes]:
+        """
+        Returns the profile artifacts of a stopped run.
+        :return: Dictionary of File Name and Content
+        """
+        stream = io.StringIO()
+        report = pstats.Stats(self._profile, stream=stream)
+        report.sort_stats('cumulative').print_stats(self.top)
+
+        total = sum(self._stages.values()) or 1
+        stages = [f"{'Stage':<15} {'Game':<12} {'Samples':>8} {'Share':>7}"]
+        stages.extend([f"{x[0]:<15} {x[1]:<12} {y:>8} {y / total:>7.1%}"
+                       for x, y in self._stages.most_common()])
+
+        stages.append(f"Sampling took {self.sampling:.3f} seconds, "
+                      f"{self.sampling / max(self.seconds, 1e-9):.2%} of the run")
+
+        allocations = [f"Run took {self.seconds:.1f} seconds, "
+                       f"peak traced memory {self._peak} bytes"]
+        if self._snapshot is not None:
+            allocations.extend([str(x) for x in
+                                self._snapshot.statistics('lineno')[:self.top]])
+
+        return {
+            'cpu.prof': marshal.dumps(report.stats),  # type: ignore[attr-defined]
+            'cpu.txt': stream.getvalue().encode('utf-8'),
+            'samples.folded': '\n'.join(f"{x} {y}" for x, y in
+                                        sorted(self._samples.items())).encode('utf-8'),
+            'stages.txt': '\n'.join(stages).encode('utf-8'),
+            'allocations.txt': '\n'.join(allocations).encode('utf-8')
+        }
+
+
+def write_artifacts(artifacts: dict[str, bytes], location: str,
+                    client: 'BaseClient | None' = None) -> list[str]:
+    """
+    Writes the profile artifacts to a local directory or an S3 prefix.
+    :param artifacts: Dictionary of File Name and Content
+    :param location: Local directory or S3 URL (s3://bucket/prefix)
+    :param client: S3 Client, required for an S3 location
+    :return: List of written paths
+    """
+
+    paths = []
+    if location.startswith('s3://'):
+        bucket, _, prefix = location.removeprefix('s3://').partition('/')
+        for name, content in artifacts.items():
+            key = '/'.join(x for x in [prefix.strip('/'), name] if x)
+            client.put_object(Bucket=bucket, Key=key, Body=content)  # type: ignore[union-attr]
+            paths.append(f"s3://{bucket}/{key}")
+        return paths
+
+    os.makedirs(location, exist_ok=True)
+    for name, content in artifacts.items():
+        path = os.path.join(location, name)
+        with open(path, 'wb') as file:
+            file.write(content)
+        paths.append(path)
+    return paths
+
+
+@contextmanager
+def profile_run(location: str | None, default_location: str, name: str,
+                client_factory: Callable[[], 'BaseClient']) -> Iterator[Profiler | None]:
+    """
+    Profiles the block when a location is given and writes the artifacts to
+    {location}/{name}-{timestamp}/ once the block exits, also when it fails.
+    :param location: Local directory or S3 URL, an empty string for the default location and
+    None when profiling is disabled
+    :param default_location: Location used for an empty location
+    :param name: Name of the run
+    :param client_factory: Function creating the S3 Client
+    :return: Profiler, None when disabled
+    """
+
+    if location is None:
+        yield None
+        return
+
+    profiler = Profiler()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        target = f"{(location or default_location).rstrip('/')}/{name}-" \
+                 f"{time.strftime('%Y%m%dT%H%M%S')}"
+        paths = write_artifacts(profiler.artifacts(), target,
+                                client_factory() if target.startswith('s3://') else None)
+        logging.getLogger(__name__).info('Profile written to %s', ', '.join(paths))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the Profiling option to a script's Argument Parser.
+    :param parser: Argument Parser
+    :return: None
+    """
+    parser.add_argument('--profile', type=str, nargs='?', const='',
+                        help='Profile the run and write the artifacts to a local directory or '
+                             's3://bucket/prefix (default s3://{bucket}/profiles)')
@@ -0,0 +1,153 @@
+"""
+Fantasy Points scoring of the Player Stats.
+
+A Scoring Config declares the points per unit of each Statistic, keyed by Statistic Type and
+Statistic Code, and bonuses awarded once a Statistic reaches a threshold in a game. Any number of
+configs are evaluated together: their rates are joined to the Player Stats as one column per config
+and the points of every player and game are summed in a single aggregation.
+"""
+
+import json
+import re
+from typing import NamedTuple
+
+import polars
+
+PLAYER_KEYS = ['player_url', 'player_name', 'team', 'opponent', 'year', 'game_type', 'week']
+WEEK_KEY_PATTERN = re.compile(r'^players/[^/]+/[^/]+/week_\d+\.parquet$')
+
+STANDARD_POINTS = {
+    'passing': {'yds': 0.04, 'td': 4.0, 'int': -2.0},
+    'rushing': {'yds': 0.1, 'td': 6.0},
+    'receiving': {'yds': 0.1, 'td': 6.0},
+    'fumbles': {'lost': -2.0},
+    'kicking': {'xpm': 1.0, 'fgm': 3.0},
+    'kickReturns': {'td': 6.0},
+    'puntReturns': {'td': 6.0}
+}
+
+
+class Bonus(NamedTuple):
+    """
+    Points awarded once a Statistic reaches a threshold in a game.
+    """
+    statistic_type: str
+    statistic_code: str
+    threshold: float
+    points: float
+
+
+class ScoringConfig(NamedTuple):
+    """
+    Declarative Fantasy Scoring rules.
+    """
+    name: str
+    points: dict[str, dict[str, float]]
+    bonuses: tuple[Bonus, ...] = ()
+
+
+PRESETS = {
+    'standard': ScoringConfig('standard', STANDARD_POINTS),
+    'half_ppr': ScoringConfig('half_ppr', {**STANDARD_POINTS, 'receiving': {
+        **STANDARD_POINTS['receiving'], 'rec': 0.5}}),
+    'ppr': ScoringConfig('ppr', {**STANDARD_POINTS, 'receiving': {
+        **STANDARD_POINTS['receiving'], 'rec': 1.0}})
+}
+
+
+def load_config(path: str) -> ScoringConfig:
+    """
+    Loads a Scoring Config from a JSON file:
+    {"name": "custom", "points": {"passing": {"yds": 0.04}}, "bonuses": [{"statistic_type":
+    "passing", "statistic_code": "yds", "threshold": 300, "points": 3}]}
+    :param path: File Path
+    :return: Scoring Config
+    """
+
+    with open(path, 'r', encoding='utf-8') as file:
+        content = json.load(file)
+    return ScoringConfig(str(content['name']),
+                         {x: {k: float(v) for k, v in y.items()}
+                          for x, y in content.get('points', {}).items()},
+                         tuple(Bonus(str(x['statistic_type']), str(x['statistic_code']),
+                                     float(x['threshold']), float(x['points']))
+                               for x in content.get('bonuses', [])))
+
+
+def get_config(value: str) -> ScoringConfig:
+    """
+    Returns a preset Scoring Config by name or loads one from a JSON file.
+    :param value: Preset Name or File Path
+    :return: Scoring Config
+    """
+    return PRESETS[value] if value in PRESETS else load_config(value)
+
+
+def create_rates(configs: list[ScoringConfig]) -> polars.DataFrame:
+    """
+    Creates the rates table holding the points per unit of every config as one column each.
+    :param configs: Scoring Configs
+    :return: Data Frame keyed by Statistic Type and Statistic Code
+    """
+
+    keys = sorted({(x, y) for config in configs for x, codes in config.points.items()
+                   for y in codes})
+    return polars.DataFrame({
+        'statistic_type': [x[0] for x in keys],
+        'statistic_code': [x[1] for x in keys],
+        **{config.name: [config.points.get(x, {}).get(y, 0.0) for x, y in keys]
+           for config in configs}
+    }, schema_overrides={config.name: polars.Float64 for config in configs})
+
+
+def score_expression(config: ScoringConfig) -> polars.Expr:
+    """
+    Returns the points of a Stats row under a config.
+    :param config: Scoring Config
+    :return: Expression
+    """
+
+    value = polars.col('statistic_value').fill_null(0.0)
+    points = value * polars.col(config.name).fill_null(0.0)
+    for bonus in config.bonuses:
+        points = points + polars.when((polars.col('statistic_type') == bonus.statistic_type)
+                                      & (polars.col('statistic_code') == bonus.statistic_code)
+                                      & (value >= bonus.threshold)) \
+            .then(bonus.points).otherwise(0.0)
+    return points
+
+
+def score_players(stats: polars.DataFrame | polars.LazyFrame, configs: list[ScoringConfig],
+                  keys: list[str] | None = None) -> polars.DataFrame:
+    """
+    Computes the Fantasy Points of every player and game under each config, in one join and one
+    aggregation.
+    :param stats: Player Stats
+    :param configs: Scoring Configs, their names become the point columns
+    :param keys: Columns identifying a player's game (default the player, teams and partitions)
+    :return: Data Frame of the keys and one points column per config
+    :raises ValueError: When config names repeat or clash with a Stats column
+    """
+
+    frame = stats.lazy()
+    columns = frame.collect_schema().names()
+    names = [x.name for x in configs]
+    if len(set(names)) != len(names) or set(names) & set(columns):
+        raise ValueError(f"Scoring Config names must be unique and not Stats columns: {names}")
+    keys = [x for x in keys or PLAYER_KEYS if x in columns]
+    return frame.join(create_rates(configs).lazy(), on=['statistic_type', 'statistic_code'],
+                      how='left') \
+        .group_by(keys) \
+        .agg([score_expression(x).sum().round(2).alias(x.name) for x in configs]) \
+        .sort(keys) \
+        .collect()
+
+
+def get_fantasy_key(key: str) -> str:
+    """
+    Returns the Key of the Fantasy Points of a Player Stats week output
+    (players/2023/regular/week_1.parquet to fantasy/2023/regular/week_1.parquet).
+    :param key: Player Stats S3 Key
+    :return: S3 Key
+    """
+    return key.replace('players', 'fantasy', 1)
@@ -0,0 +1,156 @@
+"""
+Deterministic Sharding of Schedule games across independent runs.
+
+Each game is assigned to a shard by a stable hash of its Game ID, so N runs given the same shard
+count split a Schedule File without coordinating. Each shard writes its own part of the week
+output and a finalize step merges the parts into the canonical week file. Runs of a single game
+write the game's own file next to the parts, merged into the week file in the same way.
+"""
+
+import re
+import zlib
+from io import BytesIO
+
+import polars
+from botocore.client import BaseClient
+
+from services.storage import load_frame
+
+PART_PATTERN = re.compile(r'/part-\d+-of-\d+\.parquet$')
+
+
+def get_shard(game_id: str, count: int) -> int:
+    """
+    Returns the Shard of a game. CRC32 is stable across processes, unlike the built-in hash.
+    :param game_id: Game ID
+    :param count: Number of Shards
+    :return: Shard Index
+    """
+
+    return zlib.crc32(str(game_id).encode('utf-8')) % count
+
+
+def select_shard(frame: polars.DataFrame, index: int, count: int) -> polars.DataFrame:
+    """
+    Selects the Schedule games assigned to a Shard.
+    :param frame: Schedule Data Frame
+    :param index: Shard Index
+    :param count: Number of Shards
+    :return: Schedule Data Frame
+    """
+
+    mask = [get_shard(x, count) == index for x in frame['game_id'].to_list()]
+    return frame.filter(polars.Series(mask, dtype=polars.Boolean))
+
+
+def get_part_key(key: str, index: int, count: int) -> str:
+    """
+    Returns the Key of a Shard's part of an output (teams/2023/2/week_1/part-0-of-4.parquet).
+    :param key: Week Output S3 Key
+    :param index: Shard Index
+    :param count: Number of Shards
+    :return: S3 Key
+    """
+
+    return f"{key.removesuffix('.parquet')}/part-{index}-of-{count}.parquet"
+
+
+def get_base_key(key: str) -> str:
+    """
+    Returns the Week Key a part belongs to, or the key itself when it is not a part.
+    :param key: S3 Key
+    :return: S3 Key
+    """
+
+    return PART_PATTERN.sub('.parquet', key)
+
+
+def get_game_key(output_key: str, game_id: str) -> str:
+    """
+    Returns the Key of a single game's file within a week (teams/2023/2/week_1/401547379.parquet).
+    :param output_key: Week Output S3 Key
+    :param game_id: Game ID
+    :return: S3 Key
+    """
+    return f"{output_key.removesuffix('.parquet')}/{game_id}.parquet"
+
+
+def list_game_files(client: BaseClient, bucket: str, output_key: str) -> list[str]:
+    """
+    Lists the game files of a week output, leaving out the Shard parts.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param output_key: Week Output S3 Key
+    :return: List of S3 Keys
+    """
+
+    keys: list[str] = []
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{output_key.removesuffix('.parquet')}/"):
+        keys.extend(x['Key'] for x in page.get('Contents', [])
+                    if x['Key'].endswith('.parquet') and not PART_PATTERN.search(x['Key']))
+    return sorted(keys)
+
+
+def write_part(client: BaseClient, bucket: str, key: str, frame: polars.DataFrame) -> int:
+    """
+    Writes a Shard's part. Parts are intermediate files and are not recorded in the Manifest.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: S3 Key of the part
+    :param frame: Stats of the Shard, empty when the Shard loaded no Stats
+    :return: Size in bytes
+    """
+
+    stream = BytesIO()
+    frame.write_parquet(stream)
+    body = stream.getvalue()
+    client.put_object(Bucket=bucket, Key=key, Body=body)
+    return len(body)
+
+
+def load_parts(client: BaseClient, bucket: str, key: str,
+               count: int) -> list[polars.DataFrame] | None:
+    """
+    Loads every part of an output.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: Week Output S3 Key
+    :param count: Number of Shards
+    :return: Parts in Shard order, None when any part is missing
+    """
+
+    parts = []
+    for index in range(count):
+        frame, _ = load_frame(client, bucket, get_part_key(key, index, count))
+        if frame is None:
+            return None
+        parts.append(frame)
+    return parts
+
+
+def delete_parts(client: BaseClient, bucket: str, key: str, count: int) -> None:
+    """
+    Removes the parts of an output once they are merged.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: Week Output S3 Key
+    :param count: Number of Shards
+    :return: None
+    """
+
+    delete_files(client, bucket, [get_part_key(key, x, count) for x in range(count)])
+
+
+def delete_files(client: BaseClient, bucket: str, keys: list[str]) -> None:
+    """
+    Removes intermediate files once they are merged, a thousand per request.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param keys: S3 Keys
+    :return: None
+    """
+
+    for index in range(0, len(keys), 1000):
+        client.delete_objects(Bucket=bucket, Delete={
+            'Objects': [{'Key': x} for x in keys[index:index + 1000]], 'Quiet': True})
@@ -0,0 +1,223 @@
+"""
+Memory-budgeted accumulation of the per-game Stats.
+
+Game frames are buffered in memory until their estimated size reaches the budget. The buffer is
+then written to an Arrow IPC temp file and released, so the memory held stays below the budget
+however many games are processed. The final output is written from the spill files one batch at
+a time, each batch aligned to the combined schema of all of them.
+"""
+
+import logging
+import os
+import os.path
+import shutil
+import tempfile
+from typing import Any, Callable, Iterable, Iterator
+
+import polars
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
+from botocore.client import BaseClient
+
+from services.changes import combine_hash, hash_rows
+from services.metrics import METRICS
+
+
+class SpillAccumulator:
+    """
+    Accumulates Data Frames within a memory budget, spilling to Arrow IPC temp files.
+    """
+    budget: int
+    directory: str
+
+    def __init__(self, budget: int, directory: str | None = None) -> None:
+        """
+        Spill Accumulator Constructor.
+        :param budget: Bytes of buffered frames before they are spilled
+        :param directory: Optional parent directory of the spill files (default the temp dir)
+        """
+        self.budget = budget
+        self.directory = tempfile.mkdtemp(prefix='spill-', dir=directory)
+        self.files: list[str] = []
+        self.spilled_bytes = 0
+        self._buffer: list[polars.DataFrame] = []
+        self._buffered = 0
+        self._rows = 0
+
+    def append(self, frame: polars.DataFrame) -> None:
+        """
+        Adds a frame, spilling the buffer once it reaches the budget.
+        :param frame: Data Frame
+        :return: None
+        """
+        self._buffer.append(frame)
+        self._buffered += int(frame.estimated_size())
+        self._rows += len(frame)
+        if self._buffered >= self.budget:
+            self.spill()
+
+    def extend(self, frames: Iterable[polars.DataFrame]) -> None:
+        """
+        Adds several frames, one at a time.
+        :param frames: Data Frames
+        :return: None
+        """
+        for frame in frames:
+            self.append(frame)
+
+    def append_parquet(self, path: str,
+                       update: Callable[[polars.DataFrame], polars.DataFrame]) -> None:
+        """
+        Adds the rows of a Parquet file one record batch at a time.
+        :param path: File Path
+        :param update: Function applied to each batch before it is added, such as a filter
+        :return: None
+        """
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches():
+            self.append(update(polars.DataFrame(polars.from_arrow(batch))))
+
+    def spill(self) -> None:
+        """
+        Writes the buffered frames to a spill file and releases them.
+        :return: None
+        """
+        if not self._buffer:
+            return
+        path = os.path.join(self.directory, f"batch-{len(self.files):05d}.arrow")
+        polars.concat(self._buffer, how='diagonal_relaxed').write_ipc(path, compression='lz4')
+        self.files.append(path)
+        self.spilled_bytes += os.path.getsize(path)
+        logging.getLogger(__name__).info('Spilled %s buffered bytes to %s', self._buffered, path)
+        self._buffer = []
+        self._buffered = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __bool__(self) -> bool:
+        return bool(self.files or self._buffer)
+
+    def schema(self) -> polars.Schema:
+        """
+        Returns the combined schema of the accumulated frames, read from the spill file footers.
+        :return: Schema
+        """
+        frames = [polars.DataFrame(schema=polars.read_ipc_schema(x)) for x in self.files] \
+            + [x.clear() for x in self._buffer]
+        if not frames:
+            return polars.Schema()
+        return polars.concat(frames, how='diagonal_relaxed').schema
+
+    def batches(self) -> Iterator[polars.DataFrame]:
+        """
+        Iterates the accumulated frames one spill file at a time, each aligned to the combined
+        schema.
+        :return: Iterator of Data Frames
+        """
+        empty = polars.DataFrame(schema=self.schema())
+        for path in self.files:
+            yield polars.concat([empty, polars.read_ipc(path)], how='diagonal_relaxed')
+        if self._buffer:
+            yield polars.concat([empty, *self._buffer], how='diagonal_relaxed')
+
+    def lazy(self) -> polars.LazyFrame:
+        """
+        Returns the accumulated frames as a single Lazy Frame scanning the spill files.
+        :return: Lazy Frame
+        """
+        frames = [polars.scan_ipc(x) for x in self.files] + [x.lazy() for x in self._buffer]
+        if not frames:
+            return polars.LazyFrame()
+        return polars.concat(frames, how='diagonal_relaxed')
+
+    def _write_(self, create: Callable[[pyarrow.Schema], Any]) -> None:
+        """
+        Writes the accumulated frames one batch at a time.
+        :param create: Function opening the writer for the schema of the output
+        :return: None
+        """
+        writer = None
+        try:
+            for batch in self.batches():
+                table = batch.to_arrow()
+                if writer is None:
+                    schema = table.schema
+                    writer = create(schema)
+                writer.write_table(table.cast(schema))
+            if writer is None:
+                writer = create(polars.DataFrame().to_arrow().schema)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def write_parquet(self, path: str) -> int:
+        """
+        Writes the accumulated frames into a Parquet file, one row group per batch.
+        :param path: File Path
+        :return: Size in bytes
+        """
+        self._write_(lambda x: pyarrow.parquet.ParquetWriter(path, x, compression='zstd'))
+        return os.path.getsize(path)
+
+    def write_ipc(self, path: str, compression: str = 'uncompressed') -> int:
+        """
+        Writes the accumulated frames into an Arrow IPC file, one record batch per batch.
+        :param path: File Path
+        :param compression: IPC Compression (uncompressed, lz4)
+        :return: Size in bytes
+        """
+        options = pyarrow.ipc.IpcWriteOptions(
+            compression=None if compression == 'uncompressed' else compression)
+        self._write_(lambda x: pyarrow.ipc.new_file(path, x, options=options))
+        return os.path.getsize(path)
+
+    def upload(self, client: BaseClient, bucket: str, key: str,
+               metadata: dict | None = None) -> int:
+        """
+        Writes the accumulated frames into a local Parquet file and uploads it in parts.
+        :param client: S3 Client
+        :param bucket: S3 Bucket
+        :param key: S3 Key
+        :param metadata: Optional Object Metadata
+        :return: Size in bytes
+        """
+        path = os.path.join(self.directory, 'output.parquet')
+        try:
+            with METRICS.stage('encode') as timer:
+                size = self.write_parquet(path)
+                timer.add(size, len(self))
+            with METRICS.stage('upload') as timer:
+                client.upload_file(path, bucket, key, ExtraArgs={'Metadata': metadata or {}})
+                timer.add(size)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+        return size
+
+    def content_hash(self) -> str:
+        """
+        Computes the digest of the accumulated content one batch at a time, without sorting or
+        collecting it. The digest matches changes.content_hash of the same content.
+        :return: Hex Digest
+        """
+        schema = self.schema()
+        columns = sorted(schema.names())
+        total = 0
+        for batch in self.batches():
+            total += hash_rows(batch.select(columns))
+        return combine_hash(polars.Schema({x: schema[x] for x in columns}), len(self), total)
+
+    def close(self) -> None:
+        """
+        Removes the spill files.
+        :return: None
+        """
+        self._buffer = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> 'SpillAccumulator':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
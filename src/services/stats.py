@@ -1,56 +1,254 @@
 """
 Services for working with Stats retrieval.
+
+Selenium is imported and the Web Browser started on the first page load, so parsing payloads,
+replaying saved payloads and the paths that never load a page do not pay for either.
+
+With a batch size, the pages of several games are requested with fetch() from a single loaded
+page and their payloads extracted inside the browser, returned in one script round-trip instead of
+one navigation and render per game.
 """
 
+import json
 import logging
 import os
+import os.path
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+from services.driver import ManagedDriver
+from services.fetch import Fetcher, FetchError
+from services.metrics import METRICS
+
+if TYPE_CHECKING:
+    from selenium.webdriver import Chrome
+
+MATCHUP_URL = 'https://www.espn.com/nfl/matchup/_/gameId/{game_id}'
+BOXSCORE_URL = 'https://www.espn.com/nfl/boxscore/_/gameId/{game_id}'
+PAYLOAD_MARKER = "window['__espnfitt__']="
+PAYLOAD_END = ';</script>'
+
+BATCH_SCRIPT = """
+const [urls, marker, end] = arguments;
+const done = arguments[arguments.length - 1];
+const extract = (html) => {
+  const start = html.indexOf(marker);
+  if (start < 0) {
+    return null;
+  }
+  const stop = html.indexOf(end, start);
+  return html.substring(start + marker.length, stop < 0 ? html.length : stop);
+};
+Promise.all(urls.map((url) => fetch(url, {credentials: 'same-origin'})
+  .then((response) => response.ok ? response.text() : '')
+  .then(extract)
+  .catch(() => null))).then(done);
+"""
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+
+def get_payload_path(directory: str, url: str) -> str:
+    """
+    Returns the Path of a saved payload (matchup/gameId/401547300.json).
+    :param directory: Payload Directory
+    :param url: Page URL
+    :return: File Path
+    """
+    parts = [x for x in urlparse(url).path.split('/') if x not in ('', 'nfl', '_')]
+    return os.path.join(directory, *parts) + '.json'
+
+
+def load_payload(text: str | None) -> dict | None:
+    """
+    Parses the Payload JSON extracted from a page.
+    :param text: JSON Text
+    :return: Dictionary, None when the page had no valid payload
+    """
+    if not text:
+        return None
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
 
 
 class BaseService:
     """
     Base Service Class
     """
-    browser: webdriver.Chrome
+    driver: ManagedDriver
+    fetcher: Fetcher
     logger: logging.Logger
+    page_url = ''
 
-    def __init__(self) -> None:
+    def __init__(self, fetcher: Fetcher | None = None) -> None:
         """
-        Base Service Constructor to establish a Web Browser.
+        Base Service Constructor. The Web Browser is managed by a ManagedDriver and started on the
+        first page load and every load goes through the Fetcher of the run. With the REPLAY_DIR
+        environment variable, payloads are read from the saved files instead of loading the pages,
+        and with RECORD_DIR every loaded payload is saved. FETCH_BATCH_SIZE sets the number of
+        games whose pages are prefetched in one batch, 0 to load every page on its own.
+        :param fetcher: Optional Fetcher shared by the Services of a run (default a new Fetcher
+            configured from the environment)
         """
-        options = webdriver.ChromeOptions()
-        options.add_argument('--headless')
-        options.add_argument('--ignore-certificate-errors')
-
-        if os.getenv('SELENIUM_DRIVER'):
-            service = Service(os.getenv('SELENIUM_DRIVER'))
-            self.browser = webdriver.Chrome(options=options, service=service)
-        else:
-            self.browser = webdriver.Chrome(options=options)
+        self.driver = ManagedDriver.from_env()
+        self.fetcher = fetcher or Fetcher.from_env()
+        self.replay_dir = os.getenv('REPLAY_DIR')
+        self.record_dir = os.getenv('RECORD_DIR')
+        self.batch_size = int(os.getenv('FETCH_BATCH_SIZE') or 0)
+        self.prefetched: dict[str, dict] = {}
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def browser(self) -> 'Chrome':
+        """
+        Returns the Web Browser, starting it on first use.
+        :return: Chrome Web Driver
+        """
+        return self.driver.browser
+
     def get_stats_payload(self, url: str) -> dict | None:
         """
-        Retrieves the Stats Payload from the Provided URL.
+        Retrieves the Stats Payload from the Provided URL. A page that fails to load or has no
+        payload is retried under the Fetch Policy.
         :param url: URL to request.
         :return: Dictionary or None.
+        :raises FetchError: When the page failed to load within the retries
+        """
+        if url in self.prefetched:
+            return self.prefetched.pop(url)
+        if self.replay_dir:
+            return self.read_payload(get_payload_path(self.replay_dir, url))
+
+        def load(browser: 'Chrome') -> dict | None:
+            """
+            Loads the page and returns its Stats Payload.
+            :param browser: Web Browser
+            :return: Dictionary or None
+            """
+            with METRICS.stage('page_load'):
+                browser.get(url)
+            with METRICS.stage('script'):
+                return browser.execute_script('return window.__espnfitt__')
+
+        payload = self.fetcher.fetch(lambda: self.driver.run(load), url)
+        self.record_payload(url, payload)
+        return payload
+
+    def get_stats_payloads(self, urls: list[str]) -> dict[str, dict | None]:
+        """
+        Retrieves the Stats Payloads of several pages of the same site in one batch. A single page
+        of the site is loaded, then every page is requested concurrently with fetch() and its
+        payload extracted inside the browser. The payloads come back as JSON text in one script
+        round-trip and are parsed here.
+        :param urls: URLs to request
+        :return: Dictionary of URL and Payload, None for a page without a payload
+        """
+        if not urls:
+            return {}
+        if self.replay_dir:
+            return {x: self.read_payload(get_payload_path(self.replay_dir, x)) for x in urls}
+
+        parts = urlparse(urls[0])
+        origin = f"{parts.scheme}://{parts.netloc}"
+
+        def load(browser: 'Chrome') -> dict[str, dict | None] | None:
+            """
+            Requests the pages from a loaded page of the site and returns their Payloads.
+            :param browser: Web Browser
+            :return: Dictionary of URL and Payload, None when no page had a payload
+            """
+            if not str(getattr(browser, 'current_url', '')).startswith(origin):
+                with METRICS.stage('page_load'):
+                    browser.get(f"{origin}/robots.txt")
+            with METRICS.stage('batch') as timer:
+                texts = browser.execute_async_script(BATCH_SCRIPT, urls, PAYLOAD_MARKER,
+                                                     PAYLOAD_END) or []
+                timer.add(sum(len(x) for x in texts if x), len(urls))
+            results = {x: load_payload(y) for x, y in zip(urls, texts)}
+            return results if any(results.values()) else None
+
+        payloads = self.fetcher.fetch(lambda: self.driver.run(load), f"{len(urls)} pages") or {}
+        for url, payload in payloads.items():
+            self.record_payload(url, payload)
+        return {x: payloads.get(x) for x in urls}
+
+    def prefetch(self, game_ids: list[str]) -> None:
+        """
+        Loads the pages of the games in one batch, so the following get_stats_payload calls are
+        served from memory. Pages missing from the batch are loaded on their own when requested.
+        :param game_ids: Game IDs
+        :return: None
+        """
+        if not self.page_url or self.replay_dir or not game_ids:
+            return
+        try:
+            payloads = self.get_stats_payloads([self.page_url.format(game_id=x)
+                                                for x in game_ids])
+        except FetchError as ex:
+            self.logger.warning('Batch of %s games failed, loading them one by one: %s',
+                                len(game_ids), ex)
+            return
+        self.prefetched.update({x: y for x, y in payloads.items() if y})
+
+    def record_payload(self, url: str, payload: dict | None) -> None:
+        """
+        Saves a loaded payload when recording.
+        :param url: Page URL
+        :param payload: Stats Payload
+        :return: None
+        """
+        if not self.record_dir or not payload:
+            return
+        path = get_payload_path(self.record_dir, url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(payload, file)
+
+    @staticmethod
+    def read_payload(path: str) -> dict | None:
+        """
+        Reads a saved Stats Payload.
+        :param path: File Path
+        :return: Dictionary, None when the payload was not saved
+        """
+        if not os.path.exists(path):
+            return None
+        with METRICS.stage('script'), open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    @staticmethod
+    def get_game_state(payload: dict | None) -> str:
         """
-        self.browser.get(url)
-        return self.browser.execute_script('return window.__espnfitt__')
+        Returns the State of the Game from a Boxscore or Matchup payload.
+        :param payload: Stats Payload
+        :return: Game State (pre, in, post) or an empty string when unknown
+        """
+
+        game_strip = (payload or {}).get('page', {}).get('content', {}).get('gamepackage', {}) \
+            .get('gmStrp', {})
+        return game_strip.get('status', {}).get('state', game_strip.get('statusState', ''))
+
+    def close(self) -> None:
+        """
+        Quits the Selenium Web Browser.
+        :return: None
+        """
+        if getattr(self, 'driver', None) is not None:
+            self.driver.quit()
 
     def __del__(self):
         """
         Destructor for Closing up the Selenium Web Browser.
         """
-        self.browser.quit()
+        self.close()
 
 
 class TeamService(BaseService):
     """
     Service for Retrieving and Processing Team Level Statistics.
     """
+    page_url = MATCHUP_URL
 
     @staticmethod
     def _split_stat_(value: str) -> list[float]:
@@ -180,14 +378,27 @@ class TeamService(BaseService):
             item['game_type'] = gtype
             return item
 
-        url = f"https://www.espn.com/nfl/matchup/_/gameId/{game_id}"
+        url = self.page_url.format(game_id=game_id)
         payload = self.get_stats_payload(url)
-        results = []
 
         if not payload:
             self.logger.warning('No Stats returned for %s', game_id)
             return []
 
+        with METRICS.stage('parse') as timer:
+            results = self.parse_team_stats(payload)
+            timer.add(rows=len(results))
+        return list(add_partitions(x, week, year, game_type) for x in results)
+
+    def parse_team_stats(self, payload: dict) -> list[dict]:
+        """
+        Parses the Team Level Statistics from a Matchup payload.
+        :param payload: Matchup Stats Payload
+        :return: List of Dictionaries
+        """
+
+        results = []
+
         home_team_entry = payload.get('page', {}).get('content', {}).get('gamepackage', {}).get(
             'tmStats', {}).get('home', {})
         away_team_entry = payload.get('page', {}).get('content', {}).get('gamepackage', {}).get(
@@ -213,7 +424,7 @@ class TeamService(BaseService):
         if away_stats:
             results.extend(away_stats)
 
-        return list(add_partitions(x, week, year, game_type) for x in results)
+        return results
 
 
 class ScheduleService(BaseService):
@@ -242,7 +453,8 @@ class ScheduleService(BaseService):
                 'home_team_code': home_team.get('abbrev', ''),
                 'home_team': home_team.get('displayName', ''),
                 'away_team_code': away_team.get('abbrev', ''),
-                'away_team': away_team.get('displayName', '')
+                'away_team': away_team.get('displayName', ''),
+                'status': event.get('status', {}).get('state', '')
             })
 
         return items
@@ -282,12 +494,15 @@ class ScheduleService(BaseService):
 
         events = response.get('page', {}).get('content', {}).get('events', {})
         results = []
-        for item in events.items():
-            date_value = item[0]
-            items = item[1]
-            games = self._process_events_(items)
-
-            results.extend([add_common_fields(x, year, week, game_type, date_value) for x in games])
+        with METRICS.stage('parse') as timer:
+            for item in events.items():
+                date_value = item[0]
+                items = item[1]
+                games = self._process_events_(items)
+
+                results.extend([add_common_fields(x, year, week, game_type, date_value)
+                                for x in games])
+            timer.add(rows=len(results))
         return results
 
 
@@ -295,6 +510,7 @@ class GameService(BaseService):
     """
     Service for retrieving Game Information.
     """
+    page_url = MATCHUP_URL
 
     def get_game_info(self, game_id: str, week: int, year: int, game_type: str) -> dict | None:
         """
@@ -306,12 +522,29 @@ class GameService(BaseService):
         :return: Dictionary
         """
 
-        url = f"https://www.espn.com/nfl/matchup/_/gameId/{game_id}"
+        url = self.page_url.format(game_id=game_id)
         stats_payload = self.get_stats_payload(url)
 
         if not stats_payload:
             return None
 
+        with METRICS.stage('parse') as timer:
+            timer.add(rows=1)
+            return self.parse_game_info(stats_payload, game_id, week, year, game_type)
+
+    @staticmethod
+    def parse_game_info(stats_payload: dict, game_id: str, week: int, year: int,
+                        game_type: str) -> dict:
+        """
+        Parses the Information concerning the game played from a Matchup payload.
+        :param stats_payload: Matchup Stats Payload
+        :param game_id: Game ID
+        :param week: Week Number
+        :param year: Season Year
+        :param game_type: Game Type (Preseason, Regular, Postseason)
+        :return: Dictionary
+        """
+
         game_info = stats_payload.get('page', {}).get('content', {}).get('gamepackage', {}).get(
             'gmInfo', {})
         team_stats = stats_payload.get('page', {}).get('content', {}).get('gamepackage', {}).get(
@@ -348,6 +581,7 @@ class PlayerService(BaseService):
     """
     Service for Retrieving and Processing Player Level Stats.
     """
+    page_url = BOXSCORE_URL
 
     def get_player_stats(self, game_id: str, week: int, year: int, game_type: str) -> list[dict]:
         """
@@ -373,16 +607,27 @@ class PlayerService(BaseService):
             item['game_type'] = gtype
             return item
 
-        url = f"https://www.espn.com/nfl/boxscore/_/gameId/{game_id}"
+        url = self.page_url.format(game_id=game_id)
 
         payload = self.get_stats_payload(url)
         if not payload:
             self.logger.warning('No Stats returned for %s', game_id)
             return []
 
-        results = self._build_stats_(payload)
+        with METRICS.stage('parse') as timer:
+            results = self.parse_player_stats(payload)
+            timer.add(rows=len(results))
         return list(add_partitions(x, week, year, game_type) for x in results)
 
+    def parse_player_stats(self, payload: dict) -> list[dict]:
+        """
+        Parses the Player Stats from a Boxscore payload.
+        :param payload: Boxscore Stats Payload
+        :return: List of Dictionaries
+        """
+
+        return self._build_stats_(payload)
+
     def _build_stats_(self, box_score: dict) -> list[dict]:
         """
         Creates the Listing of Stats from the Box Score.
@@ -0,0 +1,99 @@
+"""
+Helpers for reading and replacing shared Parquet files in the Warehouse Bucket.
+"""
+
+import logging
+import time
+from io import BytesIO
+from typing import Callable
+
+import polars
+from botocore.client import BaseClient
+from botocore.exceptions import ClientError
+
+from services.backoff import backoff_delay
+
+CONFLICT_CODES = ('PreconditionFailed', 'ConditionalRequestConflict')
+MISSING_CODES = ('NoSuchKey', 'NotFound', '404')
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 5.0
+
+
+def load_frame(client: BaseClient, bucket: str,
+               key: str) -> tuple[polars.DataFrame | None, str | None]:
+    """
+    Loads a Parquet File from the S3 Bucket along with its ETag.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: S3 Key
+    :return: Data Frame and ETag, both None when the file does not exist
+    """
+
+    try:
+        response = client.get_object(Bucket=bucket, Key=key)
+    except ClientError as ex:
+        if ex.response.get('Error', {}).get('Code') in MISSING_CODES:
+            return None, None
+        raise ex
+
+    return polars.read_parquet(response['Body'].read()), response.get('ETag')
+
+
+def download_frame(client: BaseClient, bucket: str, key: str, path: str) -> bool:
+    """
+    Downloads a Parquet File from the S3 Bucket to a local file, so it can be read in batches.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: S3 Key
+    :param path: Local File Path
+    :return: True when the file exists
+    """
+
+    try:
+        client.download_file(bucket, key, path)
+    except ClientError as ex:
+        if ex.response.get('Error', {}).get('Code') in MISSING_CODES:
+            return False
+        raise ex
+    return True
+
+
+def replace_frame(client: BaseClient, bucket: str, key: str,
+                  update: Callable[[polars.DataFrame | None], polars.DataFrame],
+                  retries: int = 8) -> polars.DataFrame:
+    """
+    Replaces a shared Parquet File using a conditional write. The update function is applied to
+    the current version of the file and the result is written only if the file has not changed
+    in the meantime; a conflicting write is retried against the latest version after a full
+    jitter backoff, so concurrent writers spread out instead of colliding again. Nothing is written
+    when the update leaves the file unchanged.
+    :param client: S3 Client
+    :param bucket: S3 Bucket
+    :param key: S3 Key
+    :param update: Function producing the new frame from the current one (None when missing)
+    :param retries: Number of attempts on a conflicting write
+    :return: The Data Frame that was written
+    :raises RuntimeError: When every attempt conflicted
+    """
+
+    for attempt in range(1, retries + 1):
+        current, etag = load_frame(client, bucket, key)
+        frame = update(current)
+        if current is not None and frame.equals(current):
+            return frame
+
+        stream = BytesIO()
+        frame.write_parquet(stream)
+        condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        try:
+            client.put_object(Bucket=bucket, Key=key, Body=stream.getvalue(), **condition)
+            return frame
+        except ClientError as ex:
+            if ex.response.get('Error', {}).get('Code') not in CONFLICT_CODES:
+                raise ex
+            logging.getLogger(__name__).info('%s changed during update, attempt %s of %s',
+                                             key, attempt, retries)
+            if attempt < retries:
+                time.sleep(backoff_delay(attempt - 1, BACKOFF_BASE, BACKOFF_CAP))
+
+    raise RuntimeError(f"Failed to replace {key} after {retries} attempts")
@@ -0,0 +1,206 @@
+"""
+Durable local Work Queue for long Backfills.
+
+Tasks are persisted in a SQLite database with their state, attempts and timing, so a Backfill can
+be killed at any point and resumed by running it again. Stats tasks of a week only become
+available once the Schedule task of that week is done.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+SCHEDULE_ENTITY = 'schedules'
+STATES = ('pending', 'running', 'done', 'failed')
+
+
+class Task(NamedTuple):
+    """
+    Backfill Task
+    """
+    task_id: int
+    entity: str
+    year: int
+    game_type: int
+    week: int
+    attempts: int = 0
+
+
+class WorkQueue:
+    """
+    Work Queue backed by a SQLite database shared by the worker threads of one process.
+    """
+    path: str
+
+    def __init__(self, path: str) -> None:
+        """
+        Work Queue Constructor. Creates the tasks table when missing.
+        :param path: Path of the SQLite database
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                game_type INTEGER NOT NULL,
+                week INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                started_at REAL,
+                finished_at REAL,
+                seconds REAL,
+                error TEXT,
+                UNIQUE (entity, year, game_type, week)
+            )''')
+
+    def add(self, tasks: list[tuple[str, int, int, int]]) -> int:
+        """
+        Adds Tasks to the Queue. Tasks already in the Queue keep their state.
+        :param tasks: Entity, Year, Game Type and Week of each Task
+        :return: Number of new Tasks
+        """
+
+        with self._lock:
+            before = self._connection.total_changes
+            self._connection.execute('BEGIN IMMEDIATE')
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO tasks (entity, year, game_type, week) VALUES (?, ?, ?, ?)',
+                tasks)
+            self._connection.execute('COMMIT')
+            return self._connection.total_changes - before
+
+    def claim(self) -> Task | None:
+        """
+        Marks the next available Task as running. Schedule tasks come first and a Stats task is
+        only available once the Schedule task of its week, when queued, is done.
+        :return: Task, None when no Task is available right now
+        """
+
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            row = self._connection.execute('''
+                SELECT t.task_id, t.entity, t.year, t.game_type, t.week, t.attempts
+                FROM tasks t
+                WHERE t.state = 'pending' AND NOT EXISTS (
+                    SELECT 1 FROM tasks s
+                    WHERE s.entity = ? AND s.state != 'done' AND s.year = t.year
+                        AND s.game_type = t.game_type AND s.week = t.week AND t.entity != ?)
+                ORDER BY t.entity != ?, t.year, t.game_type, t.week, t.entity
+                LIMIT 1''', (SCHEDULE_ENTITY, SCHEDULE_ENTITY, SCHEDULE_ENTITY)).fetchone()
+            if row is None:
+                self._connection.execute('COMMIT')
+                return None
+
+            self._connection.execute('''
+                UPDATE tasks SET state = 'running', attempts = attempts + 1, started_at = ?
+                WHERE task_id = ?''', (time.time(), row[0]))
+            self._connection.execute('COMMIT')
+            return Task(row[0], row[1], row[2], row[3], row[4], row[5] + 1)
+
+    def complete(self, task: Task, seconds: float) -> None:
+        """
+        Marks a Task as done.
+        :param task: Task
+        :param seconds: Seconds the Task took
+        :return: None
+        """
+
+        with self._lock:
+            self._connection.execute('''
+                UPDATE tasks SET state = 'done', finished_at = ?, seconds = ?, error = NULL
+                WHERE task_id = ?''', (time.time(), seconds, task.task_id))
+
+    def fail(self, task: Task, error: str, max_attempts: int) -> bool:
+        """
+        Records a failed attempt. The Task is retried until it reaches the maximum attempts; a
+        Schedule task that fails for good also fails the Stats tasks of its week.
+        :param task: Task
+        :param error: Error Message
+        :param max_attempts: Maximum attempts of a Task
+        :return: True when the Task will be retried
+        """
+
+        retry = task.attempts < max_attempts
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            self._connection.execute('''
+                UPDATE tasks SET state = ?, finished_at = ?, error = ? WHERE task_id = ?''',
+                                     ('pending' if retry else 'failed', time.time(), error,
+                                      task.task_id))
+            if not retry and task.entity == SCHEDULE_ENTITY:
+                self._connection.execute('''
+                    UPDATE tasks SET state = 'failed', error = 'Schedule task failed'
+                    WHERE state = 'pending' AND year = ? AND game_type = ? AND week = ?''',
+                                         (task.year, task.game_type, task.week))
+            self._connection.execute('COMMIT')
+        return retry
+
+    def recover(self) -> int:
+        """
+        Returns Tasks left running by a Backfill that was killed to pending.
+        :return: Number of recovered Tasks
+        """
+
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE tasks SET state = 'pending' WHERE state = 'running'")
+            return cursor.rowcount
+
+    def retry_failed(self) -> int:
+        """
+        Returns failed Tasks to pending with their attempts reset.
+        :return: Number of Tasks to retry
+        """
+
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE tasks SET state = 'pending', attempts = 0 WHERE state = 'failed'")
+            return cursor.rowcount
+
+    def completed_since(self, timestamp: float) -> int:
+        """
+        Returns the number of Tasks done since a point in time.
+        :param timestamp: Unix Timestamp
+        :return: Number of Tasks
+        """
+
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM tasks WHERE state = 'done' AND finished_at >= ?",
+                (timestamp,)).fetchone()[0]
+
+    def counts(self) -> dict[str, int]:
+        """
+        Returns the number of Tasks in each state.
+        :return: Dictionary of State and Count
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT state, COUNT(*) FROM tasks GROUP BY state').fetchall()
+        return {**{x: 0 for x in STATES}, **dict(rows)}
+
+    def average_seconds(self) -> dict[str, float]:
+        """
+        Returns the average duration of the done Tasks of each Entity.
+        :return: Dictionary of Entity and Seconds
+        """
+
+        with self._lock:
+            rows = self._connection.execute('''
+                SELECT entity, AVG(seconds) FROM tasks WHERE state = 'done' GROUP BY entity
+                ''').fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        :return: None
+        """
+        with self._lock:
+            self._connection.close()
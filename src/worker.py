@@ -0,0 +1,183 @@
+"""
+Long-running Worker consuming Stats Jobs from a Queue.
+
+The Worker keeps its browsers and S3 client warm between Jobs, so a Job only pays for the page
+loads of its games.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+from functools import partial
+
+from boto3 import Session
+from botocore.client import BaseClient
+
+import download_stats
+from services.fetch import Fetcher
+from services.jobs import DEFAULT_LEASE, InvalidJobError, Job, JobQueue, LocalJobQueue, \
+    SqsJobQueue
+from services.manifest import compact_manifest
+from services.pool import ServicePool
+
+
+def create_queue(location: str, session: Session) -> JobQueue:
+    """
+    Creates the Job Queue for a location. JOB_LEASE sets the seconds a Job is leased between
+    heartbeats and SQS_DEAD_LETTER_URL the SQS Queue of the rejected Jobs.
+    :param location: SQS Queue URL or local Queue directory
+    :param session: Boto Session
+    :return: Job Queue
+    """
+
+    lease = int(os.getenv('JOB_LEASE') or DEFAULT_LEASE)
+    if location.startswith('https://') or location.startswith('http://'):
+        if os.getenv('SQS_ENDPOINT'):
+            client = session.client('sqs', endpoint_url=os.getenv('SQS_ENDPOINT'))
+        else:
+            client = session.client('sqs')
+        return SqsJobQueue(client, location, lease=lease,
+                           dead_letter_url=os.getenv('SQS_DEAD_LETTER_URL'))
+
+    queue = LocalJobQueue(location, lease)
+    recovered = queue.recover()
+    if recovered:
+        logging.getLogger(__name__).info('Recovered %s unfinished Jobs', recovered)
+    return queue
+
+
+def process_job(job: Job, bucket: str, client: BaseClient, pools: dict[str, ServicePool], *,
+                fetcher: Fetcher | None = None, **kwargs) -> None:
+    """
+    Processes a single Job. Any failure is raised so the Job is not acknowledged, including a
+    per-game Job whose game could not be fetched or was deferred.
+    :param job: Job
+    :param bucket: S3 Bucket
+    :param client: S3 Client
+    :param pools: Warm Service Pools by Stats Type
+    :param fetcher: Optional Fetcher shared by the Services of the Worker
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :return: None
+    :raises InvalidJobError: When the Job has an unknown Stats Type
+    """
+
+    logger = logging.getLogger(__name__)
+    if job.stat_type not in download_stats.SERVICES:
+        raise InvalidJobError(f"Invalid Stats Type in Job: {job.stat_type}")
+
+    if job.stat_type not in pools:
+        pools[job.stat_type] = ServicePool(
+            partial(download_stats.SERVICES[job.stat_type], fetcher), 1)
+
+    summary = download_stats.process_schedule(bucket, job.schedule_key, job.stat_type, client,
+                                              pools[job.stat_type], game_id=job.game_id,
+                                              **kwargs)
+    if summary is None:
+        logger.warning('Nothing to process for Job: %s', job)
+
+
+def run(queue: JobQueue, bucket: str, client: BaseClient, stop: threading.Event,
+        **kwargs) -> int:
+    """
+    Consumes Jobs until the Stop Event is set. A Job is acknowledged only after its output has
+    been written and its lease is extended while it runs; a failed Job is released back to the
+    Queue and an invalid Job is rejected to the dead letter location.
+    :param queue: Job Queue
+    :param bucket: S3 Bucket
+    :param client: S3 Client
+    :param stop: Event signalling a graceful shutdown
+    :keyword wait: Seconds to wait for a Job on each poll (default 20)
+    :keyword max_jobs: Optional number of Jobs to process before stopping
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :return: Number of Jobs completed
+    """
+
+    logger = logging.getLogger(__name__)
+    wait = int(kwargs.pop('wait', 20))
+    max_jobs = kwargs.pop('max_jobs', None)
+    pools: dict[str, ServicePool] = {}
+    fetcher = Fetcher.from_env()
+    completed = 0
+
+    try:
+        while not stop.is_set() and (max_jobs is None or completed < max_jobs):
+            job = queue.receive(wait)
+            if job is None:
+                continue
+
+            logger.info('Processing Job: %s %s %s', job.stat_type, job.schedule_key,
+                        job.game_id or '')
+            try:
+                with queue.hold(job):
+                    process_job(job, bucket, client, pools, fetcher=fetcher, **kwargs)
+            except InvalidJobError as ex:
+                logger.error('Rejected Job: %s', ex)
+                queue.reject(job)
+                continue
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                logger.error('Job failed: %s : %s', job.schedule_key, ex)
+                queue.release(job)
+                continue
+
+            queue.ack(job)
+            completed += 1
+    finally:
+        for pool in pools.values():
+            pool.close()
+
+    logger.info('Worker stopped after %s Jobs', completed)
+    return completed
+
+
+def main(bucket: str, queue_location: str, **kwargs) -> None:
+    """
+    Main Function running the Worker until it receives SIGTERM or SIGINT.
+    :param bucket: S3 Bucket
+    :param queue_location: SQS Queue URL or local Queue directory
+    :keyword wait: Seconds to wait for a Job on each poll (default 20)
+    :keyword max_jobs: Optional number of Jobs to process before stopping
+    :keyword dimensions: Optional flag to upsert the Dimensions and write the slim Fact table
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    if not bucket or not queue_location:
+        logger.error('Bucket and Queue are required')
+        sys.exit()
+
+    stop = threading.Event()
+
+    def shutdown(signum, _frame):
+        """
+        Stops the Worker once the current Job completes.
+        """
+        logger.info('Received signal %s, stopping after the current Job', signum)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    session = Session()
+    client = download_stats.create_client(session)
+    run(create_queue(queue_location, session), bucket, client, stop, **kwargs)
+    compact_manifest(client, bucket)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('botocore').setLevel(logging.FATAL)
+    logging.getLogger('boto3').setLevel(logging.FATAL)
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-b', '--bucket', type=str, help='Warehouse S3 Bucket', required=True)
+    parser.add_argument('-q', '--queue', type=str, required=True,
+                        help='SQS Queue URL or local Queue directory')
+    parser.add_argument('-d', '--dimensions', action='store_true',
+                        help='Upsert the Dimension tables and write the slim Fact table')
+    parser.add_argument('-m', '--max-jobs', type=int, help='Stop after processing N Jobs')
+
+    args = parser.parse_args()
+    main(args.bucket, args.queue, dimensions=args.dimensions, max_jobs=args.max_jobs)
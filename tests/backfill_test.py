@@ -0,0 +1,57 @@
+"""
+Tests for the Backfill
+"""
+
+import threading
+
+from assertpy import assert_that
+
+import backfill
+import schedule_info_pull
+from services.stats import BaseService
+from services.workqueue import WorkQueue
+
+
+def test_create_tasks():
+    """
+    Tests the Seasons are expanded into a Task per Game Type, Week and Entity
+    """
+    tasks = backfill.create_tasks(2020, 2021, ['schedules', 'teams'], 2)
+
+    assert_that(tasks).is_length((17 + 18) * 2)
+    assert_that(tasks).contains(('schedules', 2020, 2, 17), ('teams', 2021, 2, 18))
+
+
+def test_estimate_eta():
+    """
+    Tests the ETA from the observed throughput
+    """
+    assert_that(backfill.estimate_eta(10, 5, 60.0)).is_equal_to(120.0)
+    assert_that(backfill.estimate_eta(10, 0, 60.0)).is_none()
+
+
+def test_run(match_up, schedule_frame, monkeypatch, session, s3, tmp_path):
+    """
+    Tests the Backfill executes the Schedule then the Stats tasks and retries failures
+    """
+    calls = []
+
+    def fetch_schedule(year, week, game_type, _pool):
+        calls.append(week)
+        if calls.count(week) == 1 and week == 2:
+            raise RuntimeError('Timeout')
+        return schedule_frame.to_dicts()
+
+    monkeypatch.setattr(schedule_info_pull, 'fetch_schedule', fetch_schedule)
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+    client = session.client('s3')
+    queue = WorkQueue(str(tmp_path / 'backfill.db'))
+    queue.add([(x, 2023, 1, week) for week in (1, 2) for x in ('teams', 'schedules')])
+
+    counts = backfill.run(queue, 'warehouse-bucket', client, threading.Event(), workers=2)
+
+    assert_that(counts).contains_entry({'done': 4}).contains_entry({'failed': 0})
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/2023/')
+    assert_that([x['Key'] for x in response.get('Contents', [])]).is_equal_to([
+        'teams/2023/preseason/week_1.parquet', 'teams/2023/preseason/week_2.parquet'
+    ])
@@ -75,6 +75,46 @@ def schedule_frame(tmp_path) -> polars.DataFrame:
     return df
 
 
+@pytest.fixture
+def team_stats() -> polars.DataFrame:
+    """
+    Registers Team Stats of two teams over five weeks
+    """
+
+    weeks = [1, 2, 3, 4, 5]
+    return polars.DataFrame({
+        'team': ['A'] * 5 + ['B'] * 5,
+        'team_url': [''] * 10,
+        'opponent': ['B'] * 5 + ['A'] * 5,
+        'statistic_name': ['Total Yards'] * 10,
+        'statistic_value': [float(x) for x in weeks] + [float(x * 10) for x in weeks],
+        'year': [2023] * 10,
+        'week': weeks * 2,
+        'game_type': ['2'] * 10
+    })
+
+
+@pytest.fixture
+def games_frame() -> polars.DataFrame:
+    """
+    Registers the Games of team A hosting team B over five weeks
+    """
+
+    weeks = [1, 2, 3, 4, 5]
+    return polars.DataFrame({
+        'game_id': [str(100 + x) for x in weeks],
+        'home_team': ['A'] * 5,
+        'away_team': ['B'] * 5,
+        'home_score': [24] * 5,
+        'away_score': [17] * 5,
+        'line': ['-3.5'] * 5,
+        'over_under': [44.5] * 5,
+        'year': [2023] * 5,
+        'week': weeks,
+        'game_type': ['2'] * 5
+    })
+
+
 @pytest.fixture
 def aws_credentials():
     """
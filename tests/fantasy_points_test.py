@@ -0,0 +1,37 @@
+"""
+Tests for the Fantasy Points script
+"""
+
+import polars
+from assertpy import assert_that
+
+import download_stats
+import fantasy_points
+from services.stats import BaseService
+
+
+def test_main(box_score, monkeypatch, session, s3):
+    """
+    Tests the Main Function scores every week of the Season and skips the game files
+    """
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: box_score)
+    download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'players')
+    client = session.client('s3')
+    download_stats.write_output(polars.DataFrame({'player_url': ['x']}), 'warehouse-bucket',
+                                'players/2020/1/week_1/123445.parquet', client)
+
+    fantasy_points.main('warehouse-bucket', 2020, configs=['standard', 'ppr'])
+
+    response = client.get_object(Bucket='warehouse-bucket', Key='fantasy/2020/1/week_1.parquet')
+    scores = polars.read_parquet(response['Body'].read())
+    assert_that(scores.columns).contains('player_name', 'week', 'standard', 'ppr')
+    assert_that(scores.filter(polars.col('player_name') == 'Travis Kelce')
+                .select('standard', 'ppr').row(0)).is_equal_to((18.1, 29.1))
+    assert_that(len(scores)).is_equal_to(scores['player_url'].n_unique())
+
+
+def test_main_no_stats(s3, session):
+    """
+    Tests the Main Function without Player Stats
+    """
+    assert_that(fantasy_points.main).raises(SystemExit).when_called_with('warehouse-bucket', 2020)
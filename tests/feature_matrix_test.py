@@ -0,0 +1,58 @@
+"""
+Tests for the Feature Matrix export script
+"""
+
+import ast
+import struct
+from io import BytesIO
+
+import polars
+from assertpy import assert_that
+
+import feature_matrix
+
+
+def put_frame(client, frame: polars.DataFrame, key: str) -> None:
+    """
+    Writes a week output
+    """
+    stream = BytesIO()
+    frame.write_parquet(stream)
+    client.put_object(Bucket='warehouse-bucket', Key=key, Body=stream.getvalue())
+
+
+def test_main(s3, session, team_stats, games_frame):
+    """
+    Tests the matrix, index and columns are exported for the range of Seasons
+    """
+    client = session.client('s3')
+    for week in (1, 2):
+        put_frame(client, team_stats.filter(polars.col('week') == week),
+                  f"teams/2023/regular/week_{week}.parquet")
+        put_frame(client, games_frame.filter(polars.col('week') == week),
+                  f"games/2023/regular/week_{week}.parquet")
+    put_frame(client, team_stats, 'teams/2023/regular/week_1/999.parquet')
+
+    feature_matrix.main('warehouse-bucket', 2023, end_year=2023)
+
+    prefix = 'features/matchups/2023-2023'
+    content = client.get_object(Bucket='warehouse-bucket', Key=f"{prefix}/matrix.npy")['Body'] \
+        .read()
+    length = struct.unpack('<H', content[8:10])[0]
+    assert_that(ast.literal_eval(content[10:10 + length].decode('latin1'))['shape']) \
+        .is_equal_to((2, 7))
+
+    index = polars.read_parquet(client.get_object(
+        Bucket='warehouse-bucket', Key=f"{prefix}/index.parquet")['Body'].read())
+    assert_that(index['game_id'].to_list()).is_equal_to(['101', '102'])
+    columns = polars.read_parquet(client.get_object(
+        Bucket='warehouse-bucket', Key=f"{prefix}/columns.parquet")['Body'].read())
+    assert_that(columns['name'].to_list()[-1]).is_equal_to('over_under')
+
+
+def test_main_no_games(s3, session):
+    """
+    Tests the Main Function without Team Stats or Games
+    """
+    assert_that(feature_matrix.main).raises(SystemExit) \
+        .when_called_with('warehouse-bucket', 2023, end_year=2023)
@@ -0,0 +1,105 @@
+"""
+Tests for the Form Tables script
+"""
+
+from io import BytesIO
+
+import polars
+from assertpy import assert_that
+
+import form_tables
+
+
+def put_week(client, stats: polars.DataFrame, week: int) -> None:
+    """
+    Writes a week of Team Stats
+    """
+    stream = BytesIO()
+    stats.filter(polars.col('week') == week).write_parquet(stream)
+    client.put_object(Bucket='warehouse-bucket', Key=f"teams/2023/regular/week_{week}.parquet",
+                      Body=stream.getvalue())
+
+
+def read_form(client, week: int) -> polars.DataFrame:
+    """
+    Reads a week of the Team form table
+    """
+    response = client.get_object(Bucket='warehouse-bucket',
+                                 Key=f"team_form/2023/regular/week_{week}.parquet")
+    return polars.read_parquet(response['Body'].read())
+
+
+def test_get_week_order():
+    """
+    Tests the Week Order of the week outputs
+    """
+    assert_that(form_tables.get_week_order('teams/2023/postseason/week_1.parquet')) \
+        .is_equal_to((2023, 3, 1))
+    assert_that(form_tables.get_week_order('players/2023/2/week_10.parquet')) \
+        .is_equal_to((2023, 2, 10))
+    assert_that(form_tables.get_week_order('teams/2023/2/week_1/123.parquet')).is_none()
+
+
+def test_build_form_incremental(s3, session, team_stats):
+    """
+    Tests a new week is appended from the state and a late week rebuilds the tables
+    """
+    client = session.client('s3')
+    for week in (1, 2, 4):
+        put_week(client, team_stats, week)
+
+    results = form_tables.build_form('warehouse-bucket', 'teams', [2], client)
+    assert_that(results).is_length(3)
+    assert_that(form_tables.build_form('warehouse-bucket', 'teams', [2], client)).is_empty()
+
+    put_week(client, team_stats, 3)
+    results = form_tables.build_form('warehouse-bucket', 'teams', [2], client)
+    assert_that([x.key for x in results if not x.skipped]).is_equal_to([
+        'team_form/2023/regular/week_3.parquet', 'team_form/2023/regular/week_4.parquet'])
+    assert_that(read_form(client, 4).filter(polars.col('team') == 'A')['avg_2'].to_list()) \
+        .is_equal_to([3.5])
+
+    put_week(client, team_stats, 5)
+    results = form_tables.build_form('warehouse-bucket', 'teams', [2], client)
+    assert_that([x.key for x in results]).is_equal_to(['team_form/2023/regular/week_5.parquet'])
+    assert_that(read_form(client, 5).filter(polars.col('team') == 'A')['avg_2'].to_list()) \
+        .is_equal_to([4.5])
+
+
+def test_build_form_windows_changed(s3, session, team_stats):
+    """
+    Tests a change of windows rebuilds the tables
+    """
+    client = session.client('s3')
+    for week in (1, 2):
+        put_week(client, team_stats, week)
+    form_tables.build_form('warehouse-bucket', 'teams', [2], client)
+
+    results = form_tables.build_form('warehouse-bucket', 'teams', [2, 3], client)
+    assert_that(results).is_length(2)
+    assert_that(read_form(client, 2).columns).contains('avg_2', 'avg_3')
+
+
+def test_build_form_source_rewritten(s3, session, team_stats):
+    """
+    Tests a source week rewritten after the build is materialized again with the weeks after it
+    """
+    client = session.client('s3')
+    for week in (1, 2, 3, 4):
+        put_week(client, team_stats, week)
+    form_tables.build_form('warehouse-bucket', 'teams', [2], client)
+
+    late = team_stats.with_columns(
+        polars.when((polars.col('team') == 'A') & (polars.col('week') == 2))
+        .then(polars.lit(20, polars.Int64)).otherwise(polars.col('statistic_value'))
+        .alias('statistic_value'))
+    put_week(client, late, 2)
+    results = form_tables.build_form('warehouse-bucket', 'teams', [2], client)
+
+    assert_that([x.key for x in results if not x.skipped]).is_equal_to([
+        'team_form/2023/regular/week_2.parquet', 'team_form/2023/regular/week_3.parquet'])
+    assert_that(read_form(client, 2).filter(polars.col('team') == 'A')['avg_2'].to_list()) \
+        .is_equal_to([10.5])
+    assert_that(read_form(client, 3).filter(polars.col('team') == 'A')['avg_2'].to_list()) \
+        .is_equal_to([11.5])
+    assert_that(form_tables.build_form('warehouse-bucket', 'teams', [2], client)).is_empty()
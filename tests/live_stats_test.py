@@ -0,0 +1,129 @@
+"""
+Tests for the Live Game-day Polling
+"""
+
+import copy
+import threading
+
+from assertpy import assert_that
+
+import live_stats
+from services.stats import BaseService
+
+BUCKET = 'warehouse-bucket'
+SCHEDULE_KEY = 'schedules/2020/1/week_1.parquet'
+
+
+def set_state(payload: dict, state: str) -> dict:
+    """
+    Returns a copy of the payload with the given Game State.
+    """
+    result = copy.deepcopy(payload)
+    result['page']['content']['gamepackage']['gmStrp']['status']['state'] = state
+    return result
+
+
+def create_row(game_id: str = '123445', game_date: str = '20240101') -> dict:
+    """
+    Creates a Schedule Row.
+    """
+    return {'game_id': game_id, 'year': '2024', 'week': '1', 'game_type': '2',
+            'game_date': game_date}
+
+
+def test_get_game_state(match_up, box_score):
+    """
+    Tests reading the Game State from the payloads
+    """
+    assert_that(BaseService.get_game_state(match_up)).is_equal_to('post')
+    assert_that(BaseService.get_game_state(box_score)).is_equal_to('post')
+    assert_that(BaseService.get_game_state(None)).is_equal_to('')
+
+
+def test_is_due(session):
+    """
+    Tests that only live games and started pre-game probes are polled
+    """
+    poller = live_stats.LivePoller(BUCKET, SCHEDULE_KEY, ['teams'], session.client('s3'),
+                                   today='20240101', probe_every=2)
+    poller.states = {'1': 'in', '2': 'post'}
+
+    assert_that(poller.is_due(create_row('1'))).is_true()
+    assert_that(poller.is_due(create_row('2'))).is_false()
+    assert_that(poller.is_due(create_row('3'))).is_true()
+    assert_that(poller.is_due(create_row('4', '20240102'))).is_false()
+
+    poller.polls = 1
+    assert_that(poller.is_due(create_row('3'))).is_false()
+
+
+def test_poll_final_game(match_up, box_score, monkeypatch, session, s3):
+    """
+    Tests a final game is written once and then no longer polled
+    """
+    urls = []
+
+    def get_payload(_self, url):
+        urls.append(url)
+        return box_score if 'boxscore' in url else match_up
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', get_payload)
+    client = session.client('s3')
+    poller = live_stats.LivePoller(BUCKET, SCHEDULE_KEY, ['teams', 'players'], client,
+                                   today='20240101')
+
+    polls = live_stats.run(poller, [create_row()], threading.Event(), interval=0, max_polls=5)
+
+    assert_that(polls).is_equal_to(1)
+    assert_that(urls).is_length(2)
+    for key in ['teams/2020/1/week_1.parquet', 'players/2020/1/week_1.parquet']:
+        assert_that(client.head_object(Bucket=BUCKET, Key=key)['ContentLength']) \
+            .is_greater_than(0)
+    response = client.list_objects_v2(Bucket=BUCKET, Prefix='teams/2020/1/week_1/')
+    assert_that(response.get('Contents', [])).is_empty()
+
+
+def test_poll_live_game_unchanged(match_up, monkeypatch, session, s3):
+    """
+    Tests an unchanged live game is not rewritten and polling stops once it is final
+    """
+    payloads = [set_state(match_up, 'in'), set_state(match_up, 'in'), match_up]
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: payloads.pop(0))
+    puts = []
+    client = session.client('s3')
+    client.meta.events.register('provide-client-params.s3.PutObject',
+                                lambda params, **kwargs: puts.append(params['Key']))
+
+    poller = live_stats.LivePoller(BUCKET, SCHEDULE_KEY, ['teams'], client, today='20240101')
+    rows = [create_row()]
+
+    assert_that(poller.poll(rows)[0].skipped).is_false()
+    assert_that(poller.poll(rows)[0].skipped).is_true()
+    poller.poll(rows)
+
+    assert_that(poller.states['123445']).is_equal_to('post')
+    assert_that(puts.count('teams/2020/1/week_1/123445.parquet')).is_equal_to(1)
+    assert_that(poller.is_done(rows)).is_true()
+
+
+def test_poll_pre_game(match_up, monkeypatch, session, s3):
+    """
+    Tests a game not yet started writes no Stats and future games are not loaded
+    """
+    urls = []
+
+    def get_payload(_self, url):
+        urls.append(url)
+        return set_state(match_up, 'pre')
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', get_payload)
+    poller = live_stats.LivePoller(BUCKET, SCHEDULE_KEY, ['teams'], session.client('s3'),
+                                   today='20240101')
+    rows = [create_row('1'), create_row('2', '20240108')]
+
+    results = poller.poll(rows)
+
+    assert_that(results).is_empty()
+    assert_that(urls).is_length(1)
+    assert_that(poller.states).is_equal_to({'1': 'pre'})
+    assert_that(poller.is_done(rows)).is_false()
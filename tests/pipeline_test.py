@@ -0,0 +1,83 @@
+"""
+Tests for the Schedule and Stats Pipeline
+"""
+
+import polars
+from assertpy import assert_that
+
+import download_stats
+import pipeline
+from services.stats import BaseService
+
+
+def test_main(match_up, box_score, schedule, monkeypatch, session, s3):
+    """
+    Tests the Main Function writes the Schedule and the Stats of every type from one process
+    without reading the Schedule File back
+    """
+
+    def get_payload(_self, url):
+        if '/schedule/' in url:
+            return schedule
+        return box_score if '/boxscore/' in url else match_up
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', get_payload)
+    monkeypatch.setattr(download_stats, 'load_schedule_file', None)
+
+    pipeline.main('warehouse-bucket', 2023, type=2, week=1)
+
+    client = session.client('s3')
+    keys = [x['Key'] for x in client.list_objects_v2(Bucket='warehouse-bucket')['Contents']]
+    assert_that(keys).contains('schedules/2023/regular/week_1.parquet',
+                               'teams/2023/regular/week_1.parquet',
+                               'players/2023/regular/week_1.parquet',
+                               'games/2023/regular/week_1.parquet')
+    response = client.get_object(Bucket='warehouse-bucket', Key='games/2023/regular/week_1.parquet')
+    assert_that(polars.read_parquet(response['Body'].read())).is_length(1)
+
+
+def test_main_enrich(match_up, box_score, schedule, monkeypatch, session, s3):
+    """
+    Tests the Player and Team Stats are enriched once, after every Stats type of the week is written
+    """
+
+    def get_payload(_self, url):
+        if '/schedule/' in url:
+            return schedule
+        return box_score if '/boxscore/' in url else match_up
+
+    enriched = []
+    enrich_week = download_stats.enrich_week
+    monkeypatch.setattr(BaseService, 'get_stats_payload', get_payload)
+    monkeypatch.setattr(download_stats, 'enrich_week',
+                        lambda *args, **kwargs: enriched.append(args[3]) or
+                        enrich_week(*args, **kwargs))
+
+    pipeline.main('warehouse-bucket', 2023, type=2, week=1, enrich=True)
+
+    client = session.client('s3')
+    keys = [x['Key'] for x in client.list_objects_v2(Bucket='warehouse-bucket')['Contents']]
+    assert_that(keys).contains('team_enriched/2023/regular/week_1.parquet',
+                               'player_enriched/2023/regular/week_1.parquet')
+    assert_that(enriched).is_equal_to(['games'])
+
+
+def test_main_invalid_stats(s3, session):
+    """
+    Tests the Main Function with an invalid Stats Type
+    """
+    assert_that(pipeline.main).raises(SystemExit) \
+        .when_called_with('warehouse-bucket', 2023, stats=['weather'])
+
+
+def test_pipeline_budget():
+    """
+    Tests the Schedule and Stats Pools share a Budget of one browser per producer and consumer
+    """
+    with pipeline.Pipeline('warehouse-bucket', None, ['teams', 'players', 'games'],
+                           workers=3, schedule_workers=1) as runner:
+        budget = runner.schedule_pool.budget
+        assert_that(budget).is_not_none()
+        assert_that(budget.size).is_equal_to(4)
+        assert_that([x.budget for x in runner.pools.values()]).contains_only(budget)
+        assert_that(budget.pools).is_length(4)
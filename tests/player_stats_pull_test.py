@@ -60,3 +60,23 @@ def test_main_no_schedule_file(box_score, monkeypatch, s3):
     assert_that(download_stats.main) \
         .raises(SystemExit) \
         .when_called_with(bucket, schedule_key, 'players')
+
+
+def test_main_dimensions(box_score, monkeypatch, s3, session):
+    """
+    Tests the Main Function writing the Dimensions and Player Facts
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: box_score)
+
+    bucket = 'warehouse-bucket'
+    download_stats.main(bucket, 'schedules/2020/1/week_1.parquet', 'players', dimensions=True)
+
+    client = session.client('s3')
+    response = client.list_objects_v2(Bucket=bucket, Prefix='player_facts/2020/1/')
+    assert_that(response.get('Contents', [])).is_not_empty()
+
+    response = client.list_objects_v2(Bucket=bucket, Prefix='dimensions/')
+    assert_that([x['Key'] for x in response.get('Contents', [])]) \
+        .contains('dimensions/players.parquet', 'dimensions/teams.parquet',
+                  'dimensions/statistics.parquet')
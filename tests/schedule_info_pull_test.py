@@ -2,10 +2,13 @@
 Tests for the Game Info retrieval script
 """
 
+import logging
+
+import polars
 from assertpy import assert_that
 
 import schedule_info_pull
-from services.stats import BaseService
+from services.stats import BaseService, ScheduleService
 
 
 def test_get_schedule(monkeypatch, schedule):
@@ -82,6 +85,15 @@ def test_main_week_type(monkeypatch, schedule, s3, session):
     assert_that(response.get('Contents', [])).is_not_empty()
 
 
+def test_get_schedule_key():
+    """
+    Tests the Schedule Key of a Game Type and Week
+    """
+    game_type = schedule_info_pull.GameType(2, 'regular')
+    assert_that(schedule_info_pull.get_schedule_key(2023, game_type, 1)) \
+        .is_equal_to('schedules/2023/regular/week_1.parquet')
+
+
 def test_get_weeks_17():
     """
     Tests the correct number of weeks is returned for 17 week seasons
@@ -140,3 +152,77 @@ def test_main_week_failure(monkeypatch, s3, session, caplog):
     assert_that(response.get('Contents', [])).is_empty()
 
     assert_that(caplog.text).contains('Failed to retrieve Schedule')
+
+
+def test_main_reuses_services(monkeypatch, schedule, s3, session):
+    """
+    Tests the main function reuses a bounded number of Schedule Services across weeks
+    """
+
+    created = []
+
+    class CountingService(ScheduleService):
+        """
+        Schedule Service recording each instance created
+        """
+
+        def __init__(self, fetcher=None):
+            super().__init__(fetcher)
+            created.append(self)
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: schedule)
+    monkeypatch.setattr(schedule_info_pull, 'ScheduleService', CountingService)
+
+    schedule_info_pull.main('warehouse-bucket', 2023, type=2, workers=2)
+
+    client = session.client('s3')
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='schedules/2023/regular')
+    assert_that(response.get('Contents', [])).is_length(18)
+    assert_that(len(created)).is_less_than_or_equal_to(2)
+    assert_that({id(x.fetcher) for x in created}).is_length(1)
+
+
+def test_main_skips_unchanged(monkeypatch, schedule, s3, session, caplog):
+    """
+    Tests an unchanged schedule is not uploaded again
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: schedule)
+    args = {
+        'bucket': 'warehouse-bucket',
+        'year': 2023,
+        'week': 1,
+        'type': 1
+    }
+
+    schedule_info_pull.main(**args)
+    client = session.client('s3')
+    first = client.head_object(Bucket='warehouse-bucket',
+                               Key='schedules/2023/preseason/week_1.parquet')
+
+    with caplog.at_level(logging.INFO):
+        schedule_info_pull.main(**args)
+    second = client.head_object(Bucket='warehouse-bucket',
+                                Key='schedules/2023/preseason/week_1.parquet')
+
+    assert_that(second['LastModified']).is_equal_to(first['LastModified'])
+    assert_that(caplog.text).contains('Written 0 schedules, skipped 1 unchanged')
+
+
+def test_write_output_transient_columns(s3, session):
+    """
+    Tests the game status is not persisted, so a status change leaves the schedule unchanged
+    """
+
+    client = session.client('s3')
+    key = 'schedules/2023/regular/week_1.parquet'
+    records = [{'game_id': '1', 'home_team': 'A', 'away_team': 'B', 'status': 'pre'}]
+    assert_that(schedule_info_pull.write_output('warehouse-bucket', key, records, client)) \
+        .is_true()
+
+    body = client.get_object(Bucket='warehouse-bucket', Key=key)['Body'].read()
+    assert_that(polars.read_parquet(body).columns).does_not_contain('status')
+
+    records[0]['status'] = 'post'
+    assert_that(schedule_info_pull.write_output('warehouse-bucket', key, records, client)) \
+        .is_false()
@@ -0,0 +1,47 @@
+"""
+Tests for the Argument Parsers of the scripts.
+"""
+
+import os.path
+import subprocess
+import sys
+
+from assertpy import assert_that
+
+from services import arguments, ipc
+
+SOURCE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+
+
+def test_ipc_compressions():
+    """
+    Tests the parser choices match the supported IPC Compressions
+    """
+    assert_that(arguments.IPC_COMPRESSIONS).is_equal_to(ipc.COMPRESSIONS)
+
+
+def test_create_stats_parser():
+    """
+    Tests parsing the Stats script arguments
+    """
+
+    args = arguments.create_stats_parser().parse_args(
+        ['-y', '2023', '-b', 'warehouse-bucket', '-t', 'teams', '-j', '2', '--plan'])
+    assert_that(args.year).is_equal_to(2023)
+    assert_that(args.workers).is_equal_to(2)
+    assert_that(args.plan).is_true()
+    assert_that(args.metrics).is_false()
+
+
+def test_help_skips_heavy_imports():
+    """
+    Tests --help returns before polars, boto3 and the Services are imported
+    """
+
+    for script in ('download_stats.py', 'schedule_info_pull.py'):
+        result = subprocess.run([sys.executable, '-X', 'importtime',
+                                 os.path.join(SOURCE_DIR, script), '--help'],
+                                capture_output=True, text=True, check=True, cwd=SOURCE_DIR)
+        modules = {x.rsplit('|', 1)[-1].strip() for x in result.stderr.splitlines()}
+        assert_that(result.stdout).contains('usage:')
+        assert_that(modules).does_not_contain('polars', 'boto3', 'services.stats')
@@ -0,0 +1,16 @@
+"""
+Tests for the Backoff delays
+"""
+
+from assertpy import assert_that
+
+from services.backoff import backoff_delay
+
+
+def test_backoff_delay():
+    """
+    Tests the backoff doubles per attempt up to the cap with full jitter
+    """
+    assert_that([backoff_delay(x, 1.0, 5.0, lambda a, b: b) for x in range(5)]) \
+        .is_equal_to([1.0, 2.0, 4.0, 5.0, 5.0])
+    assert_that(backoff_delay(3, 1.0, 5.0, lambda a, b: a)).is_equal_to(0.0)
@@ -0,0 +1,157 @@
+"""
+Tests for the batched in-page fetch of the Stats Payloads against a local stand-in server
+"""
+
+import json
+import os
+import shutil
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from assertpy import assert_that
+
+from services.stats import PAYLOAD_END, PAYLOAD_MARKER, BaseService, TeamService
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """
+    Serves Matchup pages embedding the payload of a game, 404 for unknown games.
+    """
+    payloads: dict[str, dict] = {}
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Serves a page.
+        """
+        game_id = self.path.rstrip('/').rsplit('/', 1)[-1]
+        if self.path == '/robots.txt':
+            body = 'User-agent: *'
+        elif game_id in self.payloads:
+            body = f"<html><script>{PAYLOAD_MARKER}{json.dumps(self.payloads[game_id])}" \
+                   f"{PAYLOAD_END}</html>"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        """
+        Keeps the test output quiet.
+        """
+
+
+class FetchBrowser:
+    """
+    Browser running the batch script with urllib, extracting the payloads like the script does.
+    """
+
+    def __init__(self):
+        self.current_url = ''
+        self.pages: list[str] = []
+        self.scripts = 0
+
+    def get(self, url: str):
+        """
+        Loads a page.
+        """
+        self.pages.append(url)
+        self.current_url = url
+
+    def execute_async_script(self, script, urls, marker, end):
+        """
+        Requests the pages and extracts their payload text.
+        """
+        self.scripts += 1
+        results = []
+        for url in urls:
+            try:
+                with urllib.request.urlopen(url) as response:
+                    html = response.read().decode('utf-8')
+            except urllib.error.HTTPError:
+                results.append(None)
+                continue
+            start = html.find(marker)
+            results.append(None if start < 0 else
+                           html[start + len(marker):html.find(end, start)])
+        return results
+
+    def quit(self):
+        """
+        Quits nothing.
+        """
+
+
+@pytest.fixture(scope='function')
+def server(match_up):
+    """
+    Starts the local stand-in server.
+    """
+    PageHandler.payloads = {'1': match_up, '2': {'page': {'content': {'game': 2}}}}
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def create_service(server_url: str, monkeypatch) -> TeamService:
+    """
+    Creates a Team Service loading the pages of the local server.
+    """
+    monkeypatch.setattr(TeamService, 'page_url', server_url + '/nfl/matchup/_/gameId/{game_id}')
+    service = TeamService()
+    service.driver.factory = FetchBrowser  # type: ignore[assignment]
+    service.driver.timeout = 0
+    return service
+
+
+def test_get_stats_payloads(server, match_up, monkeypatch):
+    """
+    Tests the payloads of several pages are returned from one loaded page and one script call
+    """
+    service = create_service(server, monkeypatch)
+    urls = [service.page_url.format(game_id=x) for x in ('1', '2', '3')]
+
+    payloads = service.get_stats_payloads(urls)
+
+    assert_that(payloads).is_equal_to({urls[0]: match_up, urls[1]: PageHandler.payloads['2'],
+                                       urls[2]: None})
+    browser = service.driver.browser
+    assert_that(browser.pages).is_equal_to([f"{server}/robots.txt"])
+    assert_that(browser.scripts).is_equal_to(1)
+
+    service.get_stats_payloads(urls[:1])
+    assert_that(browser.pages).is_length(1)
+
+
+def test_prefetch(server, match_up, monkeypatch):
+    """
+    Tests prefetched payloads are served from memory and missing pages load on their own
+    """
+    service = create_service(server, monkeypatch)
+
+    service.prefetch(['1', '3'])
+    stats = service.get_team_stats('1', 1, 2023, '2')
+
+    assert_that(stats).is_not_empty()
+    assert_that(service.prefetched).is_empty()
+    assert_that(service.driver.browser.scripts).is_equal_to(1)
+
+
+@pytest.mark.skipif(not (shutil.which('chromedriver') or os.getenv('SELENIUM_DRIVER')),
+                    reason='Chrome is not available')
+def test_get_stats_payloads_browser(server, match_up):
+    """
+    Tests the batch script in a headless Chrome against the local server
+    """
+    service = BaseService()
+    urls = [f"{server}/nfl/matchup/_/gameId/{x}" for x in ('1', '3')]
+
+    assert_that(service.get_stats_payloads(urls)).is_equal_to({urls[0]: match_up, urls[1]: None})
@@ -0,0 +1,47 @@
+"""
+Tests for the Change Detection of outputs.
+"""
+
+import polars
+from assertpy import assert_that
+
+from services import changes
+
+
+def test_content_hash_order_independent():
+    """
+    Tests the digest does not depend on the row or column order
+    """
+
+    frame = polars.DataFrame({'team': ['Buffalo Bills', 'Miami Dolphins'], 'value': [1.0, 2.0]})
+    reordered = frame.reverse().select(['value', 'team'])
+
+    assert_that(changes.content_hash(reordered)).is_equal_to(changes.content_hash(frame))
+
+
+def test_content_hash_changed():
+    """
+    Tests the digest changes when a value changes
+    """
+
+    frame = polars.DataFrame({'team': ['Buffalo Bills'], 'value': [1.0]})
+    updated = polars.DataFrame({'team': ['Buffalo Bills'], 'value': [2.0]})
+
+    assert_that(changes.content_hash(updated)).is_not_equal_to(changes.content_hash(frame))
+
+
+def test_is_unchanged(s3, session):
+    """
+    Tests comparing a digest against the stored object metadata
+    """
+
+    client = session.client('s3')
+    client.put_object(Bucket='warehouse-bucket', Key='teams/2023/regular/week_1.parquet',
+                      Body=b'', Metadata={changes.DIGEST_METADATA: 'abc'})
+
+    assert_that(changes.is_unchanged(client, 'warehouse-bucket',
+                                     'teams/2023/regular/week_1.parquet', 'abc')).is_true()
+    assert_that(changes.is_unchanged(client, 'warehouse-bucket',
+                                     'teams/2023/regular/week_1.parquet', 'def')).is_false()
+    assert_that(changes.is_unchanged(client, 'warehouse-bucket',
+                                     'teams/2023/regular/week_2.parquet', 'abc')).is_false()
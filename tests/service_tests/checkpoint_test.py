@@ -0,0 +1,48 @@
+"""
+Tests for the per-game Checkpoint Stores.
+"""
+
+import os
+
+import polars
+from assertpy import assert_that
+
+from services.checkpoint import create_checkpoint_store, LocalCheckpointStore, S3CheckpointStore
+
+
+def test_local_checkpoints(tmp_path):
+    """
+    Tests saving, loading and clearing Checkpoints on the local file system
+    """
+
+    store = create_checkpoint_store(str(tmp_path), 'teams/2023/regular/week_1.parquet', None)
+    assert_that(store).is_instance_of(LocalCheckpointStore)
+
+    store.save('1', polars.DataFrame({'team': ['Buffalo Bills']}))
+    store.save('2', polars.DataFrame({'team': ['Miami Dolphins']}))
+
+    assert_that(store.completed()).is_equal_to({'1', '2'})
+    assert_that(polars.concat(store.load())['team'].to_list()) \
+        .is_equal_to(['Buffalo Bills', 'Miami Dolphins'])
+
+    store.clear()
+    assert_that(os.path.exists(tmp_path / 'teams/2023/regular/week_1')).is_false()
+
+
+def test_s3_checkpoints(s3, session):
+    """
+    Tests saving, loading and clearing Checkpoints in an S3 Bucket
+    """
+
+    client = session.client('s3')
+    store = create_checkpoint_store('s3://warehouse-bucket/checkpoints',
+                                    'teams/2023/regular/week_1.parquet', client)
+    assert_that(store).is_instance_of(S3CheckpointStore)
+
+    store.save('1', polars.DataFrame({'team': ['Buffalo Bills']}))
+    assert_that(store.completed()).is_equal_to({'1'})
+    assert_that(list(store.load())).is_length(1)
+
+    store.clear()
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='checkpoints/')
+    assert_that(response.get('Contents', [])).is_empty()
@@ -0,0 +1,39 @@
+"""
+Tests for the Run Deadline
+"""
+
+from assertpy import assert_that
+
+from services.deadline import Deadline
+
+
+def test_can_start():
+    """
+    Tests a game is started while the slowest recent game fits before the deadline
+    """
+    deadline = Deadline(60, reserve=10)
+
+    assert_that(deadline.can_start()).is_true()
+    deadline.record(20)
+    assert_that(deadline.estimate()).is_equal_to(20)
+    assert_that(deadline.can_start()).is_true()
+    deadline.record(55)
+    assert_that(deadline.can_start()).is_false()
+
+
+def test_can_start_reserve():
+    """
+    Tests no game is started once only the reserve is left
+    """
+    assert_that(Deadline(5, reserve=10).can_start()).is_false()
+
+
+def test_estimate_window():
+    """
+    Tests the estimate only considers the recent games
+    """
+    deadline = Deadline(60, window=2)
+    for seconds in (50, 1, 2):
+        deadline.record(seconds)
+
+    assert_that(deadline.estimate()).is_equal_to(2)
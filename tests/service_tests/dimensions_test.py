@@ -0,0 +1,81 @@
+"""
+Tests for the Dimension tables.
+"""
+
+import polars
+from assertpy import assert_that
+
+from services import dimensions
+
+
+def player_frame() -> polars.DataFrame:
+    """
+    Creates a small Player Stats Frame
+    """
+
+    return polars.DataFrame({
+        'player_name': ['Patrick Mahomes', 'Patrick Mahomes', 'Lamar Jackson'],
+        'player_url': ['http://www.espn.com/nfl/player/_/id/3139477/patrick-mahomes',
+                       'http://www.espn.com/nfl/player/_/id/3139477/patrick-mahomes',
+                       'http://www.espn.com/nfl/player/_/id/3916387/lamar-jackson'],
+        'statistic_code': ['yds', 'td', 'yds'],
+        'statistic_name': ['passingyards', 'passingtouchdowns', 'passingyards'],
+        'statistic_type': ['passing', 'passing', 'passing'],
+        'statistic_value': [241.0, 1.0, 152.0],
+        'team': ['Kansas City Chiefs', 'Kansas City Chiefs', 'Baltimore Ravens'],
+        'opponent': ['Baltimore Ravens', 'Baltimore Ravens', 'Kansas City Chiefs'],
+        'week': [3, 3, 3],
+        'year': [2023, 2023, 2023],
+        'game_type': ['3', '3', '3']
+    })
+
+
+def test_assign_keys():
+    """
+    Tests existing members keep their keys and new members get the next keys
+    """
+
+    existing = polars.DataFrame({'team_id': [1, 2], 'team': ['B', 'D']})
+    candidates = polars.DataFrame({'team': ['D', 'A', 'C', 'A']})
+
+    result = dimensions.assign_keys(existing, candidates, 'team_id', ['team'])
+    assert_that(result.to_dicts()).is_equal_to([
+        {'team_id': 1, 'team': 'B'},
+        {'team_id': 2, 'team': 'D'},
+        {'team_id': 3, 'team': 'A'},
+        {'team_id': 4, 'team': 'C'}
+    ])
+
+
+def test_get_player_members():
+    """
+    Tests the Player ID is parsed from the Player URL
+    """
+
+    result = dimensions.get_player_members(player_frame())
+    assert_that(result['player_id'].to_list()).is_equal_to([3139477, 3916387])
+
+
+def test_update_dimensions(s3, session):
+    """
+    Tests upserting the Dimensions and creating the Player Facts
+    """
+
+    client = session.client('s3')
+    result = dimensions.update_dimensions(client, 'warehouse-bucket', 'players', player_frame())
+
+    assert_that(result.columns).is_equal_to(['player_id', 'team_id', 'opponent_id',
+                                             'statistic_id', 'statistic_value', 'week', 'year',
+                                             'game_type'])
+    assert_that(result.null_count().sum_horizontal().item()).is_equal_to(0)
+
+    teams = dimensions.upsert_teams(client, 'warehouse-bucket', polars.DataFrame({
+        'team': ['Kansas City Chiefs', 'Buffalo Bills'],
+        'team_url': ['https://www.espn.com/nfl/team/_/name/kc/kansas-city-chiefs',
+                     'https://www.espn.com/nfl/team/_/name/buf/buffalo-bills'],
+        'opponent': ['Buffalo Bills', 'Kansas City Chiefs']
+    }))
+    assert_that(teams.sort('team_id')['team'].to_list()) \
+        .is_equal_to(['Baltimore Ravens', 'Kansas City Chiefs', 'Buffalo Bills'])
+    assert_that(teams.filter(polars.col('team') == 'Kansas City Chiefs')['team_url'].item()) \
+        .ends_with('kansas-city-chiefs')
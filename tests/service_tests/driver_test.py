@@ -0,0 +1,161 @@
+"""
+Tests for the Managed Driver
+"""
+
+import os
+
+import pytest
+from assertpy import assert_that
+
+from services.driver import ManagedDriver, is_dead_session, process_tree_rss
+
+
+class InvalidSessionIdException(Exception):
+    """
+    Error named like the Selenium error of a dead session.
+    """
+
+
+class FakeBrowser:
+    """
+    Browser recording the pages loaded and whether it was quit.
+    """
+    instances: list['FakeBrowser'] = []
+
+    def __init__(self):
+        self.pages: list[str] = []
+        self.closed = False
+        self.timeouts: list[float] = []
+        FakeBrowser.instances.append(self)
+
+    def get(self, url: str) -> str:
+        """
+        Loads a page.
+        """
+        self.pages.append(url)
+        return url
+
+    def set_page_load_timeout(self, seconds: float):
+        """
+        Sets the page load timeout.
+        """
+        self.timeouts.append(seconds)
+
+    def set_script_timeout(self, seconds: float):
+        """
+        Sets the script timeout.
+        """
+        self.timeouts.append(seconds)
+
+    def quit(self):
+        """
+        Quits the browser.
+        """
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def reset_browsers():
+    """
+    Resets the created browsers.
+    """
+    FakeBrowser.instances = []
+
+
+def test_recycle_after_pages():
+    """
+    Tests the browser is recycled once it served its page limit
+    """
+    driver = ManagedDriver(FakeBrowser, max_pages=2, max_rss_mb=0)
+
+    results = [driver.run(lambda x, y=y: x.get(y)) for y in ('a', 'b', 'c')]
+
+    assert_that(results).is_equal_to(['a', 'b', 'c'])
+    assert_that([x.pages for x in FakeBrowser.instances]).is_equal_to([['a', 'b'], ['c']])
+    assert_that(FakeBrowser.instances[0].closed).is_true()
+    assert_that(driver.counters).is_equal_to({'pages': 3, 'starts': 2, 'recycles': 1,
+                                              'crashes': 0})
+
+
+def test_page_timeouts():
+    """
+    Tests the page load and script timeouts are set on a started browser
+    """
+    driver = ManagedDriver(FakeBrowser, timeout=5)
+
+    driver.run(lambda x: x.get('a'))
+
+    assert_that(FakeBrowser.instances[0].timeouts).is_equal_to([5, 5])
+
+
+def test_recycle_after_rss():
+    """
+    Tests the browser is recycled once its process tree exceeds the memory limit
+    """
+    driver = ManagedDriver(FakeBrowser, max_pages=0, max_rss_mb=1, rss_every=1)
+    driver.rss = lambda: 2 * 1024 * 1024  # type: ignore[method-assign]
+
+    driver.run(lambda x: x.get('a'))
+
+    assert_that(driver.counters['recycles']).is_equal_to(1)
+    assert_that(FakeBrowser.instances[0].closed).is_true()
+
+
+def test_restart_dead_session():
+    """
+    Tests a dead session is restarted and the page retried
+    """
+    driver = ManagedDriver(FakeBrowser, retries=2)
+
+    def load(browser: FakeBrowser) -> str:
+        if len(FakeBrowser.instances) == 1:
+            raise InvalidSessionIdException('invalid session id')
+        return browser.get('a')
+
+    assert_that(driver.run(load)).is_equal_to('a')
+    assert_that(driver.counters).contains_entry({'crashes': 1}, {'starts': 2}, {'pages': 1})
+    assert_that(FakeBrowser.instances[0].closed).is_true()
+
+
+def test_restart_retries_exhausted():
+    """
+    Tests the error is raised once the restarts are exhausted
+    """
+    driver = ManagedDriver(FakeBrowser, retries=1)
+
+    def load(_browser: FakeBrowser) -> str:
+        raise InvalidSessionIdException('invalid session id')
+
+    assert_that(driver.run).raises(InvalidSessionIdException).when_called_with(load)
+    assert_that(driver.counters['starts']).is_equal_to(2)
+
+
+def test_other_errors_raised():
+    """
+    Tests errors of a live session are raised without a restart
+    """
+    driver = ManagedDriver(FakeBrowser)
+
+    def load(_browser: FakeBrowser) -> str:
+        raise ValueError('bad page')
+
+    assert_that(driver.run).raises(ValueError).when_called_with(load)
+    assert_that(driver.counters['starts']).is_equal_to(1)
+
+
+def test_is_dead_session():
+    """
+    Tests the dead session errors are recognized by name and message
+    """
+    assert_that(is_dead_session(InvalidSessionIdException('x'))).is_true()
+    assert_that(is_dead_session(RuntimeError('unknown error: session deleted because of page '
+                                             'crash'))).is_true()
+    assert_that(is_dead_session(RuntimeError('timeout'))).is_false()
+
+
+def test_process_tree_rss():
+    """
+    Tests the RSS of a running process is read
+    """
+    assert_that(process_tree_rss(os.getpid())).is_greater_than(0)
+    assert_that(process_tree_rss(os.getpid(), '/missing')).is_equal_to(0)
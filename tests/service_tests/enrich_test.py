@@ -0,0 +1,33 @@
+"""
+Tests for the Enriched Stats
+"""
+
+import polars
+from assertpy import assert_that
+
+from services.enrich import enrich_stats, get_enriched_key
+
+
+def test_enrich_stats(team_stats, games_frame):
+    """
+    Tests each side of a game gets the game values, its side and its score
+    """
+    stats = team_stats.filter(polars.col('week') == 1)
+    extra = stats.head(1).with_columns(team=polars.lit('C'))
+    enriched = enrich_stats(polars.concat([extra, stats.reverse()]),
+                            games_frame.filter(polars.col('week') == 1), 'teams')
+
+    assert_that(enriched['team'].to_list()).is_equal_to(['A', 'B', 'C'])
+    assert_that(enriched['game_id'].to_list()).is_equal_to(['101', '101', None])
+    assert_that(enriched['is_home'].to_list()).is_equal_to([True, False, None])
+    assert_that(enriched['team_score'].to_list()).is_equal_to([24, 17, None])
+    assert_that(enriched['opponent_score'].to_list()).is_equal_to([17, 24, None])
+    assert_that(enriched['week'].to_list()).is_equal_to([1, 1, 1])
+
+
+def test_get_enriched_key():
+    """
+    Tests the enriched table keeps the partition of the Stats
+    """
+    assert_that(get_enriched_key('players/2023/regular/week_1.parquet', 'players')) \
+        .is_equal_to('player_enriched/2023/regular/week_1.parquet')
@@ -0,0 +1,64 @@
+"""
+Tests for the Matchup Feature Matrix
+"""
+
+import ast
+import struct
+
+import polars
+from assertpy import assert_that
+
+from services.features import create_matchups, encode_npy, pivot_teams
+
+
+def test_create_matchups(team_stats, games_frame):
+    """
+    Tests every game becomes a row of home, away, delta and game values
+    """
+    unmatched = games_frame.head(1).with_columns(week=polars.lit(9, polars.Int64),
+                                                 game_id=polars.lit('109'))
+    games = polars.concat([games_frame.filter(polars.col('week') < 3).reverse(), unmatched])
+    features, index = create_matchups(team_stats.filter(polars.col('week') < 3), games)
+
+    assert_that(features.columns).is_equal_to([
+        'home_Total Yards', 'away_Total Yards', 'delta_Total Yards', 'home_score', 'away_score',
+        'line', 'over_under'])
+    assert_that(set(features.dtypes)).is_equal_to({polars.Float32})
+    assert_that(features.row(1)).is_equal_to((2.0, 20.0, -18.0, 24.0, 17.0, -3.5, 44.5))
+    assert_that(index['game_id'].to_list()).is_equal_to(['101', '102'])
+    assert_that(index['row'].to_list()).is_equal_to([0, 1])
+
+
+def test_pivot_teams(team_stats):
+    """
+    Tests the statistics become float32 columns sorted by name and unnamed statistics are dropped
+    """
+    extra = team_stats.head(2).with_columns(
+        statistic_name=polars.Series([None, 'Passing Yards']),
+        statistic_value=polars.lit('7'))
+    wide = pivot_teams(polars.concat([team_stats.with_columns(polars.col('statistic_value')
+                                                              .cast(polars.String)), extra]))
+
+    assert_that(wide.columns).is_equal_to(['year', 'game_type', 'week', 'team', 'Passing Yards',
+                                           'Total Yards'])
+    assert_that(wide.schema['Passing Yards']).is_equal_to(polars.Float32)
+    assert_that(wide['Passing Yards'].drop_nulls().to_list()).is_equal_to([7.0])
+
+
+def test_encode_npy():
+    """
+    Tests the matrix is encoded as a row-major float32 array with an aligned header
+    """
+    features = polars.DataFrame({'a': [1.0, 2.0, None], 'b': [4.0, 5.0, 6.0]},
+                                schema={'a': polars.Float32, 'b': polars.Float32})
+    content = encode_npy(features)
+
+    length = struct.unpack('<H', content[8:10])[0]
+    header = ast.literal_eval(content[10:10 + length].decode('latin1'))
+    values = struct.unpack('<6f', content[10 + length:])
+
+    assert_that(content[:8]).is_equal_to(b'\x93NUMPY\x01\x00')
+    assert_that((10 + length) % 64).is_equal_to(0)
+    assert_that(header).is_equal_to({'descr': '<f4', 'fortran_order': False, 'shape': (3, 2)})
+    assert_that(values[:4]).is_equal_to((1.0, 4.0, 2.0, 5.0))
+    assert_that(values[4]).is_nan()
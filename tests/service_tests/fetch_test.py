@@ -0,0 +1,164 @@
+"""
+Tests for the Fetch Policy
+"""
+
+import threading
+
+import pytest
+from assertpy import assert_that
+
+from services.fetch import AimdLimiter, CircuitBreaker, Fetcher, FetchError
+from services.stats import PlayerService, TeamService
+
+
+class Clock:
+    """
+    Clock advanced by the tests.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def create_fetcher(retries: int = 2, threshold: int = 5) -> Fetcher:
+    """
+    Creates a Fetcher that does not sleep between retries.
+    """
+    fetcher = Fetcher(breaker=CircuitBreaker(threshold=threshold, cooldown=0),
+                      retries=retries, backoff=1.0, max_backoff=4.0)
+    fetcher.sleep = lambda x: None
+    return fetcher
+
+
+def test_limiter_increase_and_decrease():
+    """
+    Tests the limit grows additively on fast successes and is halved on errors
+    """
+    limiter = AimdLimiter(initial=2, maximum=4, target_latency=1.0)
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(0.1, True)
+    assert_that(limiter.limit).is_equal_to(4.0)
+
+    limiter.acquire()
+    limiter.release(0.1, False)
+    assert_that(limiter.limit).is_equal_to(2.0)
+
+    limiter.acquire()
+    limiter.release(2.0, True)
+    assert_that(limiter.limit).is_equal_to(2.0)
+
+
+def test_limiter_blocks_at_limit():
+    """
+    Tests a fetch waits for a free slot once the limit is reached
+    """
+    limiter = AimdLimiter(initial=1, maximum=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert_that(acquired.wait(0.1)).is_false()
+
+    limiter.release(0.1, True)
+    thread.join(1)
+    assert_that(acquired.is_set()).is_true()
+
+
+def test_breaker_opens_and_recovers():
+    """
+    Tests the circuit opens after the threshold, lets a trial through after the cool-down and
+    closes on its success
+    """
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=2, cooldown=10, clock=clock)
+
+    breaker.failure()
+    assert_that(breaker.state).is_equal_to('closed')
+    breaker.failure()
+    assert_that(breaker.state).is_equal_to('open')
+
+    clock.now = 10
+    breaker.wait()
+    assert_that(breaker.state).is_equal_to('half-open')
+    breaker.failure()
+    assert_that(breaker.state).is_equal_to('open')
+    assert_that(breaker.trips).is_equal_to(2)
+
+    clock.now = 20
+    breaker.wait()
+    breaker.success()
+    assert_that(breaker.state).is_equal_to('closed')
+    assert_that(breaker.failures).is_equal_to(0)
+
+
+def test_fetch_retries():
+    """
+    Tests a failed or empty fetch is retried until it returns a payload
+    """
+    fetcher = create_fetcher()
+    results = [TimeoutError('page load timed out'), None, {'page': {}}]
+
+    def load():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert_that(fetcher.fetch(load, 'page')).is_equal_to({'page': {}})
+    assert_that(results).is_empty()
+
+
+def test_fetch_error_after_retries():
+    """
+    Tests a fetch failing every attempt raises a Fetch Error
+    """
+    fetcher = create_fetcher()
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        raise TimeoutError('page load timed out')
+
+    with pytest.raises(FetchError):
+        fetcher.fetch(load, 'page')
+    assert_that(attempts).is_length(3)
+
+
+def test_fetch_empty_after_retries():
+    """
+    Tests a page that never has a payload returns None
+    """
+    assert_that(create_fetcher().fetch(lambda: None, 'page')).is_none()
+
+
+def test_fetch_empty_keeps_breaker_closed():
+    """
+    Tests a page without a payload is retried without counting as a breaker failure
+    """
+    fetcher = create_fetcher(threshold=2)
+    assert_that(fetcher.fetch(lambda: None, 'page')).is_none()
+    assert_that(fetcher.breaker.state).is_equal_to('closed')
+    assert_that(fetcher.breaker.failures).is_equal_to(0)
+
+    def fail():
+        raise TimeoutError('page load timed out')
+
+    with pytest.raises(FetchError):
+        fetcher.fetch(fail, 'page')
+    assert_that(fetcher.breaker.state).is_equal_to('open')
+
+
+def test_service_fetcher():
+    """
+    Tests the Services of a run share the injected Fetcher and other Services get their own
+    """
+    fetcher = create_fetcher()
+    assert_that(TeamService(fetcher).fetcher).is_same_as(fetcher)
+    assert_that(PlayerService(fetcher).fetcher).is_same_as(fetcher)
+    assert_that(TeamService().fetcher).is_not_same_as(TeamService().fetcher)
@@ -0,0 +1,51 @@
+"""
+Tests for the Form Tables
+"""
+
+import polars
+from assertpy import assert_that
+
+from services.form import get_state, prepare_stats, rolling_form
+
+
+def test_rolling_form(team_stats):
+    """
+    Tests the rolling means are computed per key in game order
+    """
+    stats = prepare_stats(team_stats.reverse().filter(polars.col('week') < 5), 'teams')
+    form = rolling_form(stats, 'teams', [2, 3])
+
+    team = form.filter(polars.col('team') == 'A')
+    assert_that(team['week'].to_list()).is_equal_to([1, 2, 3, 4])
+    assert_that(team['avg_2'].to_list()).is_equal_to([1.0, 1.5, 2.5, 3.5])
+    assert_that(team['avg_3'].to_list()).is_equal_to([1.0, 1.5, 2.0, 3.0])
+    assert_that(team['games'].to_list()).is_equal_to([1, 2, 3, 3])
+    assert_that(form.filter(polars.col('team') == 'B')['avg_3'].to_list()[-1]).is_equal_to(30.0)
+
+
+def test_rolling_form_orders_game_types(team_stats):
+    """
+    Tests the preseason games come before the regular season of the same year
+    """
+    stats = team_stats.filter(polars.col('week') < 3).with_columns(
+        polars.when(polars.col('week') == 2).then(polars.lit('1')).otherwise(polars.lit('2'))
+        .alias('game_type'))
+    form = rolling_form(prepare_stats(stats, 'teams'), 'teams', [2])
+
+    assert_that(form.filter(polars.col('team') == 'A')['avg_2'].to_list()) \
+        .is_equal_to([2.0, 1.5])
+
+
+def test_incremental_form(team_stats):
+    """
+    Tests the windows of new weeks computed from the state match a full build
+    """
+    stats = prepare_stats(team_stats, 'teams')
+    full = rolling_form(stats, 'teams', [2, 3])
+
+    old = stats.filter(polars.col('week') <= 3)
+    state = get_state(rolling_form(old, 'teams', [2, 3]), 'teams', [2, 3])
+    form = rolling_form(stats.filter(polars.col('week') > 3), 'teams', [2, 3], state)
+
+    assert_that(len(state)).is_equal_to(4)
+    assert_that(form.equals(full.filter(polars.col('week') > 3))).is_true()
@@ -0,0 +1,64 @@
+"""
+Tests for the Arrow IPC outputs
+"""
+
+from assertpy import assert_that
+
+from services.changes import content_hash, get_stored_hash
+from services.ipc import download_ipc, get_ipc_digest, get_ipc_key, read_ipc, refresh_ipc, \
+    write_ipc
+from services.spill import SpillAccumulator
+
+
+def test_get_ipc_key():
+    """
+    Tests the IPC copy keeps the partition of the output
+    """
+    assert_that(get_ipc_key('players/2023/regular/week_1.parquet')) \
+        .is_equal_to('players/2023/regular/week_1.arrow')
+    assert_that(get_ipc_key('players/2023/regular/week_1.arrow')) \
+        .is_equal_to('players/2023/regular/week_1.arrow')
+
+
+def test_write_ipc(s3, session, tmp_path, team_stats):
+    """
+    Tests the uncompressed and LZ4 copies are read back through the memory map
+    """
+    client = session.client('s3')
+    write_ipc(client, 'warehouse-bucket', 'teams/2023/2/week_1.parquet', team_stats,
+              'uncompressed')
+    with SpillAccumulator(1, str(tmp_path)) as spilled:
+        spilled.extend([team_stats.head(1), team_stats.tail(-1)])
+        write_ipc(client, 'warehouse-bucket', 'teams/2023/2/week_2.parquet', spilled, 'lz4')
+
+    for key in ('teams/2023/2/week_1.parquet', 'teams/2023/2/week_2.arrow'):
+        path = download_ipc(client, 'warehouse-bucket', key, str(tmp_path))
+        assert_that(path).ends_with('.arrow')
+        assert_that(read_ipc(path).equals(team_stats)).is_true()
+
+
+def test_write_ipc_invalid_compression(s3, session, team_stats):
+    """
+    Tests an unsupported compression is rejected
+    """
+    assert_that(write_ipc).raises(ValueError).when_called_with(
+        session.client('s3'), 'warehouse-bucket', 'teams/2023/2/week_1.parquet', team_stats,
+        'zstd')
+
+
+def test_refresh_ipc(s3, session, team_stats):
+    """
+    Tests the IPC copy is only written again when it is missing or stale
+    """
+    client = session.client('s3')
+    key = 'teams/2023/2/week_1.parquet'
+    digest = content_hash(team_stats)
+    assert_that(refresh_ipc(client, 'warehouse-bucket', key, team_stats, 'lz4', digest=digest)) \
+        .is_positive()
+    assert_that(get_stored_hash(client, 'warehouse-bucket', get_ipc_key(key))) \
+        .is_equal_to(get_ipc_digest(digest, 'lz4'))
+
+    assert_that(refresh_ipc(client, 'warehouse-bucket', key, team_stats, 'lz4', digest=digest)) \
+        .is_zero()
+    assert_that(refresh_ipc(client, 'warehouse-bucket', key, team_stats, 'uncompressed',
+                            digest=digest)).is_positive()
@@ -0,0 +1,124 @@
+"""
+Tests for the Job Queues.
+"""
+
+import os
+import threading
+import time
+
+from assertpy import assert_that
+
+from services.jobs import Job, LocalJobQueue, SqsJobQueue
+
+
+def test_local_queue(tmp_path):
+    """
+    Tests sending, receiving, releasing and acknowledging Jobs in a local Queue
+    """
+
+    queue = LocalJobQueue(str(tmp_path))
+    queue.send(Job('teams', 'schedules/2023/regular/week_1.parquet'))
+    queue.send(Job('players', 'schedules/2023/regular/week_1.parquet', '401547379'))
+
+    first = queue.receive(0)
+    assert_that(first.stat_type).is_equal_to('teams')
+
+    second = queue.receive(0)
+    assert_that(second.game_id).is_equal_to('401547379')
+    assert_that(queue.receive(0)).is_none()
+
+    queue.release(first)
+    queue.ack(second)
+
+    retried = queue.receive(0)
+    assert_that(retried.stat_type).is_equal_to('teams')
+    queue.ack(retried)
+    assert_that(queue.receive(0)).is_none()
+
+
+def test_local_queue_recover(tmp_path):
+    """
+    Tests only the Jobs whose lease expired are returned to the Queue
+    """
+
+    queue = LocalJobQueue(str(tmp_path), lease=60)
+    queue.send(Job('teams', 'schedules/2023/regular/week_1.parquet'))
+    queue.send(Job('players', 'schedules/2023/regular/week_1.parquet'))
+    stopped = queue.receive(0)
+    running = queue.receive(0)
+
+    expired = time.time() - 120
+    os.utime(os.path.join(queue.processing, stopped.receipt), (expired, expired))
+    assert_that(queue.recover()).is_equal_to(1)
+
+    os.utime(os.path.join(queue.processing, running.receipt), (expired, expired))
+    queue.extend(running)
+    assert_that(queue.recover()).is_equal_to(0)
+    assert_that(queue.receive(0).stat_type).is_equal_to('teams')
+
+
+def test_local_queue_reject(tmp_path):
+    """
+    Tests a rejected Job is moved to the failed folder instead of retried
+    """
+
+    queue = LocalJobQueue(str(tmp_path))
+    queue.send(Job('kickers', 'schedules/2023/regular/week_1.parquet'))
+    queue.reject(queue.receive(0))
+
+    assert_that(queue.receive(0)).is_none()
+    assert_that(os.listdir(queue.failed)).is_length(1)
+
+
+def test_hold_extends_lease(tmp_path, monkeypatch):
+    """
+    Tests the heartbeat extends the lease while a Job is held and stops afterwards
+    """
+
+    queue = LocalJobQueue(str(tmp_path), lease=0.03)
+    queue.send(Job('teams', 'schedules/2023/regular/week_1.parquet'))
+    job = queue.receive(0)
+    extended = threading.Event()
+    monkeypatch.setattr(queue, 'extend', lambda x: extended.set())
+
+    with queue.hold(job):
+        assert_that(extended.wait(1)).is_true()
+    extended.clear()
+    assert_that(extended.wait(0.05)).is_false()
+
+
+def test_sqs_queue(session):
+    """
+    Tests sending, receiving and acknowledging Jobs in an SQS Queue
+    """
+
+    client = session.client('sqs')
+    queue_url = client.create_queue(QueueName='stats-jobs')['QueueUrl']
+    queue = SqsJobQueue(client, queue_url)
+
+    queue.send(Job('games', 'schedules/2023/regular/week_1.parquet'))
+    job = queue.receive(0)
+    assert_that(job.stat_type).is_equal_to('games')
+    assert_that(job.receipt).is_not_empty()
+
+    queue.ack(job)
+    assert_that(queue.receive(0)).is_none()
+
+
+def test_sqs_queue_reject(session):
+    """
+    Tests a rejected Job is moved to the dead letter Queue
+    """
+
+    client = session.client('sqs')
+    queue_url = client.create_queue(QueueName='stats-jobs')['QueueUrl']
+    dead_letter_url = client.create_queue(QueueName='stats-jobs-failed')['QueueUrl']
+    queue = SqsJobQueue(client, queue_url, lease=60, dead_letter_url=dead_letter_url)
+
+    queue.send(Job('kickers', 'schedules/2023/regular/week_1.parquet'))
+    job = queue.receive(0)
+    queue.extend(job)
+    queue.reject(job)
+
+    assert_that(queue.receive(0)).is_none()
+    assert_that(SqsJobQueue(client, dead_letter_url).receive(0).stat_type).is_equal_to('kickers')
@@ -0,0 +1,172 @@
+"""
+Tests for the Warehouse Manifest.
+"""
+
+import polars
+from assertpy import assert_that
+from botocore.exceptions import ClientError
+
+from services import manifest, storage
+
+
+def test_get_partitions():
+    """
+    Tests parsing the Partition Values from an Entity Key
+    """
+
+    result = manifest.get_partitions('players/2023/regular/week_5.parquet')
+    assert_that(result).contains_entry({'entity': 'players'}) \
+        .contains_entry({'year': 2023}) \
+        .contains_entry({'game_type': 'regular'}) \
+        .contains_entry({'week': 5})
+
+
+def test_create_entry():
+    """
+    Tests creating a Manifest Entry with the Column Bounds
+    """
+
+    frame = polars.DataFrame({
+        'player_name': ['Josh Allen', 'Aaron Rodgers'],
+        'team': ['Buffalo Bills', 'New York Jets'],
+        'statistic_value': [1.0, 2.0]
+    })
+    result = manifest.create_entry('players/2023/regular/week_1.parquet', frame, 1024)
+
+    assert_that(result).contains_entry({'row_count': 2}) \
+        .contains_entry({'size': 1024}) \
+        .contains_entry({'min_player_name': 'Aaron Rodgers'}) \
+        .contains_entry({'max_player_name': 'Josh Allen'}) \
+        .contains_entry({'min_team': 'Buffalo Bills'}) \
+        .contains_entry({'min_game_id': None})
+
+
+def test_update_manifest(s3, session):
+    """
+    Tests inserting and replacing Manifest Entries through fragments and compacting them
+    """
+
+    client = session.client('s3')
+    frame = polars.DataFrame({'game_id': ['1', '2']})
+
+    manifest.update_manifest(client, 'warehouse-bucket', [
+        manifest.create_entry('schedules/2023/regular/week_1.parquet', frame, 10),
+        manifest.create_entry('schedules/2023/regular/week_2.parquet', frame, 10)
+    ])
+    manifest.update_manifest(client, 'warehouse-bucket', [
+        manifest.create_entry('schedules/2023/regular/week_1.parquet', frame.head(1), 5)
+    ])
+
+    result, etag = manifest.load_manifest(client, 'warehouse-bucket')
+    assert_that(etag).is_none()
+    assert_that(result).is_length(2)
+    assert_that(result.filter(polars.col('week') == 1)['row_count'].to_list()).is_equal_to([1])
+
+    assert_that(manifest.compact_manifest(client, 'warehouse-bucket')).is_equal_to(2)
+    assert_that(manifest.list_fragments(client, 'warehouse-bucket')).is_empty()
+
+    result, etag = manifest.load_manifest(client, 'warehouse-bucket')
+    assert_that(etag).is_not_none()
+    assert_that(result).is_length(2)
+    assert_that(result.filter(polars.col('week') == 1)['row_count'].to_list()).is_equal_to([1])
+
+
+def test_compact_manifest_conflict(s3, session, monkeypatch):
+    """
+    Tests keeping the fragments when the Manifest write keeps conflicting
+    """
+
+    client = session.client('s3')
+    manifest.update_manifest(client, 'warehouse-bucket', [
+        manifest.create_entry('teams/2023/regular/week_1.parquet',
+                              polars.DataFrame({'team': ['A']}), 10)
+    ])
+
+    put_object = client.put_object
+    delays = []
+
+    def conflict(**kwargs):
+        if kwargs['Key'] == manifest.MANIFEST_KEY:
+            raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'PutObject')
+        return put_object(**kwargs)
+
+    monkeypatch.setattr(client, 'put_object', conflict)
+    monkeypatch.setattr(storage.time, 'sleep', delays.append)
+
+    assert_that(manifest.compact_manifest(client, 'warehouse-bucket')).is_equal_to(0)
+    assert_that(delays).is_length(7)
+    assert_that(manifest.list_fragments(client, 'warehouse-bucket')).is_length(1)
+    result, _ = manifest.load_manifest(client, 'warehouse-bucket')
+    assert_that(result['key'].to_list()).is_equal_to(['teams/2023/regular/week_1.parquet'])
+
+
+def test_load_manifest_compacts(s3, session):
+    """
+    Tests the fragments are compacted by a reader once there are more than the maximum
+    """
+
+    client = session.client('s3')
+    for week in range(1, 4):
+        manifest.update_manifest(client, 'warehouse-bucket', [
+            manifest.create_entry(f"teams/2023/regular/week_{week}.parquet",
+                                  polars.DataFrame({'team': ['A']}), 10)
+        ])
+
+    result, etag = manifest.load_manifest(client, 'warehouse-bucket', max_fragments=3)
+    assert_that(etag).is_none()
+    assert_that(manifest.list_fragments(client, 'warehouse-bucket')).is_length(3)
+
+    result, etag = manifest.load_manifest(client, 'warehouse-bucket', max_fragments=2)
+    assert_that(etag).is_not_none()
+    assert_that(result).is_length(3)
+    assert_that(manifest.list_fragments(client, 'warehouse-bucket')).is_empty()
+
+
+def test_remove_entries(s3, session):
+    """
+    Tests removed Entries are not added back by the fragments
+    """
+
+    client = session.client('s3')
+    frame = polars.DataFrame({'team': ['A']})
+    manifest.update_manifest(client, 'warehouse-bucket', [
+        manifest.create_entry('teams/2023/regular/week_1.parquet', frame, 10),
+        manifest.create_entry('teams/2023/regular/week_1/1.parquet', frame, 10)
+    ])
+
+    assert_that(manifest.remove_entries(client, 'warehouse-bucket',
+                                        ['teams/2023/regular/week_1/1.parquet'])).is_equal_to(1)
+    result, _ = manifest.load_manifest(client, 'warehouse-bucket')
+    assert_that(result['key'].to_list()).is_equal_to(['teams/2023/regular/week_1.parquet'])
+    assert_that(manifest.remove_entries(client, 'warehouse-bucket',
+                                        ['teams/2023/regular/week_1/1.parquet'])).is_zero()
+
+
+def test_load_manifest_missing(s3, session):
+    """
+    Tests loading the Manifest before it has been written
+    """
+
+    result, etag = manifest.load_manifest(session.client('s3'), 'warehouse-bucket')
+    assert_that(result).is_empty()
+    assert_that(etag).is_none()
+
+
+def test_find_files():
+    """
+    Tests planning files from the Manifest with partition and min/max pruning
+    """
+
+    entries = polars.DataFrame([
+        manifest.create_entry('teams/2023/regular/week_1.parquet',
+                              polars.DataFrame({'team': ['Buffalo Bills', 'Miami Dolphins']}), 1),
+        manifest.create_entry('teams/2023/regular/week_2.parquet',
+                              polars.DataFrame({'team': ['Dallas Cowboys', 'New York Giants']}), 1),
+        manifest.create_entry('players/2023/regular/week_1.parquet',
+                              polars.DataFrame({'team': ['Buffalo Bills']}), 1)
+    ], schema=manifest.MANIFEST_SCHEMA)
+
+    assert_that(manifest.find_files(entries, 'teams', year=2023)).is_length(2)
+    assert_that(manifest.find_files(entries, 'teams', team='Buffalo Bills')) \
+        .is_equal_to(['teams/2023/regular/week_1.parquet'])
+    assert_that(manifest.find_files(entries, 'teams', week=3)).is_empty()
@@ -0,0 +1,73 @@
+"""
+Tests for the per-stage Metrics
+"""
+
+import json
+import logging
+
+from assertpy import assert_that
+
+from services.metrics import NULL_TIMER, Metrics
+
+
+def test_stage_disabled():
+    """
+    Tests nothing is recorded while the Metrics are disabled
+    """
+    metrics = Metrics()
+
+    with metrics.stage('parse') as timer:
+        timer.add(10, 5)
+
+    assert_that(metrics.stage('parse')).is_same_as(NULL_TIMER)
+    assert_that(metrics.game('1')).is_same_as(NULL_TIMER)
+    assert_that(metrics.summary()).is_empty()
+
+
+def test_stage_enabled(caplog):
+    """
+    Tests the stages are totalled and attributed to the current game
+    """
+    metrics = Metrics()
+    metrics.enable(json_log=True)
+
+    with caplog.at_level(logging.INFO, logger='services.metrics'):
+        with metrics.game('401547300'):
+            for _ in range(2):
+                with metrics.stage('encode') as timer:
+                    timer.add(100, 10)
+        with metrics.stage('upload') as timer:
+            timer.add(100)
+
+    summary = metrics.summary()
+    assert_that(summary['encode']).contains_entry({'count': 2}, {'bytes': 200}, {'rows': 20})
+    assert_that(summary['upload']).contains_entry({'count': 1}, {'bytes': 100}, {'rows': 0})
+    assert_that([x[0] for x in metrics.slowest_games()]).is_equal_to(['401547300'])
+
+    records = [json.loads(x.getMessage()) for x in caplog.records]
+    assert_that(records).is_length(3)
+    assert_that(records[0]).contains_entry({'stage': 'encode'}, {'game_id': '401547300'},
+                                           {'bytes': 100})
+    assert_that(records[2]).contains_entry({'stage': 'upload'}, {'game_id': None})
+
+
+def test_write_textfile(tmp_path):
+    """
+    Tests the Prometheus textfile holds a sample for every stage and total
+    """
+    metrics = Metrics()
+    metrics.enable()
+    metrics.record('page_load', 1.5)
+    metrics.record('encode', 0.5, 2048, 40)
+
+    path = tmp_path / 'stats.prom'
+    metrics.report(str(path), 'download_stats')
+
+    text = path.read_text(encoding='utf-8')
+    assert_that(text).contains('# TYPE stats_stage_seconds_total counter')
+    assert_that(text).contains(
+        'stats_stage_seconds_total{job="download_stats",stage="page_load"} 1.5')
+    assert_that(text).contains('stats_stage_bytes_total{job="download_stats",stage="encode"} 2048')
+    assert_that(text).contains('stats_stage_rows_total{job="download_stats",stage="encode"} 40')
+    assert_that(text).contains('stats_run_seconds{job="download_stats"}')
+    assert_that(list(tmp_path.iterdir())).is_length(1)
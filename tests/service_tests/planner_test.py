@@ -0,0 +1,77 @@
+"""
+Tests for the Pre-fetch Planner
+"""
+
+import polars
+from assertpy import assert_that
+
+from services import planner
+
+
+def create_schedule(**columns) -> polars.DataFrame:
+    """
+    Creates a Schedule Data Frame of three games.
+    """
+    return polars.DataFrame({'game_id': ['1', '2', '3'], **columns})
+
+
+def test_plan_games_future():
+    """
+    Tests games dated after today are deferred
+    """
+    plan = planner.plan_games(create_schedule(game_date=['20240101', '20240108', '20240115']),
+                              '20240108')
+
+    assert_that(plan.ready['game_id'].to_list()).is_equal_to(['1', '2'])
+    assert_that(plan.pending['game_id'].to_list()).is_equal_to(['3'])
+
+
+def test_plan_games_status():
+    """
+    Tests games dated today are deferred until final and earlier statuses are not trusted
+    """
+    plan = planner.plan_games(create_schedule(game_date=['20240101', '20240108', '20240108'],
+                                              status=['pre', 'in', 'post']), '20240108')
+
+    assert_that(plan.ready['game_id'].to_list()).is_equal_to(['1', '3'])
+    assert_that(plan.pending['game_id'].to_list()).is_equal_to(['2'])
+
+
+def test_plan_games_no_date():
+    """
+    Tests a Schedule without game dates is fetched in full
+    """
+    plan = planner.plan_games(create_schedule(), '20240108')
+
+    assert_that(plan.ready).is_length(3)
+    assert_that(plan.pending).is_empty()
+
+
+def test_pending_keys():
+    """
+    Tests the pending list keys map back to the Schedule File
+    """
+    key = planner.get_pending_key('teams/2023/2/week_1.parquet')
+
+    assert_that(key).is_equal_to('pending/teams/2023/2/week_1.parquet')
+    assert_that(planner.get_schedule_key(key, 'teams')) \
+        .is_equal_to('schedules/2023/2/week_1.parquet')
+    assert_that(planner.get_schedule_key('pending/teams/2023/2/week_1/part-1-of-4.parquet',
+                                         'teams')).is_equal_to('schedules/2023/2/week_1.parquet')
+
+
+def test_write_pending(session, s3):
+    """
+    Tests the pending list is stored and removed once empty
+    """
+    client = session.client('s3')
+    key = 'pending/teams/2020/1/week_1.parquet'
+    frame = create_schedule(game_date=['20240101', '20240108', '20240115'])
+
+    planner.write_pending(client, 'warehouse-bucket', key, frame)
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='pending/')
+    assert_that(response.get('Contents', [])).is_length(1)
+
+    planner.write_pending(client, 'warehouse-bucket', key, frame.clear())
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='pending/')
+    assert_that(response.get('Contents', [])).is_empty()
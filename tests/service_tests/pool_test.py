@@ -0,0 +1,156 @@
+"""
+Tests for the Service Pool.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from assertpy import assert_that
+
+from services.pool import ServiceBudget, ServicePool
+
+
+def test_borrow_reuses_service():
+    """
+    Tests a returned Service is reused instead of creating a new one
+    """
+
+    created = []
+    pool = ServicePool(lambda: created.append(object()) or created[-1], 2)
+
+    with pool.borrow() as first:
+        pass
+    with pool.borrow() as second:
+        pass
+
+    assert_that(created).is_length(1)
+    assert_that(second).is_same_as(first)
+
+
+def test_borrow_bounded():
+    """
+    Tests the number of Services never exceeds the pool size
+    """
+
+    created = []
+    pool = ServicePool(lambda: created.append(object()) or created[-1], 2)
+
+    def work(_):
+        with pool.borrow() as service:
+            return service
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(work, range(50)))
+
+    assert_that(len(created)).is_less_than_or_equal_to(2)
+    assert_that(len(set(id(x) for x in results))).is_less_than_or_equal_to(2)
+
+
+def test_factory_failure_releases_slot():
+    """
+    Tests a failed Service creation does not consume a pool slot
+    """
+
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('Browser failed to start')
+        return object()
+
+    pool = ServicePool(factory, 1)
+    try:
+        with pool.borrow():
+            pass
+    except RuntimeError:
+        pass
+
+    with pool.borrow() as service:
+        assert_that(service).is_not_none()
+
+
+def test_budget_shared_between_pools():
+    """
+    Tests Pools sharing a Budget never keep more Services alive than its size
+    """
+
+    alive = []
+
+    class Service:
+        """
+        Service counting the instances alive
+        """
+        def __init__(self):
+            alive.append(1)
+
+        def close(self):
+            """
+            Quits the browser
+            """
+            alive.pop()
+
+    budget = ServiceBudget(2)
+    pools = [ServicePool(Service, 2, budget) for _ in range(3)]
+
+    def work(index):
+        with pools[index % 3].borrow():
+            return len(alive)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(work, range(60)))
+
+    assert_that(max(results)).is_less_than_or_equal_to(2)
+    assert_that(len(alive)).is_less_than_or_equal_to(2)
+
+
+def test_close_quits_services():
+    """
+    Tests leaving the Pool quits every Service, also when an exception escapes the block
+    """
+
+    closed = []
+
+    class Service:
+        """
+        Service recording its shutdown
+        """
+        def close(self):
+            """
+            Quits the browser
+            """
+            closed.append(self)
+
+    try:
+        with ServicePool(Service, 2) as pool:
+            with pool.borrow() as first, pool.borrow() as second:
+                pass
+            raise RuntimeError('Run failed')
+    except RuntimeError:
+        pass
+
+    assert_that(closed).contains_only(first, second)
+
+
+def test_close_quits_borrowed_service():
+    """
+    Tests a Service borrowed while the Pool closes is quit once it is returned
+    """
+
+    closed = []
+
+    class Service:
+        """
+        Service recording its shutdown
+        """
+        def close(self):
+            """
+            Quits the browser
+            """
+            closed.append(self)
+
+    pool = ServicePool(Service, 1)
+    with pool.borrow() as service:
+        pool.close()
+        assert_that(closed).is_empty()
+
+    assert_that(closed).is_equal_to([service])
@@ -0,0 +1,108 @@
+"""
+Tests for the Profiling mode
+"""
+
+import marshal
+import threading
+import time
+
+from assertpy import assert_that
+
+from services import profiler
+from services.metrics import METRICS
+from services.profiler import Profiler, profile_run, write_artifacts
+
+
+def busy_game(stop: threading.Event) -> None:
+    """
+    Keeps a worker thread in the parse stage of a game until stopped.
+    """
+    with METRICS.game('401547300'):
+        with METRICS.stage('parse'):
+            while not stop.is_set():
+                sum(range(1000))
+
+
+def test_profiler_artifacts():
+    """
+    Tests the samples are tagged with the Stage and Game ID of the sampled thread
+    """
+    profiler = Profiler(interval=0.001)
+    stop = threading.Event()
+    try:
+        profiler.start()
+        worker = threading.Thread(target=busy_game, args=(stop,))
+        worker.start()
+        time.sleep(0.1)
+        stop.set()
+        worker.join()
+        profiler.stop()
+    finally:
+        METRICS.disable()
+
+    artifacts = profiler.artifacts()
+    assert_that(artifacts).contains_key('cpu.prof', 'cpu.txt', 'samples.folded', 'stages.txt',
+                                        'allocations.txt')
+    assert_that(marshal.loads(artifacts['cpu.prof'])).is_not_empty()
+    assert_that(artifacts['stages.txt'].decode('utf-8')).matches(r'parse\s+401547300\s+\d+')
+    assert_that(artifacts['samples.folded'].decode('utf-8')) \
+        .contains('parse;401547300;').contains('busy_game (profiler_test.py)')
+    assert_that(artifacts['stages.txt'].decode('utf-8')).contains('Sampling took')
+    assert_that(artifacts['allocations.txt'].decode('utf-8')).starts_with('Run took')
+
+
+def test_profiler_caps_stacks(monkeypatch):
+    """
+    Tests new stacks are counted under the overflow entry once the cap is reached
+    """
+    monkeypatch.setattr(profiler, 'MAX_STACKS', 1)
+    sampler = Profiler(interval=0.001)
+    stop = threading.Event()
+    try:
+        sampler.start()
+        worker = threading.Thread(target=busy_game, args=(stop,))
+        worker.start()
+        time.sleep(0.1)
+        stop.set()
+        worker.join()
+        sampler.stop()
+    finally:
+        METRICS.disable()
+
+    lines = sampler.artifacts()['samples.folded'].decode('utf-8').splitlines()
+    assert_that(len(lines)).is_less_than_or_equal_to(3)
+    assert_that('\n'.join(lines)).contains(profiler.OVERFLOW_FRAME)
+
+
+def test_write_artifacts_s3(session, s3):
+    """
+    Tests the artifacts are written under an S3 prefix
+    """
+    client = session.client('s3')
+
+    paths = write_artifacts({'cpu.txt': b'stats'}, 's3://warehouse-bucket/profiles/run', client)
+
+    assert_that(paths).is_equal_to(['s3://warehouse-bucket/profiles/run/cpu.txt'])
+    body = client.get_object(Bucket='warehouse-bucket', Key='profiles/run/cpu.txt')['Body']
+    assert_that(body.read()).is_equal_to(b'stats')
+
+
+def test_profile_run(tmp_path):
+    """
+    Tests a profiled run writes its artifacts to the local directory and a disabled run does not
+    """
+    with profile_run(None, str(tmp_path), 'download_stats', lambda: None) as profiler:
+        assert_that(profiler).is_none()
+    assert_that(list(tmp_path.iterdir())).is_empty()
+
+    try:
+        with profile_run('', str(tmp_path), 'download_stats', lambda: None) as profiler:
+            assert_that(profiler).is_not_none()
+    finally:
+        METRICS.disable()
+
+    runs = list(tmp_path.iterdir())
+    assert_that(runs).is_length(1)
+    assert_that(runs[0].name).starts_with('download_stats-')
+    assert_that(sorted(x.name for x in runs[0].iterdir())).is_equal_to(
+        ['allocations.txt', 'cpu.prof', 'cpu.txt', 'samples.folded', 'stages.txt'])
@@ -29,7 +29,8 @@ def test_get_schedule(schedule, monkeypatch):
         .contains_entry({'home_team': 'Miami Dolphins'}) \
         .contains_entry({'away_team_code': 'BUF'}) \
         .contains_entry({'away_team': 'Buffalo Bills'}) \
-        .contains_entry({'game_date': '20240912'})
+        .contains_entry({'game_date': '20240912'}) \
+        .contains_entry({'status': 'pre'})
 
 
 def test_get_schedules_no_response(monkeypatch):
@@ -0,0 +1,81 @@
+"""
+Tests for the Fantasy Points scoring
+"""
+
+import json
+
+import polars
+import pytest
+from assertpy import assert_that
+
+from services.scoring import PRESETS, Bonus, ScoringConfig, get_config, get_fantasy_key, \
+    score_players
+
+
+@pytest.fixture(scope='function')
+def stats() -> polars.DataFrame:
+    """
+    Player Stats of two players over two weeks.
+    """
+    rows = [
+        ('qb', 'passing', 'yds', 310.0, 1), ('qb', 'passing', 'td', 2.0, 1),
+        ('qb', 'passing', 'int', 1.0, 1), ('qb', 'passing', 'yds', 200.0, 2),
+        ('wr', 'receiving', 'rec', 8.0, 1), ('wr', 'receiving', 'yds', 95.0, 1),
+        ('wr', 'receiving', 'long', 40.0, 1), ('wr', 'fumbles', 'lost', 1.0, 1)
+    ]
+    return polars.DataFrame({
+        'player_url': [x[0] for x in rows],
+        'player_name': [x[0].upper() for x in rows],
+        'statistic_type': [x[1] for x in rows],
+        'statistic_code': [x[2] for x in rows],
+        'statistic_value': [x[3] for x in rows],
+        'team': 'Buffalo Bills',
+        'year': 2023,
+        'game_type': '2',
+        'week': [x[4] for x in rows]
+    })
+
+
+def test_score_players(stats):
+    """
+    Tests every config is scored per player and game in one pass
+    """
+    bonus = ScoringConfig('bonus', PRESETS['standard'].points, (Bonus('passing', 'yds', 300, 3),))
+
+    scores = score_players(stats, [PRESETS['standard'], PRESETS['ppr'], bonus])
+
+    assert_that(scores.columns).is_equal_to(['player_url', 'player_name', 'team', 'year',
+                                             'game_type', 'week', 'standard', 'ppr', 'bonus'])
+    assert_that(scores.select('player_url', 'week', 'standard', 'ppr', 'bonus').rows()) \
+        .is_equal_to([('qb', 1, 18.4, 18.4, 21.4), ('qb', 2, 8.0, 8.0, 8.0),
+                      ('wr', 1, 7.5, 15.5, 7.5)])
+
+
+def test_score_players_invalid_names(stats):
+    """
+    Tests config names clashing with a Stats column are rejected
+    """
+    with pytest.raises(ValueError):
+        score_players(stats, [ScoringConfig('team', {})])
+
+
+def test_get_config(tmp_path):
+    """
+    Tests loading a preset and a JSON config
+    """
+    path = tmp_path / 'custom.json'
+    path.write_text(json.dumps({'name': 'custom', 'points': {'rushing': {'yds': 1}},
+                                'bonuses': [{'statistic_type': 'rushing', 'statistic_code': 'yds',
+                                             'threshold': 100, 'points': 5}]}))
+
+    assert_that(get_config('ppr')).is_equal_to(PRESETS['ppr'])
+    assert_that(get_config(str(path))).is_equal_to(
+        ScoringConfig('custom', {'rushing': {'yds': 1.0}}, (Bonus('rushing', 'yds', 100.0, 5.0),)))
+
+
+def test_get_fantasy_key():
+    """
+    Tests the Fantasy Points are partitioned like the Player Stats
+    """
+    assert_that(get_fantasy_key('players/2023/regular/week_1.parquet')) \
+        .is_equal_to('fantasy/2023/regular/week_1.parquet')
@@ -0,0 +1,62 @@
+"""
+Tests for the Deterministic Sharding
+"""
+
+import polars
+from assertpy import assert_that
+
+from services import sharding
+
+
+def test_get_shard():
+    """
+    Tests the Shard of a game is stable and within the Shard Count
+    """
+    assert_that(sharding.get_shard('401547379', 4)).is_equal_to(sharding.get_shard('401547379', 4))
+    assert_that(sharding.get_shard('401547379', 4)).is_between(0, 3)
+    assert_that(sharding.get_shard('401547379', 1)).is_equal_to(0)
+
+
+def test_select_shard():
+    """
+    Tests every game is assigned to exactly one Shard
+    """
+    frame = polars.DataFrame({'game_id': [str(x) for x in range(401547300, 401547340)]})
+
+    shards = [sharding.select_shard(frame, x, 3)['game_id'].to_list() for x in range(3)]
+
+    assert_that(sorted(sum(shards, []))).is_equal_to(frame['game_id'].to_list())
+    assert_that([x for x in shards if x]).is_length(3)
+
+
+def test_part_keys():
+    """
+    Tests the part keys map back to the week key
+    """
+    key = sharding.get_part_key('teams/2023/2/week_1.parquet', 1, 4)
+
+    assert_that(key).is_equal_to('teams/2023/2/week_1/part-1-of-4.parquet')
+    assert_that(sharding.get_base_key(key)).is_equal_to('teams/2023/2/week_1.parquet')
+    assert_that(sharding.get_base_key('teams/2023/2/week_1.parquet')) \
+        .is_equal_to('teams/2023/2/week_1.parquet')
+
+
+def test_load_parts(session, s3):
+    """
+    Tests the parts are only loaded once every Shard has written its part
+    """
+    client = session.client('s3')
+    key = 'teams/2020/1/week_1.parquet'
+    sharding.write_part(client, 'warehouse-bucket', sharding.get_part_key(key, 0, 2),
+                        polars.DataFrame({'team': ['Buffalo Bills']}))
+
+    assert_that(sharding.load_parts(client, 'warehouse-bucket', key, 2)).is_none()
+
+    sharding.write_part(client, 'warehouse-bucket', sharding.get_part_key(key, 1, 2),
+                        polars.DataFrame())
+    parts = sharding.load_parts(client, 'warehouse-bucket', key, 2)
+    assert_that([len(x) for x in parts]).is_equal_to([1, 0])
+
+    sharding.delete_parts(client, 'warehouse-bucket', key, 2)
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/')
+    assert_that(response.get('Contents', [])).is_empty()
@@ -0,0 +1,122 @@
+"""
+Tests for the Spill Accumulator
+"""
+
+import os
+
+import polars
+from assertpy import assert_that
+
+from services.changes import content_hash
+from services.spill import SpillAccumulator
+
+
+def create_frames() -> list[polars.DataFrame]:
+    """
+    Creates game frames with differing columns.
+    """
+    return [
+        polars.DataFrame({'team': ['Buffalo Bills'], 'statistic_value': [1.0]}),
+        polars.DataFrame({'team': ['Pittsburgh Steelers'], 'statistic_value': [None]}),
+        polars.DataFrame({'team': ['Miami Dolphins'], 'statistic_value': [3.0], 'week': [1]})
+    ]
+
+
+def test_append_spills(tmp_path):
+    """
+    Tests the buffered frames are spilled once they reach the budget
+    """
+    with SpillAccumulator(1, str(tmp_path)) as accumulator:
+        accumulator.extend(create_frames())
+
+        assert_that(accumulator.files).is_length(3)
+        assert_that(accumulator.spilled_bytes).is_greater_than(0)
+        assert_that(len(accumulator)).is_equal_to(3)
+        assert_that([len(x) for x in accumulator.batches()]).is_equal_to([1, 1, 1])
+
+        frame = accumulator.lazy().collect()
+        assert_that(frame.columns).is_equal_to(['team', 'statistic_value', 'week'])
+        assert_that(frame['statistic_value'].to_list()).is_equal_to([1.0, None, 3.0])
+        directory = accumulator.directory
+
+    assert_that(os.path.exists(directory)).is_false()
+
+
+def test_append_buffers(tmp_path):
+    """
+    Tests frames within the budget are kept in memory
+    """
+    with SpillAccumulator(1 << 20, str(tmp_path)) as accumulator:
+        assert_that(bool(accumulator)).is_false()
+        accumulator.extend(create_frames())
+
+        assert_that(accumulator.files).is_empty()
+        assert_that(bool(accumulator)).is_true()
+        assert_that(list(accumulator.batches())).is_length(1)
+
+
+def test_content_hash(tmp_path):
+    """
+    Tests the streamed digest matches the digest of the collected content
+    """
+    frames = create_frames()
+    expected = content_hash(polars.concat(frames, how='diagonal_relaxed'))
+
+    for budget in (1, 1 << 20):
+        with SpillAccumulator(budget, str(tmp_path)) as accumulator:
+            accumulator.extend(frames)
+            assert_that(accumulator.content_hash()).is_equal_to(expected)
+
+
+def test_write_parquet(tmp_path):
+    """
+    Tests the spilled frames are streamed into a single Parquet file
+    """
+    with SpillAccumulator(1, str(tmp_path)) as accumulator:
+        accumulator.extend(create_frames())
+        path = str(tmp_path / 'output.parquet')
+
+        size = accumulator.write_parquet(path)
+
+    assert_that(size).is_equal_to(os.path.getsize(path))
+    assert_that(len(polars.read_parquet(path))).is_equal_to(3)
+
+
+def test_content_hash_order(tmp_path):
+    """
+    Tests the digest does not depend on the order the frames were added in
+    """
+    frames = create_frames()
+    with SpillAccumulator(1, str(tmp_path)) as accumulator:
+        accumulator.extend(reversed(frames))
+        assert_that(accumulator.content_hash()) \
+            .is_equal_to(content_hash(polars.concat(frames, how='diagonal_relaxed')))
+
+
+def test_write_ipc(tmp_path):
+    """
+    Tests the spilled frames are written into a single Arrow IPC file aligned to one schema
+    """
+    with SpillAccumulator(1, str(tmp_path)) as accumulator:
+        accumulator.extend(create_frames())
+        path = str(tmp_path / 'output.arrow')
+
+        size = accumulator.write_ipc(path, 'lz4')
+
+    frame = polars.read_ipc(path)
+    assert_that(size).is_equal_to(os.path.getsize(path))
+    assert_that(frame.columns).is_equal_to(['team', 'statistic_value', 'week'])
+    assert_that(frame['week'].to_list()).is_equal_to([None, None, 1])
+
+
+def test_append_parquet(tmp_path):
+    """
+    Tests a Parquet file is added one batch at a time through the update function
+    """
+    path = str(tmp_path / 'existing.parquet')
+    polars.concat(create_frames(), how='diagonal_relaxed').write_parquet(path)
+
+    with SpillAccumulator(1, str(tmp_path)) as accumulator:
+        accumulator.append_parquet(path, lambda x: x.filter(polars.col('week').is_null()))
+
+        assert_that(len(accumulator)).is_equal_to(2)
@@ -3,11 +3,14 @@ Tests for the Team Service.
 """
 import json
 import logging
+import os
+import subprocess
+import sys
 
 import pytest
 from assertpy import assert_that
 
-from services.stats import TeamService, BaseService
+from services.stats import MATCHUP_URL, TeamService, BaseService, get_payload_path
 
 RESULT_FILE = './tests/test_files/team-output.json'
 
@@ -240,4 +243,79 @@ def test_create_split_stat_too_many_splits():
 
     service = TeamService()
     result = service._create_split_stats_(team, 'Buffalo', stat_entry, mappings)
-    assert_that(result).is_empty()
\ No newline at end of file
+    assert_that(result).is_empty()
+
+
+def test_get_payload_path():
+    """
+    Tests the saved payload path mirrors the page URL.
+    """
+
+    assert_that(get_payload_path('payloads', MATCHUP_URL.format(game_id='401547300'))) \
+        .is_equal_to(os.path.join('payloads', 'matchup', 'gameId', '401547300.json'))
+
+
+def test_replay_payloads(monkeypatch, match_up, tmp_path):
+    """
+    Tests saved payloads are parsed without starting a browser.
+    """
+
+    path = get_payload_path(str(tmp_path), MATCHUP_URL.format(game_id='401547300'))
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(match_up, file)
+    monkeypatch.setenv('REPLAY_DIR', str(tmp_path))
+
+    service = TeamService()
+
+    assert_that(service.get_team_stats('401547300', 1, 2024, '2')).is_not_empty()
+    assert_that(service.get_team_stats('401547301', 1, 2024, '2')).is_empty()
+    assert_that(service.driver.counters['starts']).is_equal_to(0)
+
+
+def test_record_payloads(monkeypatch, match_up, tmp_path):
+    """
+    Tests loaded payloads are saved for a later replay.
+    """
+
+    class Browser:
+        """
+        Browser returning the Match up payload.
+        """
+        def get(self, url):
+            """
+            Loads nothing.
+            """
+
+        def execute_script(self, script):
+            """
+            Returns the Match up payload.
+            """
+            return match_up
+
+        def quit(self):
+            """
+            Quits nothing.
+            """
+
+    monkeypatch.setenv('RECORD_DIR', str(tmp_path))
+    service = TeamService()
+    service.driver.factory = Browser
+    service.driver.timeout = 0
+
+    service.get_team_stats('401547300', 1, 2024, '2')
+
+    with open(get_payload_path(str(tmp_path), MATCHUP_URL.format(game_id='401547300')), 'r',
+              encoding='utf-8') as file:
+        assert_that(json.load(file)).is_equal_to(match_up)
+
+
+def test_selenium_not_imported():
+    """
+    Tests importing the services does not import Selenium.
+    """
+
+    result = subprocess.run([sys.executable, '-c', 'import sys, services.stats; '
+                             'print("selenium" in sys.modules)'], cwd='src', capture_output=True,
+                            text=True, check=True)
+    assert_that(result.stdout.strip()).is_equal_to('False')
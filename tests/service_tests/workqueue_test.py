@@ -0,0 +1,81 @@
+"""
+Tests for the SQLite Work Queue
+"""
+
+from assertpy import assert_that
+
+from services.workqueue import WorkQueue
+
+
+def create_queue(tmp_path) -> WorkQueue:
+    """
+    Creates a Work Queue with the Schedule and Team tasks of two weeks.
+    """
+    queue = WorkQueue(str(tmp_path / 'backfill.db'))
+    queue.add([(entity, 2023, 2, week) for week in (1, 2) for entity in ('teams', 'schedules')])
+    return queue
+
+
+def test_add_existing(tmp_path):
+    """
+    Tests adding Tasks again keeps the existing Tasks
+    """
+    queue = create_queue(tmp_path)
+
+    assert_that(queue.add([('teams', 2023, 2, 1), ('players', 2023, 2, 1)])).is_equal_to(1)
+    assert_that(queue.counts()['pending']).is_equal_to(5)
+
+
+def test_claim_schedules_first(tmp_path):
+    """
+    Tests the Stats task of a week is only claimed once its Schedule task is done
+    """
+    queue = create_queue(tmp_path)
+
+    first = queue.claim()
+    second = queue.claim()
+    assert_that([first.entity, second.entity]).is_equal_to(['schedules', 'schedules'])
+    assert_that(queue.claim()).is_none()
+
+    queue.complete(second, 1.0)
+    task = queue.claim()
+    assert_that((task.entity, task.week, task.attempts)).is_equal_to(('teams', 2, 1))
+
+
+def test_claim_without_schedule_task(tmp_path):
+    """
+    Tests Stats tasks run when no Schedule task is queued for their week
+    """
+    queue = WorkQueue(str(tmp_path / 'backfill.db'))
+    queue.add([('players', 2023, 2, 1)])
+
+    assert_that(queue.claim().entity).is_equal_to('players')
+
+
+def test_fail(tmp_path):
+    """
+    Tests a Task is retried until it reaches the maximum attempts and its week fails with it
+    """
+    queue = create_queue(tmp_path)
+
+    task = queue.claim()
+    assert_that(queue.fail(task, 'Timeout', 2)).is_true()
+    task = queue.claim()
+    assert_that(task.attempts).is_equal_to(2)
+    assert_that(queue.fail(task, 'Timeout', 2)).is_false()
+
+    assert_that(queue.counts()).contains_entry({'failed': 2}).contains_entry({'pending': 2})
+    assert_that(queue.retry_failed()).is_equal_to(2)
+
+
+def test_recover(tmp_path):
+    """
+    Tests running Tasks of a killed Backfill are returned to pending
+    """
+    queue = create_queue(tmp_path)
+    queue.claim()
+    queue.close()
+
+    queue = WorkQueue(str(tmp_path / 'backfill.db'))
+    assert_that(queue.recover()).is_equal_to(1)
+    assert_that(queue.counts()['pending']).is_equal_to(4)
@@ -2,9 +2,19 @@
 Tests for the Teams Status Data Pull
 """
 
+import logging
+from io import BytesIO
+
+import polars
 from assertpy import assert_that
 
 import download_stats
+from services.checkpoint import create_checkpoint_store
+from services.deadline import Deadline
+from services.fetch import FetchError
+from services.metrics import METRICS
+from services.pool import ServicePool
+from services import manifest
 from services.stats import BaseService, TeamService
 
 
@@ -47,6 +57,58 @@ def test_main(match_up, monkeypatch, session, s3):
     assert_that(response.get('Contents', [])).is_not_empty()
 
 
+def test_main_ipc(match_up, monkeypatch, session, s3):
+    """
+    Tests the Arrow IPC copy is written next to the output
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+    download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams', ipc='lz4')
+
+    client = session.client('s3')
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/2020/1/')
+    keys = [x['Key'] for x in response.get('Contents', [])]
+    assert_that(keys).contains('teams/2020/1/week_1.parquet', 'teams/2020/1/week_1.arrow')
+
+
+def test_main_ipc_unchanged(match_up, monkeypatch, session, s3):
+    """
+    Tests the Arrow IPC copy is added to an output written before without one
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+    download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams')
+    download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams', ipc='lz4')
+
+    client = session.client('s3')
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/2020/1/')
+    keys = [x['Key'] for x in response.get('Contents', [])]
+    assert_that(keys).contains('teams/2020/1/week_1.arrow')
+
+
+def test_write_stats_enrich(session, s3, team_stats, games_frame):
+    """
+    Tests the Team Stats are enriched once the Games of their week are written
+    """
+
+    client = session.client('s3')
+    results = download_stats.write_stats(team_stats.filter(polars.col('week') == 1),
+                                         'warehouse-bucket', 'teams/2023/regular/week_1.parquet',
+                                         'teams', client, enrich=True)
+    assert_that(results).is_length(1)
+
+    results = download_stats.write_stats(games_frame.filter(polars.col('week') == 1),
+                                         'warehouse-bucket', 'games/2023/regular/week_1.parquet',
+                                         'games', client, enrich=True)
+    assert_that([x.key for x in results]).contains('team_enriched/2023/regular/week_1.parquet')
+
+    response = client.get_object(Bucket='warehouse-bucket',
+                                 Key='team_enriched/2023/regular/week_1.parquet')
+    enriched = polars.read_parquet(response['Body'].read())
+    assert_that(enriched.select('team', 'game_id', 'is_home').rows()) \
+        .is_equal_to([('A', '101', True), ('B', '101', False)])
+
+
 def test_main_no_schedule_file(match_up, monkeypatch, s3):
     """
     Tests no schedule file
@@ -74,3 +136,367 @@ def test_main_invalid_stat_type(match_up, monkeypatch, s3):
     assert_that(download_stats.main) \
         .raises(SystemExit) \
         .when_called_with(bucket, schedule_key, 'farts')
+
+
+def test_main_manifest(match_up, monkeypatch, session, s3):
+    """
+    Tests the Main Function records the output in the Manifest
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+
+    download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams')
+
+    result, _ = manifest.load_manifest(session.client('s3'), 'warehouse-bucket')
+    assert_that(result['key'].to_list()).contains('teams/2020/1/week_1.parquet')
+
+
+def test_main_year(match_up, monkeypatch, session, s3, schedule_frame, caplog):
+    """
+    Tests the Main Function processing every Schedule File for a Year
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+
+    client = session.client('s3')
+    stream = BytesIO()
+    schedule_frame.write_parquet(stream)
+    client.put_object(Bucket='warehouse-bucket', Key='schedules/2020/1/week_2.parquet',
+                      Body=stream.getvalue())
+
+    with caplog.at_level(logging.INFO):
+        download_stats.main('warehouse-bucket', None, 'teams', year=2020, workers=2)
+
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/2020/1/')
+    assert_that([x['Key'] for x in response.get('Contents', [])]) \
+        .contains('teams/2020/1/week_1.parquet', 'teams/2020/1/week_2.parquet')
+    assert_that(caplog.text).contains('Total')
+
+
+def test_main_year_no_schedules(match_up, monkeypatch, s3):
+    """
+    Tests processing a Year without Schedule Files
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+
+    assert_that(download_stats.main) \
+        .raises(SystemExit) \
+        .when_called_with('warehouse-bucket', None, 'teams', year=2019)
+
+
+def test_main_resume_checkpoint(monkeypatch, session, s3, tmp_path):
+    """
+    Tests the Main Function loads completed games from the Checkpoints instead of fetching them
+    """
+
+    def fail(*args):
+        raise AssertionError('Completed game was fetched again')
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', fail)
+
+    store = create_checkpoint_store(str(tmp_path), 'teams/2020/1/week_1.parquet', None)
+    store.save('123445', polars.DataFrame({'team': ['Buffalo Bills'], 'statistic_value': [1.0]}))
+
+    download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams',
+                        checkpoint=str(tmp_path))
+
+    client = session.client('s3')
+    response = client.get_object(Bucket='warehouse-bucket', Key='teams/2020/1/week_1.parquet')
+    assert_that(polars.read_parquet(response['Body'].read())['team'].to_list()) \
+        .is_equal_to(['Buffalo Bills'])
+    assert_that(store.completed()).is_empty()
+
+
+def test_main_defers_unplayed_games(match_up, monkeypatch, session, s3, schedule_frame, caplog):
+    """
+    Tests unplayed games are deferred to the pending list and later merged into the week output
+    """
+
+    urls = []
+
+    def get_payload(_self, url):
+        urls.append(url)
+        return match_up
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', get_payload)
+
+    client = session.client('s3')
+    future = schedule_frame.with_columns(polars.lit('999999').alias('game_id'),
+                                         polars.lit('New York Jets').alias('home_team'),
+                                         polars.lit('Miami Dolphins').alias('away_team'),
+                                         polars.lit('21000101').alias('game_date'))
+    stream = BytesIO()
+    polars.concat([schedule_frame, future]).write_parquet(stream)
+    client.put_object(Bucket='warehouse-bucket', Key='schedules/2020/1/week_1.parquet',
+                      Body=stream.getvalue())
+
+    with caplog.at_level(logging.INFO):
+        download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams',
+                            plan=True)
+
+    assert_that(urls).is_length(1)
+    assert_that(caplog.text).contains('Deferred 1 unplayed games')
+    pending = download_stats.load_schedule_file('warehouse-bucket',
+                                                'pending/teams/2020/1/week_1.parquet', client)
+    assert_that(pending['game_id'].to_list()).is_equal_to(['999999'])
+    week_key = 'teams/2020/1/week_1.parquet'
+    rows = len(download_stats.load_schedule_file('warehouse-bucket', week_key, client))
+
+    download_stats.main('warehouse-bucket', None, 'teams', pending=True, today='21000101')
+
+    assert_that(urls).is_length(2)
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='pending/')
+    assert_that(response.get('Contents', [])).is_empty()
+    stats = download_stats.load_schedule_file('warehouse-bucket', week_key, client)
+    assert_that(len(stats)).is_equal_to(rows * 2)
+
+
+def test_main_shards(match_up, monkeypatch, session, s3, schedule_frame):
+    """
+    Tests Shards write their parts and the finalize step merges them into the week output
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+
+    client = session.client('s3')
+    games = polars.concat([schedule_frame.with_columns(polars.lit(str(x)).alias('game_id'))
+                           for x in range(401547300, 401547306)])
+    stream = BytesIO()
+    games.write_parquet(stream)
+    client.put_object(Bucket='warehouse-bucket', Key='schedules/2020/1/week_1.parquet',
+                      Body=stream.getvalue())
+
+    for index in range(2):
+        download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams',
+                            shard_index=index, shard_count=2)
+
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/')
+    assert_that([x['Key'] for x in response.get('Contents', [])]).is_equal_to([
+        'teams/2020/1/week_1/part-0-of-2.parquet', 'teams/2020/1/week_1/part-1-of-2.parquet'
+    ])
+
+    download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams',
+                        shard_count=2, finalize=True)
+
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/')
+    assert_that([x['Key'] for x in response.get('Contents', [])]) \
+        .is_equal_to(['teams/2020/1/week_1.parquet'])
+    single = download_stats.get_team_stats('1', 2020, 1, '2')
+    stats = download_stats.load_schedule_file('warehouse-bucket', 'teams/2020/1/week_1.parquet',
+                                              client)
+    assert_that(len(stats)).is_equal_to(len(single) * 6)
+
+
+def test_main_finalize_missing_part(s3):
+    """
+    Tests the finalize step waits for every Shard
+    """
+
+    assert_that(download_stats.main) \
+        .raises(SystemExit) \
+        .when_called_with('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams',
+                          shard_count=2, finalize=True)
+
+
+def test_main_finalize_game_files(match_up, monkeypatch, session, s3):
+    """
+    Tests the finalize step folds the game files into the week output and drops their Manifest
+    Entries
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+    client = session.client('s3')
+    game_key = 'teams/2020/1/week_1/123445.parquet'
+    with ServicePool(TeamService) as pool:
+        download_stats.process_schedule('warehouse-bucket', 'schedules/2020/1/week_1.parquet',
+                                        'teams', client, pool, game_id='123445')
+    manifest.update_manifest(client, 'warehouse-bucket', [
+        manifest.create_entry(game_key, polars.DataFrame({'team': ['A']}), 1)])
+
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/')
+    assert_that([x['Key'] for x in response.get('Contents', [])]).is_equal_to([game_key])
+
+    download_stats.main('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams',
+                        finalize=True)
+
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/')
+    assert_that([x['Key'] for x in response.get('Contents', [])]) \
+        .is_equal_to(['teams/2020/1/week_1.parquet'])
+    entries, _ = manifest.load_manifest(client, 'warehouse-bucket')
+    assert_that(entries['key'].to_list()).is_equal_to(['teams/2020/1/week_1.parquet'])
+
+
+def test_process_schedule_deadline(match_up, monkeypatch, session, s3, schedule_frame, caplog):
+    """
+    Tests games that do not fit the Deadline are written to the pending list and continued later
+    """
+
+    class OneGameDeadline(Deadline):
+        """
+        Deadline allowing a single game.
+        """
+        def can_start(self) -> bool:
+            return not self._latencies
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+    client = session.client('s3')
+    games = polars.concat([schedule_frame.with_columns(polars.lit(str(x)).alias('game_id'))
+                           for x in range(3)])
+    stream = BytesIO()
+    games.write_parquet(stream)
+    client.put_object(Bucket='warehouse-bucket', Key='schedules/2020/1/week_1.parquet',
+                      Body=stream.getvalue())
+    pool = ServicePool(TeamService, 1)
+
+    with caplog.at_level(logging.INFO):
+        summary = download_stats.process_schedule('warehouse-bucket',
+                                                  'schedules/2020/1/week_1.parquet', 'teams',
+                                                  client, pool, deadline=OneGameDeadline(60))
+
+    assert_that(summary.deferred).is_equal_to(2)
+    assert_that(caplog.text).contains('Deadline reached, 2 games left unprocessed: 1, 2')
+    pending = download_stats.load_schedule_file('warehouse-bucket',
+                                                'pending/teams/2020/1/week_1.parquet', client)
+    assert_that(pending['game_id'].to_list()).is_equal_to(['1', '2'])
+
+    summary = download_stats.process_pending('warehouse-bucket',
+                                             'pending/teams/2020/1/week_1.parquet', 'teams',
+                                             client, pool)
+
+    assert_that(summary.deferred).is_equal_to(0)
+    assert_that(summary.rows).is_equal_to(len(download_stats.get_team_stats('0', 2020, 1, '2')) * 3)
+
+
+def test_fetch_stats_clears_prefetched(match_up, monkeypatch, schedule_frame):
+    """
+    Tests payloads still prefetched when the Deadline stops the games are dropped before the
+    Service returns to the pool
+    """
+
+    class OneGameDeadline(Deadline):
+        """
+        Deadline allowing a single game.
+        """
+        def can_start(self) -> bool:
+            return not self._latencies
+
+    monkeypatch.setenv('FETCH_BATCH_SIZE', '3')
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+    monkeypatch.setattr(BaseService, 'prefetch',
+                        lambda self, ids: self.prefetched.update({x: match_up for x in ids}))
+    rows = polars.concat([schedule_frame.with_columns(polars.lit(str(x)).alias('game_id'))
+                          for x in range(3)]).to_dicts()
+    pool = ServicePool(TeamService, 1)
+
+    results, unprocessed = download_stats.fetch_stats(rows, 'teams', pool,
+                                                      deadline=OneGameDeadline(60))
+
+    assert_that(results).is_length(1)
+    assert_that(unprocessed).is_equal_to(['1', '2'])
+    with pool.borrow() as service:
+        assert_that(service.prefetched).is_empty()
+
+
+def test_process_schedule_metrics(match_up, monkeypatch, session, s3):
+    """
+    Tests the pipeline stages are recorded while the Metrics are enabled
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+    METRICS.enable()
+    try:
+        summary = download_stats.process_schedule('warehouse-bucket',
+                                                  'schedules/2020/1/week_1.parquet', 'teams',
+                                                  session.client('s3'), ServicePool(TeamService, 1))
+        stages = METRICS.summary()
+    finally:
+        METRICS.disable()
+
+    assert_that(stages).contains_key('parse', 'frame', 'digest', 'encode', 'upload', 'manifest')
+    assert_that(stages).does_not_contain_key('browser_start')
+    assert_that(stages['parse']['rows']).is_equal_to(summary.rows)
+    assert_that(stages['upload']['bytes']).is_equal_to(summary.size)
+    assert_that([x[0] for x in METRICS.slowest_games()]).is_equal_to(['123445'])
+
+
+def test_process_schedule_spill(match_up, monkeypatch, session, s3, schedule_frame, tmp_path):
+    """
+    Tests a memory budget spills the games to disk and writes the same outputs
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+    client = session.client('s3')
+    games = polars.concat([schedule_frame.with_columns(polars.lit(str(x)).alias('game_id'))
+                           for x in range(3)])
+    stream = BytesIO()
+    games.write_parquet(stream)
+    client.put_object(Bucket='warehouse-bucket', Key='schedules/2020/1/week_1.parquet',
+                      Body=stream.getvalue())
+    pool = ServicePool(TeamService, 1)
+
+    download_stats.process_schedule('warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams',
+                                    client, pool, dimensions=True)
+    expected = client.head_object(Bucket='warehouse-bucket', Key='teams/2020/1/week_1.parquet')
+
+    summary = download_stats.process_schedule('warehouse-bucket',
+                                              'schedules/2020/1/week_1.parquet', 'teams', client,
+                                              pool, dimensions=True, memory_budget=1,
+                                              spill_dir=str(tmp_path))
+
+    assert_that(summary.written).is_equal_to(0)
+    assert_that(summary.skipped).is_equal_to(2)
+    assert_that(list(tmp_path.iterdir())).is_empty()
+
+    summary = download_stats.process_schedule('warehouse-bucket',
+                                              'schedules/2020/1/week_1.parquet', 'teams', client,
+                                              pool, dimensions=True, force=True, memory_budget=1,
+                                              spill_dir=str(tmp_path))
+
+    assert_that(summary.written).is_equal_to(2)
+    response = client.head_object(Bucket='warehouse-bucket', Key='teams/2020/1/week_1.parquet')
+    assert_that(response['Metadata']).is_equal_to(expected['Metadata'])
+    stats = download_stats.load_schedule_file('warehouse-bucket', 'teams/2020/1/week_1.parquet',
+                                              client)
+    assert_that(len(stats)).is_equal_to(summary.rows)
+    entries, _ = manifest.load_manifest(client, 'warehouse-bucket')
+    assert_that(entries.filter(polars.col('key') == 'teams/2020/1/week_1.parquet')['row_count']
+                .to_list()).is_equal_to([summary.rows])
+
+
+def test_process_schedule_spill_failure(monkeypatch, session, s3, schedule_frame, tmp_path):
+    """
+    Tests the spill files are removed when a game fails before the output is written
+    """
+
+    def fail(*args):
+        raise RuntimeError('browser crashed')
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', fail)
+    pool = ServicePool(TeamService, 1)
+
+    assert_that(download_stats.process_schedule).raises(RuntimeError).when_called_with(
+        'warehouse-bucket', 'schedules/2020/1/week_1.parquet', 'teams', session.client('s3'),
+        pool, schedule=schedule_frame, memory_budget=1, spill_dir=str(tmp_path))
+    assert_that(list(tmp_path.iterdir())).is_empty()
+
+
+def test_main_defers_failed_fetches(monkeypatch, session, s3):
+    """
+    Tests a game whose page failed to load within the retries is deferred to the pending list
+    """
+
+    def fail(*args):
+        raise FetchError('Fetch failed after 4 attempts')
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', fail)
+    client = session.client('s3')
+
+    summary = download_stats.process_schedule('warehouse-bucket',
+                                              'schedules/2020/1/week_1.parquet', 'teams', client,
+                                              ServicePool(TeamService, 1))
+
+    assert_that(summary.deferred).is_equal_to(1)
+    pending = download_stats.load_schedule_file('warehouse-bucket',
+                                                'pending/teams/2020/1/week_1.parquet', client)
+    assert_that(pending['game_id'].to_list()).is_equal_to(['123445'])
@@ -0,0 +1,135 @@
+"""
+Tests for the long-running Worker
+"""
+
+import os
+import threading
+
+from assertpy import assert_that
+
+import download_stats
+import worker
+from services.fetch import FetchError
+from services.jobs import Job, LocalJobQueue, SqsJobQueue
+from services.stats import BaseService
+
+
+def test_run_sqs(match_up, monkeypatch, session, s3):
+    """
+    Tests the Worker processes a Job from SQS and acknowledges it after writing the output
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: match_up)
+
+    sqs = session.client('sqs')
+    queue = SqsJobQueue(sqs, sqs.create_queue(QueueName='stats-jobs')['QueueUrl'])
+    queue.send(Job('teams', 'schedules/2020/1/week_1.parquet'))
+
+    client = session.client('s3')
+    completed = worker.run(queue, 'warehouse-bucket', client, threading.Event(), wait=0,
+                           max_jobs=1)
+
+    assert_that(completed).is_equal_to(1)
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='teams/2020/1/')
+    assert_that(response.get('Contents', [])).is_not_empty()
+    assert_that(queue.receive(0)).is_none()
+
+
+def test_run_game_job(box_score, monkeypatch, session, s3, tmp_path):
+    """
+    Tests a per-game Job writes the game's own output file
+    """
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', lambda *args: box_score)
+
+    queue = LocalJobQueue(str(tmp_path))
+    queue.send(Job('players', 'schedules/2020/1/week_1.parquet', '123445'))
+
+    client = session.client('s3')
+    worker.run(queue, 'warehouse-bucket', client, threading.Event(), wait=0, max_jobs=1)
+
+    response = client.list_objects_v2(Bucket='warehouse-bucket',
+                                      Prefix='players/2020/1/week_1/123445.parquet')
+    assert_that(response.get('Contents', [])).is_not_empty()
+
+
+def test_run_failed_job_released(monkeypatch, session, s3, tmp_path):
+    """
+    Tests a failed Job is released back to the Queue instead of acknowledged
+    """
+
+    def fail(*args):
+        raise RuntimeError('Browser crashed')
+
+    monkeypatch.setattr(BaseService, 'get_stats_payload', fail)
+
+    queue = LocalJobQueue(str(tmp_path))
+    queue.send(Job('teams', 'schedules/2020/1/week_1.parquet'))
+    stop = threading.Event()
+
+    original = queue.release
+
+    def release(job):
+        original(job)
+        stop.set()
+
+    monkeypatch.setattr(queue, 'release', release)
+    completed = worker.run(queue, 'warehouse-bucket', session.client('s3'), stop, wait=0)
+
+    assert_that(completed).is_equal_to(0)
+    assert_that(queue.receive(0)).is_not_none()
+
+
+def test_run_invalid_job_rejected(monkeypatch, session, s3, tmp_path):
+    """
+    Tests a Job with an unknown Stats Type is rejected instead of acknowledged
+    """
+
+    queue = LocalJobQueue(str(tmp_path))
+    queue.send(Job('kickers', 'schedules/2020/1/week_1.parquet'))
+    stop = threading.Event()
+    original = queue.reject
+
+    def reject(job):
+        original(job)
+        stop.set()
+
+    monkeypatch.setattr(queue, 'reject', reject)
+    completed = worker.run(queue, 'warehouse-bucket', session.client('s3'), stop, wait=0)
+
+    assert_that(completed).is_equal_to(0)
+    assert_that(queue.receive(0)).is_none()
+    assert_that(os.listdir(queue.failed)).is_length(1)
+
+
+def test_run_game_job_fetch_error_released(monkeypatch, session, s3, tmp_path):
+    """
+    Tests a per-game Job whose page failed to load is released instead of acknowledged
+    """
+
+    def fail(row, *args):
+        raise FetchError(f"Failed to load {row['game_id']}")
+
+    monkeypatch.setattr(download_stats, 'fetch_game', fail)
+
+    queue = LocalJobQueue(str(tmp_path))
+    queue.send(Job('players', 'schedules/2020/1/week_1.parquet', '123445'))
+    stop = threading.Event()
+    acked = []
+
+    original = queue.release
+
+    def release(job):
+        original(job)
+        stop.set()
+
+    monkeypatch.setattr(queue, 'release', release)
+    monkeypatch.setattr(queue, 'ack', acked.append)
+    client = session.client('s3')
+    completed = worker.run(queue, 'warehouse-bucket', client, stop, wait=0)
+
+    assert_that(completed).is_equal_to(0)
+    assert_that(acked).is_empty()
+    assert_that(queue.receive(0)).is_not_none()
+    response = client.list_objects_v2(Bucket='warehouse-bucket', Prefix='pending/')
+    assert_that(response.get('Contents', [])).is_empty()